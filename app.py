@@ -1,12 +1,58 @@
 # app.py
+from collections import deque
+
 import streamlit as st
-import pandas as pd
 from datetime import datetime, date
-from pathlib import Path
-from collections import Counter
 from html import escape  # for safe HTML receipt display
 
+# Config and helpers live in the pos package, which avoids importing pandas so
+# the order/checkout path starts fast; pandas loads only for reports/exports.
+from pos.cart import Cart
+from pos import closeout, metrics
+from pos.core import (
+    DEFAULT_MENU,
+    IMAGES_DIR,
+    METRICS_FILE,
+    METRICS_PORT,
+    PRINTER,
+    SALES_XLSX,
+    append_sale_to_excel,
+    build_receipt_text,
+    close_day,
+    day_closed,
+    export_sales_download,
+    export_sales_xlsx,
+    find_sale,
+    format_items_string,
+    get_drafts,
+    get_sale_writer,
+    get_sales_store,
+    item_thumbnail,
+    load_menu,
+    logo_thumbnail,
+    menu_images,
+    new_terminal_id,
+    print_receipt,
+    recent_sales,
+    refund_sale,
+    remove_last_sale,
+    rollover_archive_in_background,
+    safe_read_sales,
+    save_menu,
+    start_metrics_exporter,
+    start_sync_in_background,
+    void_sales,
+    void_shift,
+)
+from pos.drafts import new_order_id
+from pos.menu_store import MENU_FIELDS, diff_menu, find_image, parse_modifiers
+from pos.money import format_cents, to_cents
+from pos.pricing import apply_rate, compute_totals, rate_ppm
+
 st.set_page_config(page_title="Hotdog Stand POS", layout="wide")
+# Phase timings (opt-in, see pos/metrics.py); _t marks where the next
+# top-level phase started
+_t = _page_started = metrics.clock()
 
 # CSS so only the receipt prints when using the browser's print dialog
 PRINT_CSS = """
@@ -30,157 +76,9 @@ PRINT_CSS = """
 """
 st.markdown(PRINT_CSS, unsafe_allow_html=True)
 
-# ---------- Config ----------
-DEFAULT_MENU = [
-    {"item": "Hotdog", "price": 3.50},
-    {"item": "Cheese Dog", "price": 4.00},
-    {"item": "Chili Dog", "price": 4.50},
-    {"item": "Sausage", "price": 5.00},
-    {"item": "Soda", "price": 1.50},
-    {"item": "Water", "price": 1.00},
-    {"item": "Chips", "price": 1.25},
-]
-
-MENU_CSV = Path("menu.csv")
-SALES_XLSX = Path("sales.xlsx")
-SALES_SHEET = "Sales"
-LOGO_FILE = Path("logo-bobs-dogz.png")
-
-# ---------- Helpers ----------
-def load_menu():
-    if MENU_CSV.exists():
-        try:
-            df = pd.read_csv(MENU_CSV)
-            if "item" not in df.columns or "price" not in df.columns:
-                return DEFAULT_MENU.copy()
-            return df.to_dict("records")
-        except Exception:
-            return DEFAULT_MENU.copy()
-    else:
-        return DEFAULT_MENU.copy()
-
-def save_menu(menu_list):
-    pd.DataFrame(menu_list).to_csv(MENU_CSV, index=False)
-
-def ensure_sales_file_exists():
-    if not SALES_XLSX.exists():
-        cols = [
-            "Timestamp",
-            "Date",
-            "Items",
-            "Subtotal",
-            "Discount",
-            "Tax",
-            "Tip",
-            "Card Fee",
-            "Total",
-            "Payment Method",
-            "Notes",
-            "Cash Received",
-            "Change",
-        ]
-        pd.DataFrame(columns=cols).to_excel(
-            SALES_XLSX, sheet_name=SALES_SHEET, index=False
-        )
-
-def append_sale_to_excel(record: dict):
-    ensure_sales_file_exists()
-    try:
-        existing = pd.read_excel(SALES_XLSX, sheet_name=SALES_SHEET)
-    except Exception:
-        existing = pd.DataFrame()
-    new_row = pd.DataFrame([record])
-    out = pd.concat([existing, new_row], ignore_index=True)
-    with pd.ExcelWriter(SALES_XLSX, engine="openpyxl", mode="w") as writer:
-        out.to_excel(writer, sheet_name=SALES_SHEET, index=False)
-
-def remove_last_sale():
-    if not SALES_XLSX.exists():
-        return False
-    try:
-        df = pd.read_excel(SALES_XLSX, sheet_name=SALES_SHEET)
-    except Exception:
-        return False
-    if df.empty:
-        return False
-    df = df.iloc[:-1]  # drop last row
-    with pd.ExcelWriter(SALES_XLSX, engine="openpyxl", mode="w") as writer:
-        df.to_excel(writer, sheet_name=SALES_SHEET, index=False)
-    return True
-
-def safe_read_sales():
-    if not SALES_XLSX.exists():
-        return pd.DataFrame()
-    try:
-        return pd.read_excel(SALES_XLSX, sheet_name=SALES_SHEET)
-    except Exception:
-        try:
-            return pd.read_excel(SALES_XLSX)
-        except Exception:
-            return pd.DataFrame()
-
-def cart_subtotal(cart):
-    return sum(row["qty"] * row["price"] for row in cart)
-
-def format_items_string(cart):
-    return "; ".join(
-        [
-            f'{row["qty"]}x {row["item"]} @ {row["price"]:.2f}'
-            for row in cart
-        ]
-    )
-
-def build_receipt_text(record: dict) -> str:
-    lines = []
-    lines.append("Bob's DOGZ Receipt")
-    lines.append("-" * 24)
-    lines.append(f"Date: {record['Date']}")
-    lines.append(f"Time: {record['Timestamp'].split(' ')[1]}")
-    lines.append(f"Payment: {record['Payment Method']}")
-    lines.append("")
-    lines.append("Items:")
-    for part in str(record["Items"]).split(";"):
-        part = part.strip()
-        if part:
-            lines.append(f"  - {part}")
-    lines.append("")
-    lines.append(f"Subtotal: ${record['Subtotal']:.2f}")
-    lines.append(f"Discount: ${record['Discount']:.2f}")
-    lines.append(f"Tax: ${record['Tax']:.2f}")
-    lines.append(f"Tip: ${record['Tip']:.2f}")
-    lines.append(f"Card Fee: ${record['Card Fee']:.2f}")
-    lines.append(f"TOTAL: ${record['Total']:.2f}")
-    lines.append("")
-    lines.append(f"Cash Received: ${record['Cash Received']:.2f}")
-    lines.append(f"Change: ${record['Change']:.2f}")
-    if record["Notes"]:
-        lines.append("")
-        lines.append(f"Notes: {record['Notes']}")
-    return "\n".join(lines)
-
-def parse_item_counts(df: pd.DataFrame) -> Counter:
-    counts = Counter()
-    if "Items" not in df.columns:
-        return counts
-    for items in df["Items"].dropna():
-        for part in str(items).split(";"):
-            part = part.strip()
-            if not part:
-                continue
-            # Expect "2x Hotdog @ 3.50"
-            try:
-                qty_str, rest = part.split("x", 1)
-                qty = int(qty_str.strip())
-            except Exception:
-                continue
-            name_part = rest.split("@")[0].strip()
-            item_name = name_part
-            counts[item_name] += qty
-    return counts
-
 # ---------- Session state ----------
 if "cart" not in st.session_state:
-    st.session_state.cart = []
+    st.session_state.cart = Cart()
 
 if "tax_rate" not in st.session_state:
     st.session_state.tax_rate = 0.0
@@ -208,60 +106,230 @@ if "confirm_undo" not in st.session_state:
 # last receipt text
 if "last_receipt" not in st.session_state:
     st.session_state.last_receipt = ""
+    st.session_state.last_receipt_record = None
+
+# Server time of recent runs when timing is on, [(phase, milliseconds), ...],
+# and the phases of the latest page/fragment run of each kind for the panel
+if "run_timings" not in st.session_state:
+    st.session_state.run_timings = deque(maxlen=500)
+if "last_runs" not in st.session_state:
+    st.session_state.last_runs = {}
+
+def finish_run(what, started):
+    # End of a page or fragment run: record its total, keep its phases
+    metrics.lap(what, started)
+    phases = metrics.take_run()
+    if phases:
+        st.session_state.run_timings.extend(phases)
+        st.session_state.last_runs[what] = phases
+
+# Terminal id, kept in the URL (?terminal=...) so a reload stays the same
+# terminal. Sales are tagged with it and undo only touches its own sales.
+if "terminal_id" not in st.session_state:
+    st.session_state.terminal_id = st.query_params.get("terminal") or new_terminal_id()
+st.query_params["terminal"] = st.session_state.terminal_id
+
+# ---------- Draft orders ----------
+# The open order is logged to drafts.jsonl as it changes, so a server
+# restart (or a dropped browser) resumes it, and orders can be held.
+def current_draft() -> dict:
+    ss = st.session_state
+    return {
+        "lines": ss.cart.rows(),
+        "note": ss.get("note", ""),
+        "discount": float(ss.get("discount", 0.0)),
+        "tip": float(ss.get("tip", 0.0)),
+        "payment": ss.payment,
+        "cash_received": float(ss.get("cash_received", 0.0)),
+    }
+
+def load_draft(draft: dict):
+    # Only call before the order widgets are drawn in this run
+    ss = st.session_state
+    ss.cart = Cart(draft.get("lines", ()))
+    ss.note = draft.get("note", "")
+    ss.discount = draft.get("discount", 0.0)
+    ss.tip = draft.get("tip", 0.0)
+    ss.payment = draft.get("payment", ss.default_payment)
+    ss.cash_received = float(draft.get("cash_received", 0.0))
+    ss.clear_note = ss.clear_cash = False
+    ss.draft_saved = draft
+
+def start_new_order():
+    st.session_state.order_id = new_order_id()
+    st.session_state.draft_saved = None
+    get_drafts().activate(st.session_state.terminal_id, st.session_state.order_id)
+
+def draft_label(draft: dict) -> str:
+    cart = Cart(draft.get("lines", ()))
+    qty = sum(line.qty for line in cart)
+    label = f"{qty} item(s) · {format_cents(cart.subtotal_cents)}"
+    note = draft.get("note", "").strip()
+    return f"{label} · {note[:20]}" if note else label
+
+if "order_id" not in st.session_state:
+    order_id, draft = get_drafts().active(st.session_state.terminal_id)
+    if order_id is None:
+        start_new_order()
+    else:
+        st.session_state.order_id = order_id
+        st.session_state.draft_saved = None
+        if draft:
+            load_draft(draft)
+
+# Archive closed days in the background (a no-op after the first run each day)
+rollover_archive_in_background()
+# Ship sales to the chain aggregator when POS_SYNC_URL/POS_STAND are set
+start_sync_in_background()
+# Export timing percentiles (metrics.prom / Prometheus endpoint) when enabled
+start_metrics_exporter()
+_t = metrics.lap("session setup", _t)
 
 # ---------- Load menu ----------
 MENU = load_menu()
+_t = metrics.clock()
 
 # ---------- Sidebar ----------
 st.sidebar.header("Menu & Settings")
-
-with st.sidebar.expander("Edit Menu (change prices, add/remove items)", expanded=False):
-    edited_menu = []
-    for idx, entry in enumerate(MENU):
-        cols = st.columns([6, 4])
-        name = cols[0].text_input(
-            f"Item name #{idx+1}",
-            value=entry["item"],
-            key=f"menu_name_{idx}",
-        )
-        price = cols[1].number_input(
-            f"Price #{idx+1} ($)",
-            value=float(entry["price"]),
-            step=0.25,
-            format="%.2f",
-            key=f"menu_price_{idx}",
+st.sidebar.caption(f"Terminal: {st.session_state.terminal_id}")
+
+# Menu manager: one data editor inside a form, so edits are batched and
+# nothing reruns until "Save Menu"; menu.csv is only rewritten if the menu
+# changed. Behind a toggle so the editor (and pandas, which it needs) is not
+# built on every rerun.
+@st.fragment
+def menu_editor():
+    rows = [
+        {field: entry.get(field, "") for field in MENU_FIELDS} for entry in MENU
+    ]
+    images = menu_images()
+    with st.form("menu_form", border=False):
+        edited = st.data_editor(
+            rows,
+            num_rows="dynamic",
+            use_container_width=True,
+            key="menu_editor",
+            column_config={
+                "item": st.column_config.TextColumn("Item", required=True),
+                "price": st.column_config.NumberColumn(
+                    "Price ($)", min_value=0.0, step=0.25, format="%.2f", required=True
+                ),
+                "category": st.column_config.TextColumn("Category"),
+                "modifiers": st.column_config.TextColumn(
+                    "Modifiers", help='e.g. "Cheese:0.50; Onions" (name:extra price)'
+                ),
+                "image": st.column_config.SelectboxColumn(
+                    "Image", options=[""] + images, help=f"File in {IMAGES_DIR}/"
+                ),
+                "ingredients": st.column_config.TextColumn(
+                    "Ingredients",
+                    help='Used per portion, e.g. "bun:1; sausage:1; chili:0.25"',
+                ),
+            },
         )
-        edited_menu.append({"item": name.strip(), "price": float(price)})
-
-    st.markdown("---")
-    new_name = st.text_input("New item name", value="", key="new_item_name")
-    new_price = st.number_input(
-        "New item price ($)",
-        min_value=0.0,
-        value=0.0,
-        step=0.25,
-        format="%.2f",
-        key="new_item_price",
-    )
-    if st.button("Add Item"):
-        if new_name.strip():
-            edited_menu.append(
-                {"item": new_name.strip(), "price": float(new_price)}
+        saved = st.form_submit_button("Save Menu", type="primary")
+    if saved:
+        if hasattr(edited, "to_dict"):
+            edited = edited.to_dict("records")
+        cleaned = [dict(e) for e in edited if str(e.get("item") or "").strip()]
+        for entry in cleaned:
+            if not entry.get("image"):
+                entry["image"] = find_image(entry["item"], IMAGES_DIR)
+        changes = diff_menu(MENU, cleaned)
+        if save_menu(cleaned):
+            st.toast(
+                f"Menu saved: {len(changes['added'])} added, "
+                f"{len(changes['changed'])} changed, {len(changes['removed'])} removed"
             )
-            save_menu(edited_menu)
-            st.rerun()
-
-    if st.button("Save Menu"):
-        cleaned = [e for e in edited_menu if e["item"]]
-        save_menu(cleaned)
-        st.success("Menu saved")
-        st.rerun()
+            st.rerun()  # whole page: the item grid uses the new menu
+        st.info("No changes to save")
 
     if st.button("Reset to Default Menu"):
         save_menu(DEFAULT_MENU.copy())
-        st.success("Menu reset to defaults")
         st.rerun()
 
+
+if st.sidebar.toggle("✏️ Edit Menu", key="edit_menu"):
+    with st.sidebar:
+        menu_editor()
+
+# Inventory: stock levels and alert thresholds, deliveries, and the
+# end-of-day count. Checkout keeps the levels current on its own.
+@st.fragment
+def inventory_panel():
+    store = get_sales_store()
+    stock = store.stock()
+    with st.form("stock_form", border=False):
+        edited = st.data_editor(
+            stock or [{"ingredient": "", "on_hand": 0.0, "low_at": 0.0, "unit": ""}],
+            num_rows="dynamic",
+            use_container_width=True,
+            key="stock_editor",
+            column_config={
+                "ingredient": st.column_config.TextColumn("Ingredient", required=True),
+                "on_hand": st.column_config.NumberColumn("On hand", format="%.2f"),
+                "low_at": st.column_config.NumberColumn(
+                    "Warn at", min_value=0.0, help="Low-stock warning at or below this"
+                ),
+                "unit": st.column_config.TextColumn("Unit"),
+            },
+        )
+        if st.form_submit_button("Save stock", type="primary"):
+            if hasattr(edited, "to_dict"):
+                edited = edited.to_dict("records")
+            kept = set()
+            for row in edited:
+                name = str(row.get("ingredient") or "").strip()
+                if name:
+                    kept.add(name)
+                    store.set_stock(
+                        name, float(row.get("on_hand") or 0),
+                        float(row.get("low_at") or 0), str(row.get("unit") or ""),
+                    )
+            for row in stock:
+                if row["ingredient"] not in kept:
+                    store.drop_stock(row["ingredient"])
+            st.rerun()  # whole page: item buttons show the new levels
+
+    if stock:
+        with st.form("delivery_form", border=False):
+            c1, c2 = st.columns([3, 2])
+            got = c1.selectbox("Delivery of", [r["ingredient"] for r in stock])
+            qty = c2.number_input("Qty", min_value=0.0, step=1.0)
+            if st.form_submit_button("Add delivery"):
+                store.receive_stock(got, qty)
+                st.rerun()
+
+        st.markdown("**End-of-day count**")
+        with st.form("count_form", border=False):
+            counted = st.data_editor(
+                [{"ingredient": r["ingredient"], "counted": r["on_hand"]} for r in stock],
+                disabled=["ingredient"],
+                use_container_width=True,
+                key="count_editor",
+            )
+            if st.form_submit_button("Reconcile"):
+                if hasattr(counted, "to_dict"):
+                    counted = counted.to_dict("records")
+                st.session_state.stock_variance = store.count_stock(
+                    {r["ingredient"]: r["counted"] for r in counted},
+                    date.today().isoformat(),
+                )
+        for name, expected, got_ in st.session_state.get("stock_variance", []):
+            if abs(got_ - expected) > 1e-9:
+                st.caption(f"{name}: expected {expected:g}, counted {got_:g} "
+                           f"({got_ - expected:+g})")
+
+
+if st.sidebar.toggle("📦 Inventory", key="show_inventory"):
+    with st.sidebar:
+        inventory_panel()
+low_stock = [r for r in get_sales_store().stock() if r["on_hand"] <= r["low_at"]]
+if low_stock:
+    st.sidebar.warning(
+        "Low stock: " + ", ".join(f"{r['ingredient']} ({r['on_hand']:g})" for r in low_stock)
+    )
+
 st.sidebar.divider()
 st.session_state.tax_rate = st.sidebar.number_input(
     "Sales Tax Rate (%)",
@@ -278,6 +346,8 @@ st.session_state.card_fee = st.sidebar.number_input(
     value=st.session_state.card_fee,
 )
 
+st.sidebar.toggle("🖼️ Item pictures", value=True, key="show_pictures")
+
 # Default payment for new sale (widget owns st.session_state.default_payment)
 _ = st.sidebar.selectbox(
     "Default Payment Method (for new sale)",
@@ -289,340 +359,672 @@ _ = st.sidebar.selectbox(
 )
 
 if st.sidebar.button("➕ New Sale", type="primary"):
-    st.session_state.cart = []
+    get_drafts().drop(st.session_state.terminal_id, st.session_state.order_id)
+    start_new_order()
+    st.session_state.cart.clear()
     st.session_state.clear_note = True
     st.session_state.clear_cash = True
     st.session_state.payment = st.session_state.default_payment
     st.rerun()
 
+# Held tickets: park the current order and switch between open ones
+held = [
+    (order_id, draft)
+    for order_id, draft in get_drafts().orders(st.session_state.terminal_id)
+    if order_id != st.session_state.order_id
+]
+# (always shown: the cart changes in the order panel without rerunning this)
+today_closed = day_closed()
+if st.sidebar.button(
+    "🅿️ Hold Ticket", key="hold_btn", disabled=today_closed
+) and st.session_state.cart:
+    get_drafts().save(
+        st.session_state.terminal_id, st.session_state.order_id, current_draft()
+    )
+    start_new_order()
+    load_draft(
+        {"lines": [], "payment": st.session_state.default_payment}
+    )
+    st.session_state.draft_saved = None
+    st.rerun()
+if held:
+    with st.sidebar.expander(f"Held tickets ({len(held)})", expanded=True):
+        for order_id, draft in held:
+            if st.button(f"▶️ {draft_label(draft)}", key=f"resume_{order_id}"):
+                drafts = get_drafts()
+                terminal = st.session_state.terminal_id
+                if st.session_state.cart:
+                    # The order on screen is held in its place
+                    drafts.save(terminal, st.session_state.order_id, current_draft())
+                else:
+                    drafts.drop(terminal, st.session_state.order_id)
+                drafts.activate(terminal, order_id)
+                st.session_state.order_id = order_id
+                load_draft(draft)
+                st.rerun()
+
+# Write-behind status: sales are acknowledged before they reach the journal
+pending_sales = get_sale_writer().pending
+if pending_sales:
+    st.sidebar.info(f"💾 Saving {pending_sales} sale(s)…")
+else:
+    st.sidebar.caption("💾 All sales saved")
+
 # Two-step undo confirmation
 if not st.session_state.confirm_undo:
-    if st.sidebar.button("↩️ Undo Last Sale", type="secondary", key="undo_btn"):
+    if st.sidebar.button(
+        "↩️ Undo Last Sale", type="secondary", key="undo_btn", disabled=today_closed
+    ):
         st.session_state.confirm_undo = True
         st.rerun()
 else:
-    st.sidebar.warning("Are you sure you want to remove the last sale?")
+    st.sidebar.warning("Are you sure you want to void this terminal's last sale?")
     c1, c2 = st.sidebar.columns(2)
     if c1.button("Confirm", key="confirm_undo_btn"):
-        if remove_last_sale():
-            st.sidebar.success("Last sale removed")
-        else:
-            st.sidebar.warning("No sales to undo")
+        try:
+            if remove_last_sale(st.session_state.terminal_id):
+                st.sidebar.success("Last sale voided")
+            else:
+                st.sidebar.warning("No sales to undo")
+        except ValueError as e:
+            st.sidebar.error(str(e))
         st.session_state.confirm_undo = False
         st.rerun()
     if c2.button("Cancel", key="cancel_undo_btn"):
         st.session_state.confirm_undo = False
         st.rerun()
 
+# Voids and refunds of any of this terminal's recent sales. Both are added
+# to the journal as reversal rows; the sale itself is never changed.
+with st.sidebar.expander("Void / refund a sale", expanded=False):
+    terminal = st.session_state.terminal_id
+    sales = [s for s in recent_sales(terminal, limit=25) if not s["voided"]]
+    if not sales:
+        st.caption("No sales to void or refund")
+    else:
+        chosen = st.selectbox(
+            "Sale",
+            sales,
+            format_func=lambda s: (
+                f"{s['timestamp'][11:16]}  {format_cents(s['total_cents'])}  "
+                f"{s['items'][:40]}"
+                + (f"  (refunded {format_cents(s['refunded_cents'])})"
+                   if s["refunded_cents"] else "")
+            ),
+            key="reverse_sale",
+        )
+        reason = st.text_input("Reason", key="reverse_reason")
+        left = (chosen["total_cents"] - chosen["refunded_cents"]) / 100
+        refund_amount = st.number_input(
+            "Refund amount ($)", min_value=0.0, max_value=left, value=left,
+            step=0.25, key="refund_amount",
+        )
+        c1, c2 = st.columns(2)
+        try:
+            if c1.button("Void sale", key="void_btn"):
+                void_sales([chosen["uid"]], reason, terminal)
+                st.success("Sale voided")
+            if c2.button("Refund", key="refund_btn"):
+                refund_sale(chosen["uid"], refund_amount, reason=reason, terminal_id=terminal)
+                st.success(f"Refunded ${refund_amount:.2f}")
+        except (KeyError, ValueError) as e:
+            st.error(str(e))
+
+    # Batch: void a whole shift of test sales in one go
+    st.markdown("**Void test sales**")
+    t1, t2 = st.columns(2)
+    shift_from = t1.time_input("From", value=None, key="void_from")
+    shift_to = t2.time_input("To", value=None, key="void_to")
+    sure = st.checkbox("Void all of this terminal's sales in that window today",
+                       key="void_shift_sure")
+    if st.button("Void shift", key="void_shift_btn", disabled=not sure):
+        if shift_from is None or shift_to is None:
+            st.warning("Pick both times first")
+        else:
+            day = date.today().isoformat()
+            try:
+                voided = void_shift(
+                    terminal,
+                    f"{day} {shift_from:%H:%M}:00",
+                    f"{day} {shift_to:%H:%M}:59",
+                )
+            except ValueError as e:
+                st.error(str(e))
+            else:
+                st.success(f"Voided {len(voided)} sale(s)")
+
+# Reprint any past receipt: pick a recent sale or type (the start of) its ID
+with st.sidebar.expander("Reprint a receipt", expanded=False):
+    recent = recent_sales(st.session_state.terminal_id, limit=10)
+    picked = st.selectbox(
+        "Recent sale",
+        [None] + recent,
+        format_func=lambda s: "—" if s is None else (
+            f"{s['timestamp'][11:16]}  {format_cents(s['total_cents'])}  {s['uid'][:12]}"
+        ),
+        key="reprint_pick",
+    )
+    typed = st.text_input("…or Sale ID", key="reprint_id")
+    wanted = typed.strip() or (picked["uid"] if picked else "")
+    if wanted:
+        try:
+            past = find_sale(wanted)
+        except (KeyError, ValueError) as e:
+            st.warning(str(e).strip("'\""))
+        else:
+            receipt = build_receipt_text(past)
+            st.code(receipt, language=None)
+            c1, c2 = st.columns(2)
+            c1.download_button(
+                "⬇️ .txt", data=receipt, file_name=f"receipt_{past['Sale ID'][:12]}.txt",
+                mime="text/plain", key="reprint_dl",
+            )
+            if PRINTER and c2.button("🖨️ Reprint", key="reprint_btn"):
+                print_receipt(past)
+                st.toast("Receipt sent to the printer")
+
+if st.sidebar.button("📤 Export sales.xlsx"):
+    export_sales_xlsx()
+    st.sidebar.success(f"Exported {SALES_XLSX}")
+
+with st.sidebar.expander("Download sales for accounting", expanded=False):
+    today = date.today()
+    dl_range = st.date_input(
+        "Dates", value=(today.replace(day=1), today), key="dl_range"
+    )
+    dl_format = st.radio("Format", ["xlsx", "csv"], horizontal=True, key="dl_format")
+    if len(dl_range) == 2:
+        dl_start, dl_end = (d.isoformat() for d in dl_range)
+        dl_name = f"sales_{dl_start}_{dl_end}.{dl_format}"
+        # Built only when clicked, not on every rerun, and never kept in
+        # the session
+        st.download_button(
+            f"⬇️ Download {dl_format.upper()}",
+            data=export_sales_download(dl_format, dl_start, dl_end),
+            file_name=dl_name,
+            key="dl_sales_btn",
+        )
+
+# Debug timing panel. The toggle switches timing on/off for the process.
+st.sidebar.toggle(
+    "⏱️ Debug timings",
+    value=metrics.enabled(),
+    key="debug_timings",
+    on_change=lambda: metrics.enable(st.session_state.debug_timings),
+)
+
+@st.fragment
+def timing_panel():
+    st.button("↻ Refresh", key="timings_refresh")
+    for what, phases in st.session_state.last_runs.items():
+        rows = "\n".join(f"| {name} | {ms:.1f} |" for name, ms in phases)
+        st.markdown(f"**Last {what} run**\n\n| Phase | ms |\n| --- | ---: |\n{rows}")
+    stats = metrics.summary()
+    if stats:
+        rows = "\n".join(
+            f"| {name} | {s['count']} | {s['p50'] * 1000:.1f} | "
+            f"{s['p95'] * 1000:.1f} | {s['p99'] * 1000:.1f} |"
+            for name, s in stats.items()
+        )
+        st.markdown(
+            "**Rolling percentiles (ms)**\n\n| Phase | n | p50 | p95 | p99 |\n"
+            "| --- | ---: | ---: | ---: | ---: |\n" + rows
+        )
+    where = f"{METRICS_FILE}" + (f" and :{METRICS_PORT}/metrics" if METRICS_PORT else "")
+    st.caption(f"Exported in Prometheus text format to {where}")
+
+if metrics.enabled():
+    with st.sidebar.expander("⏱️ Timings", expanded=True):
+        timing_panel()
+
+_t = metrics.lap("sidebar", _t)
+
 # ---------- Main ----------
 # Optional logo
 header_cols = st.columns([1, 3])
 with header_cols[0]:
-    if LOGO_FILE.exists():
-        st.image(str(LOGO_FILE), use_column_width=True)
+    logo = logo_thumbnail()  # small WebP, cached; not the full-size PNG
+    if logo:
+        st.image(logo, use_column_width=True)
 with header_cols[1]:
     st.title("🌭 Hotdog Stand POS")
-
-# Convenience for card fee rate
-card_fee_rate = st.session_state.card_fee / 100.0
-
-# Item buttons
-st.subheader("Add Items")
-cols_per_row = 3
-cols = st.columns(cols_per_row)
-for i, entry in enumerate(MENU):
-    base_price = float(entry["price"])
-    card_price = base_price * (1 + card_fee_rate)
-    label = (
-        f'{entry["item"]} — '
-        f"${base_price:.2f} cash / ${card_price:.2f} card"
-    )
-    col = cols[i % cols_per_row]
-    if col.button(label, key=f"add_{i}", use_container_width=True):
-        found = False
-        for c in st.session_state.cart:
-            if (
-                c["item"] == entry["item"]
-                and abs(c["price"] - base_price) < 1e-9
-            ):
-                c["qty"] += 1
-                found = True
-                break
-        if not found:
-            st.session_state.cart.append(
-                {"item": entry["item"], "price": base_price, "qty": 1}
-            )
-        st.rerun()
-
-st.divider()
-
-# Cart
-st.subheader("Cart")
-if not st.session_state.cart:
-    st.info("Cart is empty.")
-else:
-    cart_cols = st.columns([5, 3, 3, 2, 2])
-    cart_cols[0].markdown("**Item**")
-    cart_cols[1].markdown("**Price (cash / card)**")
-    cart_cols[2].markdown("**Qty**")
-    cart_cols[3].markdown("**Line Total (cash)**")
-    cart_cols[4].markdown("**Actions**")
-
-    remove_indices = []
-    for idx, line in enumerate(st.session_state.cart):
-        row = st.columns([5, 3, 3, 2, 2])
-        row[0].write(line["item"])
-        cash_price = line["price"]
-        card_price_line = cash_price * (1 + card_fee_rate)
-        row[1].write(
-            f"${cash_price:.2f} / ${card_price_line:.2f}"
+_t = metrics.lap("header", _t)
+
+def add_with_modifiers(entry, i):
+    # A modified item is its own cart line, e.g. "Hotdog (Cheese, Onions)"
+    chosen = st.session_state.get(f"mods_{i}", [])
+    extra = dict(parse_modifiers(entry.get("modifiers")))
+    name = f'{entry["item"]} ({", ".join(chosen)})' if chosen else entry["item"]
+    cents = to_cents(entry["price"]) + sum(extra.get(m, 0) for m in chosen)
+    st.session_state.cart.add(name, cents / 100)
+    st.session_state[f"mods_{i}"] = []
+
+
+# The page is split into fragments that rerun on their own: a cart click
+# reruns only the order panel, not the sidebar, receipt or summary.
+# Checkout (and anything in the sidebar) still reruns the whole page.
+@st.fragment
+def order_panel():
+    t0 = t = metrics.clock()
+    # Rates as parts-per-million for the integer-cents pricing engine
+    card_fee_ppm = rate_ppm(st.session_state.card_fee)
+    tax_ppm = rate_ppm(st.session_state.tax_rate)
+
+    # Item buttons, one category at a time so a long menu stays cheap to draw
+    st.subheader("Add Items")
+    categories = sorted({e.get("category", "") for e in MENU} - {""})
+    shown = "All"
+    if categories:
+        shown = st.radio(
+            "Category", ["All"] + categories, horizontal=True, key="menu_category",
+            label_visibility="collapsed",
         )
+    cols_per_row = 3
+    cols = st.columns(cols_per_row)
+    # Portions left per item, from the stock levels alone
+    availability = get_sales_store().item_availability()
+    visible = [
+        (i, entry) for i, entry in enumerate(MENU)
+        if shown == "All" or entry.get("category", "") == shown
+    ]
+    for n, (i, entry) in enumerate(visible):
+        base_price = float(entry["price"])
+        base_cents = to_cents(base_price)
+        card_cents = base_cents + apply_rate(base_cents, card_fee_ppm)
+        label = (
+            f'{entry["item"]} — '
+            f"{format_cents(base_cents)} cash / {format_cents(card_cents)} card"
+        )
+        left, low = availability.get(entry["item"], (None, False))
+        sold_out = left == 0
+        if sold_out:
+            label = f"🚫 Sold out · {label}"
+        elif low:
+            label = f"⚠️ {left} left · {label}"
+        col = cols[n % cols_per_row]
+        if st.session_state.show_pictures:
+            thumb = item_thumbnail(entry)
+            if thumb:
+                col.image(thumb, width=96)
+        mods = parse_modifiers(entry.get("modifiers"))
+        if not mods:
+            col.button(
+                label,
+                key=f"add_{i}",
+                use_container_width=True,
+                disabled=sold_out,
+                on_click=st.session_state.cart.add,  # O(1) merge
+                args=(entry["item"], base_price),
+            )
+            continue
+        with col.popover(label, use_container_width=True, disabled=sold_out):
+            st.multiselect(
+                "Modifiers",
+                [name for name, _ in mods],
+                format_func=lambda name, mods=dict(mods): (
+                    f"{name} (+{format_cents(mods[name])})" if mods[name] else name
+                ),
+                key=f"mods_{i}",
+            )
+            st.button(
+                "Add", key=f"add_{i}", on_click=add_with_modifiers, args=(entry, i)
+            )
 
-        # Quantity with quick buttons
-        q_cols = row[2].columns([1, 1, 1, 1, 1])
-        if q_cols[0].button("−", key=f"minus_{idx}"):
-            line["qty"] = max(1, line["qty"] - 1)
-        q_cols[1].write(line["qty"])
-        if q_cols[2].button("+1", key=f"plus1_{idx}"):
-            line["qty"] += 1
-        if q_cols[3].button("+2", key=f"plus2_{idx}"):
-            line["qty"] += 2
-        if q_cols[4].button("+5", key=f"plus5_{idx}"):
-            line["qty"] += 5
-
-        row[3].write(f"${line['qty'] * line['price']:.2f}")
-        if row[4].button("Remove", key=f"rm_{idx}"):
-            remove_indices.append(idx)
-
-    for i in sorted(remove_indices, reverse=True):
-        st.session_state.cart.pop(i)
-    if remove_indices:
-        st.rerun()
+    t = metrics.lap("add items", t)
+    st.divider()
 
-# Notes with flag reset
-default_note = "" if st.session_state.clear_note else st.session_state.get("note", "")
-st.text_area("Notes (optional)", key="note", value=default_note)
-st.session_state.clear_note = False
+    # Cart
+    st.subheader("Cart")
+    if not st.session_state.cart:
+        st.info("Cart is empty.")
+    else:
+        cart_cols = st.columns([5, 3, 3, 2, 2])
+        cart_cols[0].markdown("**Item**")
+        cart_cols[1].markdown("**Price (cash / card)**")
+        cart_cols[2].markdown("**Qty**")
+        cart_cols[3].markdown("**Line Total (cash)**")
+        cart_cols[4].markdown("**Actions**")
+
+        cart = st.session_state.cart
+        for idx, line in enumerate(cart):
+            row = st.columns([5, 3, 3, 2, 2])
+            row[0].write(line.item)
+            card_price_line = line.price_cents + apply_rate(line.price_cents, card_fee_ppm)
+            row[1].write(
+                f"{format_cents(line.price_cents)} / {format_cents(card_price_line)}"
+            )
 
-# Payment method
-st.subheader("Payment Method")
-st.session_state.payment = st.radio(
-    "Select payment method:",
-    ["Cash", "Card", "Other"],
-    index=["Cash", "Card", "Other"].index(st.session_state.payment),
-    horizontal=True,
-)
+            # Quantity with quick buttons
+            # (callbacks change the cart before the panel reruns, so one
+            # click is one run and the panel never shows a stale quantity)
+            q_cols = row[2].columns([1, 1, 1, 1, 1])
+            q_cols[0].button(
+                "−", key=f"minus_{idx}",
+                on_click=cart.set_qty, args=(line.key, max(1, line.qty - 1)),
+            )
+            q_cols[1].write(line.qty)
+            for col, step in zip(q_cols[2:], (1, 2, 5)):
+                col.button(
+                    f"+{step}", key=f"plus{step}_{idx}",
+                    on_click=cart.set_qty, args=(line.key, line.qty + step),
+                )
+
+            row[3].write(format_cents(line.total_cents))
+            row[4].button("Remove", key=f"rm_{idx}", on_click=cart.remove, args=(line.key,))
+
+    t = metrics.lap("cart render", t)
+
+    # Notes with flag reset. Widgets keyed to session_state (also seeded by
+    # load_draft) take no value=: the state is set before they are drawn.
+    if st.session_state.clear_note:
+        st.session_state.note = ""
+        st.session_state.clear_note = False
+    st.text_area("Notes (optional)", key="note")
+
+    # Payment method
+    st.subheader("Payment Method")
+    st.session_state.payment = st.radio(
+        "Select payment method:",
+        ["Cash", "Card", "Other"],
+        index=["Cash", "Card", "Other"].index(st.session_state.payment),
+        horizontal=True,
+    )
 
-# Visual feedback
-if st.session_state.payment == "Card":
-    st.info("💳 Card payment selected – card fee will be applied.")
-elif st.session_state.payment == "Cash":
-    st.success("💵 Cash payment selected – no card fee.")
-else:
-    st.warning("Other payment method selected – no automatic fee applied.")
+    # Visual feedback
+    if st.session_state.payment == "Card":
+        st.info("💳 Card payment selected – card fee will be applied.")
+    elif st.session_state.payment == "Cash":
+        st.success("💵 Cash payment selected – no card fee.")
+    else:
+        st.warning("Other payment method selected – no automatic fee applied.")
 
-# Discount & Tip
-disc_tip_cols = st.columns(2)
-disc_tip_cols[0].number_input(
-    "Discount ($)",
-    min_value=0.0,
-    step=0.25,
-    key="discount",
-)
-disc_tip_cols[1].number_input(
-    "Tip ($)",
-    min_value=0.0,
-    step=0.25,
-    key="tip",
-)
+    # Discount & Tip
+    disc_tip_cols = st.columns(2)
+    disc_tip_cols[0].number_input(
+        "Discount ($)",
+        min_value=0.0,
+        step=0.25,
+        key="discount",
+    )
+    disc_tip_cols[1].number_input(
+        "Tip ($)",
+        min_value=0.0,
+        step=0.25,
+        key="tip",
+    )
 
-# Cash received
-default_cash = (
-    0.0 if st.session_state.clear_cash else st.session_state.get("cash_received", 0.0)
-)
-cash_received = st.number_input(
-    "Cash Received",
-    min_value=0.0,
-    step=0.25,
-    value=float(default_cash),
-    key="cash_received",
-)
-st.session_state.clear_cash = False
+    # Cash received
+    if st.session_state.clear_cash:
+        st.session_state.cash_received = 0.0
+        st.session_state.clear_cash = False
+    cash_received = st.number_input(
+        "Cash Received",
+        min_value=0.0,
+        step=0.25,
+        key="cash_received",
+    )
 
-# Totals
-subtotal = cart_subtotal(st.session_state.cart)
-discount = float(st.session_state.get("discount", 0.0))
-discount = max(0.0, min(discount, subtotal))  # clamp
-effective_subtotal = round(subtotal - discount, 2)
+    # Snapshot the open order (one appended log line, only when it changed)
+    draft = current_draft()
+    if draft != st.session_state.draft_saved and (
+        st.session_state.draft_saved is not None or draft["lines"] or draft["note"]
+    ):
+        get_drafts().save(st.session_state.terminal_id, st.session_state.order_id, draft)
+        st.session_state.draft_saved = draft
+
+    t = metrics.lap("order inputs", t)
+
+    # Totals (integer cents; cash and card totals come out of one pass)
+    totals_c = compute_totals(
+        st.session_state.cart.subtotal_cents,  # maintained incrementally
+        discount_cents=to_cents(st.session_state.get("discount", 0.0)),
+        tip_cents=to_cents(st.session_state.get("tip", 0.0)),
+        tax_ppm=tax_ppm,
+        card_fee_ppm=card_fee_ppm,
+        payment=st.session_state.payment,
+        cash_received_cents=to_cents(st.session_state.cash_received),
+    )
 
-tax_amt = round(effective_subtotal * (st.session_state.tax_rate / 100.0), 2)
-tip_amt = round(float(st.session_state.get("tip", 0.0)), 2)
+    totals = st.columns(5)
+    totals[0].metric("Subtotal", format_cents(totals_c.subtotal))
+    totals[1].metric("Discount", f"-{format_cents(totals_c.discount)}")
+    totals[2].metric("Tax", format_cents(totals_c.tax))
+    totals[3].metric("Tip", format_cents(totals_c.tip))
+    totals[4].metric("Card Fee (if card)", format_cents(totals_c.card_fee_if_card))
+
+    cash_card_cols = st.columns(2)
+    cash_card_cols[0].metric("Cash Total", format_cents(totals_c.cash_total))
+    cash_card_cols[1].metric("Card Total", format_cents(totals_c.card_total))
+
+    st.metric("Change Due (based on selected payment)", format_cents(totals_c.change_due))
+
+    metrics.lap("totals", t)
+
+    # Checkout (not once today is closed out: the day takes no more sales)
+    closed = day_closed()
+    if closed:
+        st.warning("Today is closed out – no more sales can be recorded for it.")
+    checkout_clicked = st.button(
+        "✅ Checkout & Save",
+        disabled=len(st.session_state.cart) == 0 or closed,
+        use_container_width=True,
+    )
 
-base_total = effective_subtotal + tax_amt + tip_amt
-card_fee_for_card = round(base_total * card_fee_rate, 2)
+    if checkout_clicked:
+        # Basic validation for cash sales
+        cash_received_cents = to_cents(st.session_state.cash_received)
+        if st.session_state.payment == "Cash" and cash_received_cents < totals_c.amount_due:
+            st.error(
+                f"Cash received ({format_cents(cash_received_cents)}) "
+                f"is less than amount due ({format_cents(totals_c.amount_due)})."
+            )
+        else:
+            timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+            record = {
+                "Timestamp": timestamp,
+                "Date": date.today().isoformat(),
+                "Items": format_items_string(st.session_state.cart.rows()),
+                "Lines": st.session_state.cart.rows(),
+                "Subtotal": totals_c.subtotal / 100,
+                "Discount": totals_c.discount / 100,
+                "Tax": totals_c.tax / 100,
+                "Tip": totals_c.tip / 100,
+                "Card Fee": totals_c.card_fee / 100,  # only non-zero if Card selected
+                "Total": totals_c.amount_due / 100,   # cash or card total depending on payment
+                "Payment Method": st.session_state.payment,
+                "Notes": st.session_state.note,
+                "Cash Received": cash_received_cents / 100,
+                "Change": totals_c.change_due / 100,
+                "Terminal": st.session_state.terminal_id,
+            }
+            try:
+                append_sale_to_excel(record)  # spooled now, committed in the background
+            except ValueError as e:
+                # Closed out in the meantime: nothing was recorded, keep the cart
+                st.error(str(e))
+            else:
+                st.session_state.last_sale_id = record["Sale ID"]
 
-cash_total = round(base_total, 2)
-card_total = round(base_total + card_fee_for_card, 2)
+                # Save receipt text for display/print
+                st.session_state.last_receipt = build_receipt_text(record)
+                st.session_state.last_receipt_record = record
 
-# Card fee actually applied only if paying by card
-card_fee_amt = card_fee_for_card if st.session_state.payment == "Card" else 0.0
+                # Reset for next sale
+                get_drafts().drop(st.session_state.terminal_id, st.session_state.order_id)
+                start_new_order()
+                st.session_state.cart.clear()
+                st.session_state.clear_note = True
+                st.session_state.clear_cash = True
+                finish_run("order panel", t0)
+                st.rerun()  # whole page: receipt, summary and sidebar change too
 
-# Amount actually due based on chosen payment method
-if st.session_state.payment == "Card":
-    amount_due = card_total
-else:
-    amount_due = cash_total
-
-totals = st.columns(5)
-totals[0].metric("Subtotal", f"${subtotal:.2f}")
-totals[1].metric("Discount", f"-${discount:.2f}")
-totals[2].metric("Tax", f"${tax_amt:.2f}")
-totals[3].metric("Tip", f"${tip_amt:.2f}")
-totals[4].metric("Card Fee (if card)", f"${card_fee_for_card:.2f}")
-
-cash_card_cols = st.columns(2)
-cash_card_cols[0].metric("Cash Total", f"${cash_total:.2f}")
-cash_card_cols[1].metric("Card Total", f"${card_total:.2f}")
-
-change_due = max(0.0, round(st.session_state.cash_received - amount_due, 2))
-st.metric("Change Due (based on selected payment)", f"${change_due:.2f}")
-
-# Checkout
-checkout_clicked = st.button(
-    "✅ Checkout & Save",
-    disabled=len(st.session_state.cart) == 0,
-    use_container_width=True,
-)
+    finish_run("order panel", t0)
 
-if checkout_clicked:
-    # Basic validation for cash sales
-    if st.session_state.payment == "Cash" and st.session_state.cash_received + 1e-9 < amount_due:
-        st.error(
-            f"Cash received (${st.session_state.cash_received:.2f}) "
-            f"is less than amount due (${amount_due:.2f})."
-        )
-    else:
-        timestamp = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
-        record = {
-            "Timestamp": timestamp,
-            "Date": date.today().isoformat(),
-            "Items": format_items_string(st.session_state.cart),
-            "Subtotal": subtotal,
-            "Discount": discount,
-            "Tax": tax_amt,
-            "Tip": tip_amt,
-            "Card Fee": card_fee_amt,  # only non-zero if Card selected
-            "Total": amount_due,       # cash or card total depending on payment
-            "Payment Method": st.session_state.payment,
-            "Notes": st.session_state.note,
-            "Cash Received": st.session_state.cash_received,
-            "Change": change_due,
-        }
-        append_sale_to_excel(record)
-        st.success("Sale saved!")
-
-        # Save receipt text for display/print
-        st.session_state.last_receipt = build_receipt_text(record)
-
-        # Reset for next sale
-        st.session_state.cart = []
-        st.session_state.clear_note = True
-        st.session_state.clear_cash = True
-        st.rerun()
 
 # Show last receipt (with print & download options)
-if st.session_state.last_receipt:
-    st.subheader("🧾 Last Receipt")
-
-    safe_receipt = escape(st.session_state.last_receipt)
-    st.markdown(
-        f"<div id='receipt-block'><pre>{safe_receipt}</pre></div>",
-        unsafe_allow_html=True,
-    )
-
-    bcol1, bcol2 = st.columns(2)
-    with bcol1:
-        st.download_button(
-            "⬇️ Download Receipt (.txt)",
-            data=st.session_state.last_receipt,
-            file_name=f"receipt_{date.today().isoformat()}.txt",
-            mime="text/plain",
+@st.fragment
+def receipt_panel():
+    t0 = metrics.clock()
+    if st.session_state.last_receipt:
+        st.subheader("🧾 Last Receipt")
+        last_status = get_sale_writer().status(st.session_state.get("last_sale_id"))
+        if last_status == "committed":
+            st.success("Sale saved!")
+        elif last_status == "failed":
+            st.error("Sale could not be saved – it was set aside in the rejected-sales file.")
+        elif last_status == "pending":
+            st.info("Sale recorded – saving in the background…")
+
+        safe_receipt = escape(st.session_state.last_receipt)
+        st.markdown(
+            f"<div id='receipt-block'><pre>{safe_receipt}</pre></div>",
+            unsafe_allow_html=True,
         )
-    with bcol2:
-        if st.button("🖨️ Print Receipt"):
-            # Trigger browser print dialog – CSS above makes it only print the receipt block
-            st.markdown(
-                "<script>window.print();</script>",
-                unsafe_allow_html=True,
+
+        bcol1, bcol2 = st.columns(2)
+        with bcol1:
+            st.download_button(
+                "⬇️ Download Receipt (.txt)",
+                data=st.session_state.last_receipt,
+                file_name=f"receipt_{date.today().isoformat()}.txt",
+                mime="text/plain",
             )
+        with bcol2:
+            if st.button("🖨️ Print Receipt"):
+                if PRINTER:
+                    # Queued: a slow or offline printer never holds up the page
+                    print_receipt(st.session_state.last_receipt_record)
+                    st.toast("Receipt sent to the printer")
+                else:
+                    # Trigger browser print dialog – CSS above makes it only print the receipt block
+                    st.markdown(
+                        "<script>window.print();</script>",
+                        unsafe_allow_html=True,
+                    )
+    finish_run("receipt", t0)
+
+
+order_panel()
+receipt_panel()
 
 # ---------- Daily Summary ----------
-st.subheader("📈 Today’s Summary")
-df_sales = safe_read_sales()
-if not df_sales.empty and "Date" in df_sales.columns:
+# Its own fragment, so the raw-data toggle doesn't rerun the page either
+@st.fragment
+def summary_panel():
+    t0 = metrics.clock()
+    st.subheader("📈 Today’s Summary")
     today_str = date.today().isoformat()
-    todays = df_sales[df_sales["Date"] == today_str]
-    if not todays.empty:
-        cols = st.columns(4)
-        cols[0].metric("Transactions", f"{len(todays)}")
-        cols[1].metric(
-            "Revenue (pre-tax subtotal)",
-            f"${todays['Subtotal'].sum():.2f}",
-        )
-        if "Card Fee" in todays.columns:
+    # Running totals maintained by checkout/undo: constant time per rerun
+    day_totals = get_sales_store().daily_totals(today_str)
+    if not get_sales_store().is_empty():
+        if day_totals.transactions:
+            cols = st.columns(4)
+            cols[0].metric("Transactions", f"{day_totals.transactions}")
+            cols[1].metric(
+                "Revenue (pre-tax subtotal)",
+                f"${day_totals.dollars('subtotal_cents'):.2f}",
+            )
             cols[2].metric(
-                "Card Fees Collected", f"${todays['Card Fee'].sum():.2f}"
+                "Card Fees Collected", f"${day_totals.dollars('card_fee_cents'):.2f}"
             )
+            cols[3].metric("Revenue (total)", f"${day_totals.dollars('total_cents'):.2f}")
+
+            # Split by payment type; expected drawer is cash received minus change
+            cols2 = st.columns(4)
+            cols2[0].metric("Cash Revenue", f"${day_totals.dollars('cash_total_cents'):.2f}")
+            cols2[1].metric("Card Revenue", f"${day_totals.dollars('card_total_cents'):.2f}")
+            cols2[2].metric("Other Revenue", f"${day_totals.dollars('other_total_cents'):.2f}")
+            cols2[3].metric(
+                "Expected Cash in Drawer", f"${day_totals.dollars('drawer_cents'):.2f}"
+            )
+
+            # Tips & discounts
+            cols3 = st.columns(2)
+            cols3[0].metric("Tips Collected", f"${day_totals.dollars('tip_cents'):.2f}")
+            cols3[1].metric("Discounts Given", f"${day_totals.dollars('discount_cents'):.2f}")
+
+            # Top items today
+            top_items = get_sales_store().item_totals(today_str, limit=10)
+            if top_items:
+                # Markdown table: st.table would import pandas on every rerun
+                rows = "\n".join(
+                    f"| {escape(item).replace('|', '&#124;')} | {qty} | ${cents / 100:.2f} |"
+                    for item, qty, cents in top_items
+                )
+                st.markdown(
+                    "**Top Items Today (by quantity sold)**\n\n"
+                    "| Item | Quantity Sold | Revenue |\n| --- | ---: | ---: |\n" + rows
+                )
+            else:
+                st.info("No item breakdown available for today.")
+
+            # A toggle rather than an expander: expander bodies run on every
+            # rerun, and this is the only part of the summary that needs pandas.
+            if st.toggle("Show Today’s Sales (raw data)", key="show_raw_sales"):
+                todays = safe_read_sales(today_str)  # indexed: only today's rows
+                st.dataframe(todays, use_container_width=True)
         else:
-            cols[2].metric("Card Fees Collected", "$0.00")
-        cols[3].metric("Revenue (total)", f"${todays['Total'].sum():.2f}")
-
-        # Split by payment type
-        cash_sales = todays[todays["Payment Method"] == "Cash"]
-        card_sales = todays[todays["Payment Method"] == "Card"]
-        other_sales = todays[
-            (~todays["Payment Method"].isin(["Cash", "Card"]))
-        ]
-
-        cash_rev = cash_sales["Total"].sum() if not cash_sales.empty else 0.0
-        card_rev = card_sales["Total"].sum() if not card_sales.empty else 0.0
-        other_rev = other_sales["Total"].sum() if not other_sales.empty else 0.0
-
-        # Expected cash drawer (from today's cash sales)
-        if (
-            "Cash Received" in todays.columns
-            and "Change" in todays.columns
-        ):
-            drawer_cash = (cash_sales["Cash Received"] - cash_sales["Change"]).sum()
-        else:
-            drawer_cash = cash_rev
-
-        cols2 = st.columns(4)
-        cols2[0].metric("Cash Revenue", f"${cash_rev:.2f}")
-        cols2[1].metric("Card Revenue", f"${card_rev:.2f}")
-        cols2[2].metric("Other Revenue", f"${other_rev:.2f}")
-        cols2[3].metric("Expected Cash in Drawer", f"${drawer_cash:.2f}")
-
-        # Tips & discounts
-        tip_total = todays["Tip"].sum() if "Tip" in todays.columns else 0.0
-        disc_total = todays["Discount"].sum() if "Discount" in todays.columns else 0.0
-        cols3 = st.columns(2)
-        cols3[0].metric("Tips Collected", f"${tip_total:.2f}")
-        cols3[1].metric("Discounts Given", f"${disc_total:.2f}")
-
-        # Top items today
-        item_counts = parse_item_counts(todays)
-        if item_counts:
-            st.markdown("**Top Items Today (by quantity sold)**")
-            top_items = item_counts.most_common(10)
-            top_df = pd.DataFrame(top_items, columns=["Item", "Quantity Sold"])
-            st.table(top_df)
-        else:
-            st.info("No item breakdown available for today.")
+            st.info("No sales today yet.")
+    else:
+        st.info("No sales data yet.")
+    finish_run("summary", t0)
+
+
+summary_panel()
 
-        with st.expander("Show Today’s Sales (raw data)"):
-            st.dataframe(todays, use_container_width=True)
+
+# ---------- Close-out ----------
+# Count the drawer, freeze the day and print its Z-report. A closed day
+# takes no more sales, voids or refunds, so its report never changes.
+@st.fragment
+def closeout_panel():
+    t0 = metrics.clock()
+    today_str = date.today().isoformat()
+    store = get_sales_store()
+    report = store.closeout(today_str)
+    if report is None:
+        c1, c2 = st.columns(2)
+        opening = c1.number_input(
+            "Opening float ($)", min_value=0.0, step=5.0, key="close_float"
+        )
+        counted = c2.number_input(
+            "Counted cash in drawer ($)", min_value=0.0, step=1.0, key="close_counted"
+        )
+        preview = store.preview_closeout(today_str, to_cents(counted), to_cents(opening))
+        st.caption(
+            f"Expected in drawer {format_cents(preview['expected_drawer_cents'])}, "
+            f"over/short {format_cents(preview['over_short_cents'])}"
+        )
+        sure = st.checkbox(
+            "Close today: no more sales, voids or refunds can be recorded for it",
+            key="close_sure",
+        )
+        if st.button("🔒 Close Day", type="primary", disabled=not sure):
+            try:
+                close_day(today_str, counted, opening, st.session_state.terminal_id)
+            except ValueError as e:
+                st.error(str(e))
+            st.rerun()
     else:
-        st.info("No sales today yet.")
-else:
-    st.info("No sales data yet.")
+        st.success(f"Closed at {report['closed_at']}")
+        st.markdown(closeout.render_html(report), unsafe_allow_html=True)
+        c1, c2 = st.columns(2)
+        c1.download_button(
+            "⬇️ Z-report (.txt)",
+            data=closeout.render_text(report),
+            file_name=f"z_report_{today_str}.txt",
+            mime="text/plain",
+        )
+        c2.download_button(
+            "⬇️ Z-report (.html)",
+            data=closeout.render_html(report, standalone=True),
+            file_name=f"z_report_{today_str}.html",
+            mime="text/html",
+        )
+    finish_run("close-out", t0)
+
+
+# A toggle, not an expander: nothing is computed until it is opened
+if st.toggle("🔒 Close Out Day", key="show_closeout"):
+    closeout_panel()
+finish_run("page", _page_started)
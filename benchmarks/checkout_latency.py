@@ -0,0 +1,55 @@
+# benchmarks/checkout_latency.py
+# Checkout acknowledgement latency with the write-behind writer.
+#
+#   python -m benchmarks.checkout_latency [--history 100000] [--sales 500]
+#
+# Measures the time from "checkout" (SaleWriter.submit) to the sale being
+# acknowledged, which is all the UI waits for before clearing the cart, and
+# separately how long the background writer takes to commit everything.
+import argparse
+import statistics
+import tempfile
+import time
+from pathlib import Path
+
+from benchmarks.summary_latency import synthetic_sales
+from pos.sale_writer import SaleWriter
+from pos.sales_store import SalesStore
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, default=100_000)
+    parser.add_argument("--sales", type=int, default=500)
+    parser.add_argument("--interval", type=float, default=0.0,
+                        help="seconds between checkouts (0 = back to back)")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SalesStore(Path(tmp) / "sales.db")
+        store.append_many(synthetic_sales(args.history, 0))
+        writer = SaleWriter(store)
+
+        acks = []
+        t_start = time.perf_counter()
+        for record in synthetic_sales(0, args.sales):
+            t0 = time.perf_counter()
+            writer.submit(record)
+            acks.append(time.perf_counter() - t0)
+            if args.interval:
+                time.sleep(args.interval)
+        writer.flush()
+        drained = time.perf_counter() - t_start
+        writer.close()
+        store.close()
+
+    acks.sort()
+    q = statistics.quantiles(acks, n=100)
+    print(f"history {args.history}, {args.sales} checkouts")
+    print(f"ack p50 {q[49] * 1000:.3f} ms  p99 {q[98] * 1000:.3f} ms  "
+          f"max {acks[-1] * 1000:.3f} ms")
+    print(f"all committed after {drained * 1000:.1f} ms")
+
+
+if __name__ == "__main__":
+    main()
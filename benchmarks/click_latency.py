@@ -0,0 +1,152 @@
+# benchmarks/click_latency.py
+# Server time per cart click: the app before fragments vs. the current tree.
+#
+#   python -m benchmarks.click_latency [--clicks 50] [--history 50000]
+#                                      [--baseline REV]
+#
+# Drives app.py with AppTest against a journal holding --history sales
+# (today's summary included), clicking "Add" and "+1" buttons. The same
+# clicks run against two trees, each in a fresh interpreter building the
+# journal with its own SalesStore:
+#
+#   before  --baseline (default: the commit just before the order panel
+#           became a fragment), extracted with git archive. Measured: the
+#           time spent running the script for every run a click caused (the
+#           click and the st.rerun() that refreshed the cart).
+#   after   this checkout. AppTest reruns the whole page even for a click
+#           inside a fragment, so the figure is the order-panel fragment's
+#           own time from the app's timings (POS_METRICS=1), which is what
+#           a browser click reruns. The whole page's script time, measured
+#           like "before", is shown alongside for reference.
+#
+# Both sides leave out Streamlit's own work around a run (diffing and
+# sending the page), which AppTest doesn't reproduce.
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tarfile
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+FRAGMENTS_COMMIT = r"^\[user-017\]"  # subject of the commit adding fragments
+
+CLICK_SNIPPET = """
+import json, time
+from streamlit.runtime.scriptrunner import script_runner
+from streamlit.testing.v1 import AppTest
+from benchmarks.summary_latency import synthetic_sales
+from pos.sales_store import SalesStore
+
+runs = []
+exec_script = script_runner.exec_func_with_error_handling
+def timed(func, ctx):  # one script run: widget callbacks and the script body
+    t0 = time.perf_counter()
+    try:
+        return exec_script(func, ctx)
+    finally:
+        runs.append((time.perf_counter() - t0) * 1000)
+script_runner.exec_func_with_error_handling = timed
+
+store = SalesStore("sales.db")
+store.append_many(synthetic_sales({history}, 300))
+store.close()
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.run()
+assert not at.exception, at.exception
+per_click = []
+for i in range({clicks}):
+    del runs[:]
+    at.button(key="add_0" if i % 2 == 0 else "plus1_0").click().run()
+    assert not at.exception, at.exception
+    per_click.append(sum(runs))
+timings = list(at.session_state["run_timings"]) if "run_timings" in at.session_state else []
+print(json.dumps({{"clicks": per_click, "timings": timings}}))
+"""
+
+
+def median_ms(timings, what):
+    values = [ms for name, ms in timings if name == what]
+    return statistics.median(values) if values else float("nan")
+
+
+def _git(*args) -> str:
+    return subprocess.run(
+        ["git", *args], cwd=ROOT, capture_output=True, text=True, check=True
+    ).stdout.strip()
+
+
+def default_baseline() -> str:
+    # The oldest match: later commits with the same tag are follow-up fixes
+    # made after the fragments were already in
+    found = _git("log", "--reverse", "--format=%H", f"--grep={FRAGMENTS_COMMIT}")
+    commit = found.splitlines()[0] if found else ""
+    if not commit:
+        sys.exit("no fragments commit in this history; pass --baseline REV")
+    return f"{commit}^"
+
+
+def extract(rev, dest: Path):
+    """Check out rev's tree into dest without touching this checkout."""
+    archive = subprocess.run(
+        ["git", "archive", "--format=tar", rev],
+        cwd=ROOT, capture_output=True, check=True,
+    ).stdout
+    tar_path = dest.with_suffix(".tar")
+    tar_path.write_bytes(archive)
+    with tarfile.open(tar_path) as tar:
+        tar.extractall(dest)
+    tar_path.unlink()
+
+
+def click_times(tree: Path, clicks, history) -> dict:
+    with tempfile.TemporaryDirectory() as data:
+        shutil.copy(tree / "menu.csv", data)
+        out = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                CLICK_SNIPPET.format(
+                    app=str(tree / "app.py"), clicks=clicks, history=history
+                ),
+            ],
+            cwd=data,
+            env=dict(os.environ, PYTHONPATH=str(tree), POS_METRICS="1"),
+            capture_output=True,
+            text=True,
+        )
+    if out.returncode:
+        sys.exit(f"{tree}: clicks failed\n{out.stderr[-2000:]}")
+    return json.loads(out.stdout.splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--clicks", type=int, default=50)
+    parser.add_argument("--history", type=int, default=50_000)
+    parser.add_argument("--baseline", help="git revision to compare against")
+    args = parser.parse_args()
+
+    baseline = args.baseline or default_baseline()
+    with tempfile.TemporaryDirectory() as tmp:
+        before_tree = Path(tmp) / "before"
+        extract(baseline, before_tree)
+        before = click_times(before_tree, args.clicks, args.history)
+    after = click_times(ROOT, args.clicks, args.history)
+
+    before_ms = statistics.median(before["clicks"])
+    panel_ms = median_ms(after["timings"], "order panel")
+    page_ms = statistics.median(after["clicks"])
+    rev = _git("rev-parse", "--short", baseline)
+    print(f"before ({rev}): per click, all runs  {before_ms:8.1f} ms")
+    print(f"after: per click, order panel      {panel_ms:8.1f} ms")
+    print(f"after: whole page, if rerun        {page_ms:8.1f} ms")
+    print(f"speed-up                           {before_ms / panel_ms:8.1f}x")
+
+
+if __name__ == "__main__":
+    main()
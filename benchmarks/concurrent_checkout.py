@@ -0,0 +1,146 @@
+# benchmarks/concurrent_checkout.py
+# Stress test: many terminals checking out against one sales journal.
+#
+#   python -m benchmarks.concurrent_checkout [--processes 2] [--terminals 8] [--sales 200]
+#
+# Each process opens the journal and its single SaleWriter; each terminal
+# is a thread that rings up sales and undoes some of its own. At the end
+# every surviving sale must be in the journal exactly once, every undone
+# sale must be voided, and the running totals must match the rows. Exits
+# non-zero on any lost or misattributed record.
+import argparse
+import multiprocessing as mp
+import sys
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+from pos.sale_writer import open_writer
+from pos.sales_store import SalesStore, new_sale_uid, open_store
+
+UNDO_EVERY = 10  # each terminal undoes every 10th sale it rings up
+
+
+def _terminal(writer, terminal_id, n_sales, kept, undone):
+    today = date.today().isoformat()
+    for i in range(n_sales):
+        uid = new_sale_uid()
+        writer.submit(
+            {
+                "Timestamp": f"{today} 12:00:00",
+                "Date": today,
+                "Items": "1x Hotdog @ 2.25",
+                "Subtotal": 2.25,
+                "Total": 2.25,
+                "Payment Method": "Cash",
+                "Cash Received": 2.25,
+                "Terminal": terminal_id,
+                "Sale ID": uid,
+            }
+        ).result()
+        if (i + 1) % UNDO_EVERY == 0:
+            assert writer.submit_undo(terminal_id).result()
+            undone.append(uid)
+        else:
+            kept.append(uid)
+
+
+def _process(db_path, proc_no, n_terminals, n_sales, out):
+    # One spool per process, as with one Streamlit server per spool
+    writer = open_writer(
+        open_store(db_path), spool_path=Path(db_path).with_suffix(f".{proc_no}.spool")
+    )
+    kept, undone, threads = [], [], []
+    for t in range(n_terminals):
+        th = threading.Thread(
+            target=_terminal,
+            args=(writer, f"P{proc_no}-T{t}", n_sales, kept, undone),
+        )
+        threads.append(th)
+        th.start()
+    for th in threads:
+        th.join()
+    writer.close()
+    out.put((kept, undone))
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--processes", type=int, default=2)
+    parser.add_argument("--terminals", type=int, default=8)
+    parser.add_argument("--sales", type=int, default=200)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        db_path = Path(tmp) / "sales.db"
+        SalesStore(db_path).close()  # run migrations once up front
+
+        ctx = mp.get_context("spawn")
+        out = ctx.Queue()
+        t0 = time.perf_counter()
+        procs = [
+            ctx.Process(
+                target=_process,
+                args=(db_path, p, args.terminals, args.sales, out),
+            )
+            for p in range(args.processes)
+        ]
+        for p in procs:
+            p.start()
+        kept, undone = set(), set()
+        for _ in procs:
+            k, u = out.get()
+            kept.update(k)
+            undone.update(u)
+        for p in procs:
+            p.join()
+        elapsed = time.perf_counter() - t0
+
+        store = SalesStore(db_path)
+        rows = store._conn.execute(
+            "SELECT sale_uid FROM sales s WHERE kind = 'sale' AND NOT EXISTS "
+            "(SELECT 1 FROM sales v WHERE v.reverses_uid = s.sale_uid)"
+        ).fetchall()
+        uids = [r[0] for r in rows]
+        voided = {
+            r[0]
+            for r in store._conn.execute(
+                "SELECT reverses_uid FROM sales WHERE kind = 'void'"
+            )
+        }
+        totals = store.daily_totals(date.today().isoformat())
+
+    expected = args.processes * args.terminals * args.sales
+    problems = []
+    if len(uids) != len(set(uids)):
+        problems.append("duplicate sales in the journal")
+    if set(uids) != kept:
+        problems.append(
+            f"{len(kept - set(uids))} sales lost, "
+            f"{len(set(uids) - kept)} unexpected sales present"
+        )
+    if undone & set(uids) or voided != undone:
+        problems.append(
+            f"{len(undone - voided)} undone sales not voided, "
+            f"{len(voided - undone)} voided by mistake"
+        )
+    if totals.transactions != len(uids):
+        problems.append(
+            f"daily totals count {totals.transactions} != {len(uids)} rows"
+        )
+
+    print(
+        f"{expected} checkouts + {len(undone)} undos from "
+        f"{args.processes * args.terminals} terminals in {elapsed:.2f}s "
+        f"({expected / elapsed:.0f} sales/s)"
+    )
+    if problems:
+        print("FAIL: " + "; ".join(problems))
+        sys.exit(1)
+    print(f"OK: {len(uids)} sales kept, none lost or duplicated")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+# benchmarks/report_latency.py
+# Date-range report latency over the rollup tables.
+#
+#   python -m benchmarks.report_latency [--days 400] [--per-day 300]
+#
+# Fills a journal with --days of history and times sales_report() for the
+# last 7 days, 30 days and 12 months.
+import argparse
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+from pos.reporting import sales_report
+from pos.sales_store import SalesStore
+
+PAYMENTS = ["Cash", "Card", "Other"]
+
+
+def history(days, per_day):
+    today = date.today()
+    for d in range(days):
+        day = (today - timedelta(days=d)).isoformat()
+        for i in range(per_day):
+            yield {
+                "Timestamp": f"{day} {8 + i % 12:02d}:{i % 60:02d}:00",
+                "Date": day,
+                "Items": f"{1 + i % 3}x Hotdog @ 2.25; 1x Soda @ 1.50",
+                "Subtotal": 2.25 * (1 + i % 3) + 1.5,
+                "Total": 2.25 * (1 + i % 3) + 1.5,
+                "Payment Method": PAYMENTS[i % 3],
+            }
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--days", type=int, default=400)
+    parser.add_argument("--per-day", type=int, default=300)
+    parser.add_argument("--repeat", type=int, default=10)
+    args = parser.parse_args()
+
+    today = date.today()
+    with tempfile.TemporaryDirectory() as tmp:
+        store = SalesStore(Path(tmp) / "sales.db")
+        store.append_many(history(args.days, args.per_day))
+        for label, days in (("7 days", 7), ("30 days", 30), ("12 months", 365)):
+            start = (today - timedelta(days=days - 1)).isoformat()
+            timings = []
+            for _ in range(args.repeat):
+                t0 = time.perf_counter()
+                sales_report(store, start, today.isoformat())
+                timings.append(time.perf_counter() - t0)
+            print(f"{label:>10}: {min(timings) * 1000:7.2f} ms best, "
+                  f"{max(timings) * 1000:7.2f} ms worst")
+        store.close()
+
+
+if __name__ == "__main__":
+    main()
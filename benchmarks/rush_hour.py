@@ -0,0 +1,274 @@
+# benchmarks/rush_hour.py
+# Rush-hour load test of the checkout path, with JSON results for tracking.
+#
+#   python -m benchmarks.rush_hour [--history 1000 100000 1000000]
+#       [--orders 600] [--rate 120] [--terminals 4] [--out rush_hour.jsonl]
+#
+# For each history size a fresh data directory is seeded with that many past
+# sales (in the journal, which is what sales.xlsx is now exported from), then
+# --terminals threads ring up --orders synthetic orders between them at
+# --rate orders per minute overall (0 = as fast as they can) through the same
+# pos.core helpers app.py calls. After every checkout the terminal redraws
+# Today's Summary, as a page rerun would.
+#
+# Measured per history size:
+#   checkout_ack_ms   append_sale_to_excel() returning (what the cashier waits on)
+#   commit_ms         checkout until the sale is committed to the journal
+#   summary_ms        Today's Summary from the running totals
+#   safe_read_sales_ms / parse_item_counts_ms   today's raw rows and item counts
+#   orders_per_min, peak_traced_mb (tracemalloc), max_rss_mb
+#
+# One JSON line per run is appended to --out (timestamp, git revision and
+# parameters included), so regressions show up when runs are compared.
+import argparse
+import json
+import os
+import platform
+import random
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import threading
+import time
+import tracemalloc
+from datetime import date, datetime, timedelta
+from pathlib import Path
+
+from pos import core
+from pos.pricing import compute_totals, rate_ppm
+
+ROOT = Path(__file__).resolve().parent.parent
+SALES_PER_DAY = 300
+PAYMENTS = ["Cash", "Card", "Other"]
+TAX_PPM = rate_ppm(8.0)
+CARD_FEE_PPM = rate_ppm(3.0)
+
+
+def order(rng, terminal, today):
+    """One checkout record as app.py builds it."""
+    lines = [
+        {"item": e["item"], "price": e["price"], "qty": rng.randint(1, 3)}
+        for e in rng.sample(core.DEFAULT_MENU, rng.randint(1, 4))
+    ]
+    subtotal = sum(round(l["price"] * 100) * l["qty"] for l in lines)
+    payment = rng.choice(PAYMENTS)
+    cash = subtotal * 2 if payment == "Cash" else 0
+    t = compute_totals(
+        subtotal, 0, 0, TAX_PPM, CARD_FEE_PPM, payment, cash_received_cents=cash
+    )
+    return {
+        "Timestamp": datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+        "Date": today,
+        "Items": core.format_items_string(lines),
+        "Lines": lines,
+        "Subtotal": t.subtotal / 100,
+        "Discount": 0.0,
+        "Tax": t.tax / 100,
+        "Tip": 0.0,
+        "Card Fee": t.card_fee / 100,
+        "Total": t.amount_due / 100,
+        "Payment Method": payment,
+        "Notes": "",
+        "Cash Received": cash / 100,
+        "Change": t.change_due / 100,
+        "Terminal": terminal,
+    }
+
+
+def history(n, rng, today):
+    for i in range(n):
+        day = (today - timedelta(days=1 + i // SALES_PER_DAY)).isoformat()
+        record = order(rng, "T-seed", day)
+        record["Timestamp"] = f"{day} {8 + i % 12:02d}:{i % 60:02d}:00"
+        yield record
+
+
+def seed(store, n, rng, today, chunk=10_000):
+    rows = history(n, rng, today)
+    while True:
+        batch = [r for _, r in zip(range(chunk), rows)]
+        if not batch:
+            return
+        store.append_many(batch)
+
+
+def render_summary(store, day):
+    # What Today's Summary reads on every page rerun
+    totals = store.daily_totals(day)
+    store.is_empty()
+    store.item_totals(day, limit=10)
+    return totals
+
+
+def percentiles(values):
+    if not values:
+        return None
+    ordered = sorted(values)
+    pick = lambda q: ordered[min(len(ordered) - 1, int(q * len(ordered)))]  # noqa: E731
+    return {
+        "n": len(ordered),
+        "mean": round(statistics.fmean(ordered), 3),
+        "p50": round(pick(0.5), 3),
+        "p95": round(pick(0.95), 3),
+        "p99": round(pick(0.99), 3),
+        "max": round(ordered[-1], 3),
+    }
+
+
+def run_stream(args, today):
+    """Ring up args.orders orders from args.terminals threads at args.rate."""
+    ack_ms, commit_ms, summary_ms = [], [], []
+    lock = threading.Lock()
+    interval = 60.0 * args.terminals / args.rate if args.rate else 0.0
+    per_terminal = [args.orders // args.terminals] * args.terminals
+    per_terminal[0] += args.orders - sum(per_terminal)
+    store = core.get_sales_store()
+
+    def terminal(no, n):
+        rng = random.Random(no)
+        next_at = time.perf_counter()
+        for _ in range(n):
+            if interval:
+                delay = next_at - time.perf_counter()
+                if delay > 0:
+                    time.sleep(delay)
+                next_at += interval
+            record = order(rng, f"T-{no}", today)
+            t0 = time.perf_counter()
+            future = core.append_sale_to_excel(record)
+            t1 = time.perf_counter()
+            future.add_done_callback(
+                lambda _, t0=t0: _append(commit_ms, (time.perf_counter() - t0) * 1000)
+            )
+            render_summary(store, today)
+            t2 = time.perf_counter()
+            with lock:
+                ack_ms.append((t1 - t0) * 1000)
+                summary_ms.append((t2 - t1) * 1000)
+
+    def _append(values, value):
+        with lock:
+            values.append(value)
+
+    threads = [
+        threading.Thread(target=terminal, args=(no, n))
+        for no, n in enumerate(per_terminal)
+    ]
+    t0 = time.perf_counter()
+    for th in threads:
+        th.start()
+    for th in threads:
+        th.join()
+    core.get_sale_writer().flush()
+    elapsed = time.perf_counter() - t0
+    return ack_ms, commit_ms, summary_ms, elapsed
+
+
+def time_call(func, *args, repeat=3):
+    """Median ms of func(*args); None if pandas (reports only) is missing."""
+    times = []
+    for _ in range(repeat):
+        t0 = time.perf_counter()
+        try:
+            result = func(*args)
+        except ImportError:
+            return None, None
+        times.append((time.perf_counter() - t0) * 1000)
+    return round(statistics.median(times), 3), result
+
+
+def bench_history(n, args):
+    today = date.today().isoformat()
+    cwd = os.getcwd()
+    with tempfile.TemporaryDirectory() as tmp:
+        os.chdir(tmp)  # pos.core keeps its files relative to the working dir
+        try:
+            store = core.get_sales_store()
+            t0 = time.perf_counter()
+            seed(store, n, random.Random(n), date.today())
+            seed_s = time.perf_counter() - t0
+
+            tracemalloc.start()
+            ack, commit, summary, elapsed = run_stream(args, today)
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+
+            read_ms, todays = time_call(core.safe_read_sales, today)
+            counts_ms = None
+            if todays is not None:
+                counts_ms, _ = time_call(core.parse_item_counts, todays)
+            core.get_sale_writer().close()
+            store.close()
+        finally:
+            os.chdir(cwd)
+
+    return {
+        "history": n,
+        "seed_seconds": round(seed_s, 2),
+        "checkout_ack_ms": percentiles(ack),
+        "commit_ms": percentiles(commit),
+        "summary_ms": percentiles(summary),
+        "safe_read_sales_ms": read_ms,
+        "parse_item_counts_ms": counts_ms,
+        "orders_per_min": round(len(ack) / elapsed * 60, 1),
+        "peak_traced_mb": round(peak / 2**20, 2),
+        # ru_maxrss is KiB on Linux, bytes on macOS
+        "max_rss_mb": round(
+            resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+            / (2**20 if sys.platform == "darwin" else 2**10),
+            1,
+        ),
+    }
+
+
+def git_revision():
+    try:
+        return subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],
+            cwd=ROOT, capture_output=True, text=True, check=True,
+        ).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--history", type=int, nargs="+", default=[1000, 100_000])
+    parser.add_argument("--orders", type=int, default=600)
+    parser.add_argument("--rate", type=float, default=0.0,
+                        help="orders per minute overall (0 = unthrottled)")
+    parser.add_argument("--terminals", type=int, default=4)
+    parser.add_argument("--out", type=Path, default=Path("rush_hour.jsonl"))
+    args = parser.parse_args()
+    args.out = args.out.resolve()
+
+    results = []
+    for n in args.history:
+        r = bench_history(n, args)
+        results.append(r)
+        ack, summary = r["checkout_ack_ms"], r["summary_ms"]
+        print(
+            f"history {n:>9,}: checkout p50 {ack['p50']:.2f} / p99 {ack['p99']:.2f} ms, "
+            f"summary p50 {summary['p50']:.2f} ms, {r['orders_per_min']:,.0f} orders/min, "
+            f"peak {r['peak_traced_mb']} MB"
+        )
+
+    run = {
+        "benchmark": "rush_hour",
+        "timestamp": datetime.now().isoformat(timespec="seconds"),
+        "git": git_revision(),
+        "python": platform.python_version(),
+        "params": {
+            "orders": args.orders, "rate": args.rate, "terminals": args.terminals,
+        },
+        "results": results,
+    }
+    with args.out.open("a", encoding="utf-8") as f:
+        f.write(json.dumps(run) + "\n")
+    print(f"Results appended to {args.out}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/startup.py
+# Cold-start cost of the POS: module import times and first paint.
+#
+#   python -m benchmarks.startup [--runs 5]
+#
+# Every measurement runs in a fresh interpreter so nothing is pre-imported.
+# "first paint" is one full AppTest run of app.py against an empty data dir,
+# and also reports whether that run ended up importing pandas.
+import argparse
+import json
+import os
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+ROOT = Path(__file__).resolve().parent.parent
+
+IMPORT_SNIPPET = """
+import sys, time
+t0 = time.perf_counter()
+import {module}
+print(time.perf_counter() - t0)
+"""
+
+FIRST_PAINT_SNIPPET = """
+import sys, time
+from streamlit.testing.v1 import AppTest
+t0 = time.perf_counter()
+at = AppTest.from_file({app!r}, default_timeout=120)
+at.run()
+elapsed = time.perf_counter() - t0
+assert not at.exception, at.exception
+print(elapsed, "pandas" in sys.modules)
+"""
+
+
+def _run(snippet, cwd):
+    env = dict(os.environ, PYTHONPATH=str(ROOT))
+    out = subprocess.run(
+        [sys.executable, "-c", snippet],
+        cwd=cwd,
+        env=env,
+        capture_output=True,
+        text=True,
+        check=True,
+    )
+    return out.stdout.split()
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument(
+        "--modules", nargs="+", default=["pos.core", "streamlit", "pandas", "openpyxl"]
+    )
+    args = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as tmp:
+        shutil.copy(ROOT / "menu.csv", tmp)
+        for module in args.modules:
+            times = [
+                float(_run(IMPORT_SNIPPET.format(module=module), tmp)[0])
+                for _ in range(args.runs)
+            ]
+            results[f"import {module}"] = statistics.median(times) * 1000
+
+        paints, pandas_loaded = [], False
+        for _ in range(args.runs):
+            elapsed, loaded = _run(
+                FIRST_PAINT_SNIPPET.format(app=str(ROOT / "app.py")), tmp
+            )
+            paints.append(float(elapsed))
+            pandas_loaded = pandas_loaded or loaded == "True"
+        results["first paint (AppTest run)"] = statistics.median(paints) * 1000
+
+    for name, ms in results.items():
+        print(f"{name:<30} {ms:8.1f} ms")
+    print(f"{'pandas imported on first paint':<30} {pandas_loaded!s:>8}")
+    print(json.dumps({k: round(v, 1) for k, v in results.items()}))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,87 @@
+# benchmarks/summary_latency.py
+# Today's Summary latency vs. size of the sales history.
+#
+#   python -m benchmarks.summary_latency [--sizes 1000 10000 100000 1000000]
+#
+# Each history is spread over past days at ~300 sales/day, plus a fixed
+# number of sales today. With the (date, payment_method) index, the summary
+# only touches today's rows, so latency should stay flat as history grows.
+import argparse
+import tempfile
+import time
+from datetime import date, timedelta
+from pathlib import Path
+
+import pandas as pd
+
+from pos.sales_store import SalesStore
+
+SALES_PER_DAY = 300
+PAYMENTS = ["Cash", "Card", "Other"]
+
+
+def synthetic_sales(n, today_count, today=None):
+    today = today or date.today()
+    for i in range(n + today_count):
+        if i < n:
+            day = today - timedelta(days=1 + i // SALES_PER_DAY)
+        else:
+            day = today
+        subtotal = 2.25 + (i % 7) * 0.75
+        yield {
+            "Timestamp": f"{day.isoformat()} 12:{i % 60:02d}:00",
+            "Date": day.isoformat(),
+            "Items": f"1x Hotdog @ {subtotal:.2f}",
+            "Subtotal": subtotal,
+            "Total": subtotal,
+            "Payment Method": PAYMENTS[i % 3],
+            "Cash Received": subtotal if i % 3 == 0 else 0,
+        }
+
+
+def summarize(store, day):
+    todays = pd.DataFrame(store.records_for_date(day))
+    cash = todays[todays["Payment Method"] == "Cash"]
+    return {
+        "transactions": len(todays),
+        "subtotal": todays["Subtotal"].sum(),
+        "total": todays["Total"].sum(),
+        "drawer": (cash["Cash Received"] - cash["Change"]).sum(),
+    }
+
+
+def run(sizes, today_count, repeat):
+    today = date.today().isoformat()
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        for n in sizes:
+            store = SalesStore(Path(tmp) / f"sales_{n}.db")
+            store.append_many(synthetic_sales(n, today_count))
+            summarize(store, today)  # warm the page cache
+            timings = []
+            for _ in range(repeat):
+                t0 = time.perf_counter()
+                summarize(store, today)
+                timings.append(time.perf_counter() - t0)
+            store.close()
+            timings.sort()
+            results.append((n, timings[len(timings) // 2], timings[-1]))
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=[1_000, 10_000, 100_000, 1_000_000]
+    )
+    parser.add_argument("--today", type=int, default=SALES_PER_DAY)
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    print(f"{'history':>10}  {'median ms':>10}  {'max ms':>8}")
+    for n, median, worst in run(args.sizes, args.today, args.repeat):
+        print(f"{n:>10}  {median * 1000:>10.2f}  {worst * 1000:>8.2f}")
+
+
+if __name__ == "__main__":
+    main()
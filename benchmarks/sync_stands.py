@@ -0,0 +1,96 @@
+# benchmarks/sync_stands.py
+# Two stands and one aggregator, all local: sync cost and correctness.
+#
+#   python -m benchmarks.sync_stands [--sales 5000] [--batch 500]
+#
+# Each stand records --sales sales and undoes one after it was shipped; one
+# batch is resent as if its reply had been lost on the link. Reports bytes
+# on the wire (gzip vs. raw JSON) and checks that the chain totals equal the
+# sum of the stands' own Today's Summary totals.
+import argparse
+import json
+import tempfile
+import threading
+import time
+from datetime import date
+from pathlib import Path
+
+from benchmarks.summary_latency import synthetic_sales
+from pos.daily_totals import TOTAL_FIELDS
+from pos.sales_store import SalesStore
+from pos.sync import SyncClient, _encode, fetch_totals, make_server
+
+
+class CountingClient(SyncClient):
+    def __init__(self, *args, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.raw_bytes = self.wire_bytes = self.posts = 0
+        self.last_payload = None
+
+    def _post(self, payload):
+        self.raw_bytes += len(json.dumps(payload, separators=(",", ":")))
+        self.wire_bytes += len(_encode(payload))
+        self.posts += 1
+        self.last_payload = payload
+        return super()._post(payload)
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--sales", type=int, default=5000)
+    parser.add_argument("--batch", type=int, default=500)
+    args = parser.parse_args()
+    today = date.today().isoformat()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        tmp = Path(tmp)
+        chain = SalesStore(tmp / "chain.db")
+        server = make_server(chain, port=0)
+        threading.Thread(target=server.serve_forever, daemon=True).start()
+        url = f"http://127.0.0.1:{server.server_address[1]}"
+
+        stands = {}
+        for name in ("North", "South"):
+            store = SalesStore(tmp / f"{name}.db")
+            records = list(synthetic_sales(0, args.sales))
+            for r in records:
+                r["Terminal"] = f"{name}-T1"
+            store.append_many(records)
+            stands[name] = (store, CountingClient(store, url, name, args.batch))
+
+        t0 = time.perf_counter()
+        for store, client in stands.values():
+            client.push_once()
+        elapsed = time.perf_counter() - t0
+
+        # Lost reply: the aggregator must not apply the same batch twice
+        north, north_client = stands["North"]
+        north_client._post(north_client.last_payload)
+        # Undo after shipping travels as a void row
+        north.remove_last("North-T1")
+        north_client.push_once()
+
+        chain_totals = fetch_totals(url, today)
+        expected = {
+            f: sum(getattr(s.daily_totals(today), f) for s, _ in stands.values())
+            for f in TOTAL_FIELDS
+        }
+        mismatched = [f for f in TOTAL_FIELDS if chain_totals[f] != expected[f]]
+
+        raw = sum(c.raw_bytes for _, c in stands.values())
+        wire = sum(c.wire_bytes for _, c in stands.values())
+        posts = sum(c.posts for _, c in stands.values())
+        print(f"{2 * args.sales} sales in {posts} batches: {elapsed:.2f}s "
+              f"({2 * args.sales / elapsed:,.0f} sales/s)")
+        print(f"wire {wire / 1024:.0f} KiB gzip vs {raw / 1024:.0f} KiB raw "
+              f"({wire / max(raw, 1):.0%}), {wire / (2 * args.sales):.0f} B/sale")
+        print(f"chain transactions {chain_totals['transactions']} "
+              f"(expected {expected['transactions']}): "
+              + ("OK" if not mismatched else f"MISMATCH in {mismatched}"))
+
+        server.shutdown()
+        server.server_close()
+
+
+if __name__ == "__main__":
+    main()
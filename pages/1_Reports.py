@@ -0,0 +1,153 @@
+# pages/1_Reports.py
+import streamlit as st
+import pandas as pd
+from datetime import date, timedelta
+
+from pos.core import get_sales_store, read_sales_columns
+from pos.reporting import sales_report, terminal_sales
+
+st.set_page_config(page_title="Hotdog Stand POS – Reports", layout="wide")
+st.title("📊 Sales Reports")
+
+# ---------- Range ----------
+today = date.today()
+presets = {
+    "Last 7 days": today - timedelta(days=6),
+    "Last 30 days": today - timedelta(days=29),
+    "Last 12 months": today - timedelta(days=364),
+    "Custom": None,
+}
+preset = st.radio("Range", list(presets), index=1, horizontal=True)
+if presets[preset] is None:
+    picked = st.date_input("Dates", value=(today - timedelta(days=29), today))
+    start, end = (picked if len(picked) == 2 else (picked[0], picked[0]))
+else:
+    start, end = presets[preset], today
+
+report = sales_report(get_sales_store(), start.isoformat(), end.isoformat())
+totals = report["totals"]
+
+
+def dollars(cents):
+    return [c / 100 for c in cents]
+
+
+# ---------- Totals ----------
+if not totals["transactions"]:
+    st.info(f"No sales between {start} and {end}.")
+    st.stop()
+
+cols = st.columns(4)
+cols[0].metric("Transactions", f"{totals['transactions']}")
+cols[1].metric("Revenue (pre-tax subtotal)", f"${totals['subtotal_cents'] / 100:,.2f}")
+cols[2].metric("Revenue (total)", f"${totals['total_cents'] / 100:,.2f}")
+cols[3].metric(
+    "Average Sale", f"${totals['total_cents'] / totals['transactions'] / 100:,.2f}"
+)
+cols2 = st.columns(4)
+cols2[0].metric("Tips Collected", f"${totals['tip_cents'] / 100:,.2f}")
+cols2[1].metric("Discounts Given", f"${totals['discount_cents'] / 100:,.2f}")
+cols2[2].metric("Card Fees Collected", f"${totals['card_fee_cents'] / 100:,.2f}")
+cols2[3].metric("Tax Collected", f"${totals['tax_cents'] / 100:,.2f}")
+
+# ---------- Trends ----------
+by_day = report["by_day"]
+st.subheader("Revenue by Day")
+st.line_chart(
+    pd.DataFrame({"Revenue": dollars(by_day["total_cents"])}, index=pd.to_datetime(by_day["date"]))
+)
+
+left, right = st.columns(2)
+with left:
+    st.subheader("Revenue by Hour of Day")
+    by_hour = report["by_hour"]
+    st.bar_chart(
+        pd.DataFrame(
+            {"Revenue": dollars(by_hour["total_cents"])},
+            index=[f"{h:02d}:00" for h in by_hour["hour"]],
+        )
+    )
+with right:
+    st.subheader("Revenue by Weekday")
+    by_weekday = report["by_weekday"]
+    st.bar_chart(
+        pd.DataFrame(
+            {"Revenue": dollars(by_weekday["total_cents"])},
+            index=pd.CategoricalIndex(
+                by_weekday["weekday"], categories=by_weekday["weekday"], ordered=True
+            ),
+        )
+    )
+
+# ---------- Items & payments ----------
+left, right = st.columns([3, 2])
+with left:
+    st.subheader("Items")
+    items = report["items"]
+    st.dataframe(
+        pd.DataFrame(
+            {
+                "Item": items["item"],
+                "Units Sold": items["qty"],
+                "Revenue": dollars(items["revenue_cents"]),
+            }
+        ),
+        column_config={"Revenue": st.column_config.NumberColumn(format="$%.2f")},
+        hide_index=True,
+        use_container_width=True,
+    )
+with right:
+    st.subheader("Payment Mix")
+    mix = report["payment_mix"]
+    st.dataframe(
+        pd.DataFrame(
+            {"Payment Method": mix["payment_method"], "Revenue": dollars(mix["total_cents"])}
+        ),
+        column_config={"Revenue": st.column_config.NumberColumn(format="$%.2f")},
+        hide_index=True,
+        use_container_width=True,
+    )
+
+# ---------- Terminals & sales ----------
+# Not in the rollups: read from the columnar archive (journal for days not
+# archived yet), only the columns shown
+start_str, end_str = start.isoformat(), end.isoformat()
+st.subheader("Terminals")
+terminals = terminal_sales(
+    read_sales_columns(start_str, end_str, ["terminal_id", "kind", "total_cents"])
+)
+st.dataframe(
+    pd.DataFrame(
+        {
+            "Terminal": terminals["terminal_id"],
+            "Transactions": terminals["transactions"],
+            "Revenue": dollars(terminals["total_cents"]),
+        }
+    ),
+    column_config={"Revenue": st.column_config.NumberColumn(format="$%.2f")},
+    hide_index=True,
+    use_container_width=True,
+)
+
+if st.toggle("Show sales (raw data)", key="report_raw_sales"):
+    sales = read_sales_columns(
+        start_str,
+        end_str,
+        ["timestamp", "terminal_id", "kind", "payment_method", "total_cents", "notes"],
+    ).to_pandas()
+    sales["total_cents"] = sales["total_cents"] / 100
+    st.dataframe(
+        sales.rename(
+            columns={
+                "timestamp": "Timestamp",
+                "terminal_id": "Terminal",
+                "kind": "Kind",
+                "payment_method": "Payment Method",
+                "total_cents": "Total",
+                "notes": "Notes",
+            }
+        ),
+        column_config={"Total": st.column_config.NumberColumn(format="$%.2f")},
+        hide_index=True,
+        use_container_width=True,
+    )
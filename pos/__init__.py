@@ -0,0 +1 @@
+# Core helpers for the Hotdog Stand POS (kept free of Streamlit/pandas imports)
@@ -0,0 +1,240 @@
+# pos/archive.py
+# Columnar archive of closed business days.
+#
+# At rollover every closed day is written once to
+#   archive/date=YYYY-MM-DD/sales.arrow and .../line_items.arrow
+# as uncompressed Arrow IPC files: money in fixed-width int64 cents, payment
+# method / terminal / item as dictionary-encoded categoricals. Readers
+# memory-map the files and pick only the columns they need, so analytics
+# over months of history never touch SQLite or sales.xlsx.
+#
+# A manifest records each archived day's transaction count and total; a
+# day whose running totals change later (e.g. a late sync, or a void dated
+# on it) is re-archived, and until then readers take it from the journal.
+# Voids and refunds are archived as the journal keeps them: their own rows,
+# with kind and the sale they reverse, and negative amounts. Readers sum
+# amounts as they are and count only kind == "sale" rows as transactions.
+import json
+import shutil
+import threading
+from datetime import date, datetime
+from pathlib import Path
+
+MANIFEST = "_manifest.json"
+MONEY_COLUMNS = [
+    "subtotal_cents",
+    "discount_cents",
+    "tax_cents",
+    "tip_cents",
+    "card_fee_cents",
+    "total_cents",
+    "cash_received_cents",
+    "change_cents",
+]
+# Bumped when the partition layout changes; older partitions are rewritten
+# at the next rollover
+FORMAT = 2
+
+_rollover_lock = threading.Lock()
+
+
+def _schemas():
+    import pyarrow as pa
+
+    category = pa.dictionary(pa.int32(), pa.string())
+    sales = pa.schema(
+        [
+            ("sale_id", pa.int64()),
+            ("sale_uid", pa.string()),
+            ("timestamp", pa.timestamp("s")),
+            ("date", pa.date32()),
+            ("terminal_id", category),
+            ("kind", category),
+            ("reverses_uid", pa.string()),
+            ("payment_method", category),
+            *[(col, pa.int64()) for col in MONEY_COLUMNS],
+            ("notes", pa.string()),
+        ]
+    )
+    line_items = pa.schema(
+        [
+            ("sale_id", pa.int64()),
+            ("item", category),
+            ("unit_price_cents", pa.int64()),
+            ("qty", pa.int32()),
+        ]
+    )
+    return sales, line_items
+
+
+def _parse_ts(value):
+    try:
+        return datetime.strptime(value, "%Y-%m-%d %H:%M:%S")
+    except (TypeError, ValueError):
+        return None
+
+
+def partition_dir(archive_dir, day: str) -> Path:
+    return Path(archive_dir) / f"date={day}"
+
+
+def load_manifest(archive_dir) -> dict:
+    path = Path(archive_dir) / MANIFEST
+    if not path.exists():
+        return {}
+    return json.loads(path.read_text(encoding="utf-8"))
+
+
+def _save_manifest(archive_dir, manifest):
+    path = Path(archive_dir) / MANIFEST
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(json.dumps(manifest, indent=1, sort_keys=True), encoding="utf-8")
+    tmp.replace(path)
+
+
+def _write_table(path, table):
+    import pyarrow as pa
+
+    with pa.OSFile(str(path), "wb") as sink:
+        with pa.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+
+
+def _day_tables(store, day: str):
+    """One day of the journal as (sales, line_items) Arrow tables."""
+    import pyarrow as pa
+
+    sales_schema, items_schema = _schemas()
+    rows = store.query(
+        "SELECT id, sale_uid, timestamp, terminal_id, kind, reverses_uid, "
+        f"payment_method, {', '.join(MONEY_COLUMNS)}, notes "
+        "FROM sales WHERE date = ? ORDER BY id",
+        (day,),
+    )
+    lines = store.query(
+        "SELECT li.sale_id, li.item, li.unit_price_cents, li.qty "
+        "FROM sales s JOIN line_items li ON li.sale_id = s.id "
+        "WHERE s.date = ? ORDER BY li.sale_id",
+        (day,),
+    )
+    the_date = date.fromisoformat(day)
+    sales = {
+        "sale_id": [r[0] for r in rows],
+        "sale_uid": [r[1] for r in rows],
+        "timestamp": [_parse_ts(r[2]) for r in rows],
+        "date": [the_date] * len(rows),
+        "terminal_id": [r[3] for r in rows],
+        "kind": [r[4] for r in rows],
+        "reverses_uid": [r[5] for r in rows],
+        "payment_method": [r[6] for r in rows],
+    }
+    for i, col in enumerate(MONEY_COLUMNS, start=7):
+        sales[col] = [r[i] for r in rows]
+    sales["notes"] = [r[7 + len(MONEY_COLUMNS)] for r in rows]
+    items = {name: [r[i] for r in lines] for i, name in enumerate(items_schema.names)}
+    return (
+        pa.Table.from_pydict(sales, schema=sales_schema),
+        pa.Table.from_pydict(items, schema=items_schema),
+    )
+
+
+def archive_day(store, archive_dir, day: str) -> int:
+    """Write one day's sales and line items; returns the number of sales."""
+    sales, items = _day_tables(store, day)
+
+    # Write next to the partition, then swap it in whole
+    final = partition_dir(archive_dir, day)
+    tmp = final.with_name(final.name + ".tmp")
+    shutil.rmtree(tmp, ignore_errors=True)
+    tmp.mkdir(parents=True)
+    _write_table(tmp / "sales.arrow", sales)
+    _write_table(tmp / "line_items.arrow", items)
+    shutil.rmtree(final, ignore_errors=True)
+    tmp.rename(final)
+    return sales.num_rows
+
+
+def _stamp(transactions, total_cents) -> dict:
+    return {"transactions": transactions, "total_cents": total_cents, "format": FORMAT}
+
+
+def rollover(store, archive_dir, today: str = None) -> list:
+    """Archive every closed day (before today) that is new or has changed."""
+    today = today or date.today().isoformat()
+    archive_dir = Path(archive_dir)
+    with _rollover_lock:
+        archive_dir.mkdir(parents=True, exist_ok=True)
+        manifest = load_manifest(archive_dir)
+        archived = []
+        for day, n, total in store.query(
+            "SELECT date, transactions, total_cents FROM daily_totals WHERE date < ?",
+            (today,),
+        ):
+            stamp = _stamp(n, total)
+            if manifest.get(day) == stamp:
+                continue
+            archive_day(store, archive_dir, day)
+            manifest[day] = stamp
+            _save_manifest(archive_dir, manifest)
+            archived.append(day)
+        return archived
+
+
+def archived_days(archive_dir, start: str = None, end: str = None) -> list:
+    days = sorted(load_manifest(archive_dir))
+    return [d for d in days if (start is None or d >= start) and (end is None or d <= end)]
+
+
+def read_archive(
+    archive_dir, start=None, end=None, columns=None, table="sales", only=None
+):
+    """Memory-map archived partitions for start..end (and in only, if
+    given) into one Arrow table.
+
+    Only the requested columns are materialised; the rest of each file is
+    never read from disk.
+    """
+    import pyarrow as pa
+
+    sales_schema, items_schema = _schemas()
+    schema = sales_schema if table == "sales" else items_schema
+    if columns is not None:
+        schema = pa.schema([schema.field(c) for c in columns])
+    parts = []
+    for day in archived_days(archive_dir, start, end):
+        if only is not None and day not in only:
+            continue
+        path = partition_dir(archive_dir, day) / f"{table}.arrow"
+        if not path.exists():
+            continue
+        source = pa.memory_map(str(path), "r")
+        part = pa.ipc.open_file(source).read_all()
+        parts.append(part.select(schema.names) if columns is not None else part)
+    if not parts:
+        return schema.empty_table()
+    return pa.concat_tables(parts)
+
+
+def read_sales(store, archive_dir, start=None, end=None, columns=None, table="sales"):
+    """Columns for start..end: archived days from the archive, the rest
+    (today, days not rolled over yet, or days changed since they were
+    archived) straight from the journal."""
+    import pyarrow as pa
+
+    start, end = start or "0000-01-01", end or "9999-12-31"
+    manifest = load_manifest(archive_dir)
+    days = store.query(
+        "SELECT date, transactions, total_cents FROM daily_totals "
+        "WHERE date BETWEEN ? AND ? ORDER BY date",
+        (start, end),
+    )
+    current = {day for day, n, total in days if manifest.get(day) == _stamp(n, total)}
+    archived = read_archive(archive_dir, start, end, columns, table, only=current)
+    parts = [archived]
+    for day, _, _ in days:
+        if day in current:
+            continue
+        sales, items = _day_tables(store, day)
+        part = sales if table == "sales" else items
+        parts.append(part.select(archived.schema.names))
+    return pa.concat_tables(parts)
@@ -0,0 +1,189 @@
+# pos/backfill.py
+# Bulk import of legacy sales.xlsx workbooks from several stands into one
+# consolidated journal.
+#
+#   python -m pos.backfill north/sales.xlsx south/sales.xlsx --db sales.db
+#   python -m pos.backfill Pier=pier_2025.xlsx Park=park_2025.xlsx -j 4
+#
+# A process pool does the slow part -- openpyxl reading and parsing Items
+# strings into line items -- one workbook per worker; the parent is the only
+# SQLite writer and loads each workbook in batches. A sale without a Sale ID
+# gets one derived from its stand and Timestamp, so the same sale imported
+# twice (or from two copies of a workbook) is dropped by the journal's
+# unique sale_uid. Progress per workbook is committed with each batch, so an
+# interrupted run picks up where it stopped.
+import argparse
+import json
+import os
+import sys
+import time
+import uuid
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from pathlib import Path
+
+from pos.line_items import parse_items_string
+from pos.sales_store import SalesStore, _text
+
+BATCH_SIZE = 1000
+# Fixed namespace so derived sale ids are stable across runs and machines
+SALE_UID_NAMESPACE = uuid.UUID("8d5c8f4e-3b7a-4f0e-9a43-6c2b1e7d5a10")
+
+
+def legacy_sale_uid(terminal, timestamp) -> str:
+    """Deterministic sale id for a legacy row: same stand + Timestamp, same id."""
+    return uuid.uuid5(SALE_UID_NAMESPACE, f"{terminal}|{_text(timestamp)}").hex
+
+
+def parse_source(arg):
+    """"NAME=path" or "path" -> (stand name, path); the name defaults to the
+    workbook's folder (or its file name when it sits in the current one)."""
+    name, sep, path = arg.partition("=")
+    if not sep:
+        name, path = "", arg
+    path = Path(path)
+    if not name:
+        parent = path.resolve().parent
+        name = path.stem if parent == Path.cwd() else parent.name
+    return name, path
+
+
+def read_workbook(path, terminal, sheet_name="Sales", skip=0) -> list:
+    """Worker: workbook rows -> journal records with structured Lines.
+
+    skip drops rows an earlier, interrupted run already loaded.
+    """
+    from openpyxl import load_workbook
+
+    wb = load_workbook(path, read_only=True, data_only=True)
+    try:
+        ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.active
+        rows = ws.iter_rows(values_only=True)
+        header = [str(h) if h is not None else "" for h in next(rows, ())]
+        records = []
+        for row in rows:
+            if not any(v not in (None, "") for v in row):
+                continue
+            record = dict(zip(header, row))
+            if not record.get("Timestamp"):
+                continue
+            records.append(record)
+    finally:
+        wb.close()
+
+    out = []
+    for record in records[skip:]:
+        record["Terminal"] = _text(record.get("Terminal")) or terminal
+        record["Sale ID"] = _text(record.get("Sale ID")) or legacy_sale_uid(
+            record["Terminal"], record["Timestamp"]
+        )
+        record["Lines"] = [
+            {"item": item, "price": cents / 100, "qty": qty}
+            for item, cents, qty in parse_items_string(record.get("Items"))
+        ]
+        out.append(record)
+    return out
+
+
+def _progress_key(path) -> str:
+    return f"backfill:{Path(path).resolve()}"
+
+
+def _signature(path) -> dict:
+    st = Path(path).stat()
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+def load_progress(store, path) -> dict:
+    """Rows already loaded from path, or a fresh start if the file changed."""
+    saved = json.loads(store.get_meta(_progress_key(path), "{}"))
+    if {k: saved.get(k) for k in ("size", "mtime_ns")} != _signature(path):
+        return {**_signature(path), "rows": 0, "done": False}
+    return saved
+
+
+def backfill(store, sources, sheet_name="Sales", workers=None, log=None) -> dict:
+    """Load (stand, path) workbooks into store; returns run statistics."""
+    log = log or (lambda msg: None)
+    stats = {"files": 0, "skipped": 0, "rows": 0, "inserted": 0, "seconds": 0.0}
+    t0 = time.perf_counter()
+
+    pending = {}
+    for terminal, path in sources:
+        progress = load_progress(store, path)
+        if progress["done"]:
+            stats["skipped"] += 1
+            log(f"{path}: already imported, skipping")
+            continue
+        pending[path] = (terminal, progress)
+
+    with ProcessPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(read_workbook, path, terminal, sheet_name, progress["rows"]): path
+            for path, (terminal, progress) in pending.items()
+        }
+        for future in as_completed(futures):
+            path = futures[future]
+            progress = pending[path][1]
+            records = future.result()
+            key = _progress_key(path)
+            inserted = 0
+            for i in range(0, len(records), BATCH_SIZE):
+                batch = records[i : i + BATCH_SIZE]
+                progress["rows"] += len(batch)
+                progress["done"] = i + BATCH_SIZE >= len(records)
+                ids = store.append_many(batch, meta={key: json.dumps(progress)})
+                inserted += sum(1 for sale_id in ids if sale_id is not None)
+            if not records:
+                progress["done"] = True
+                store.append_many([], meta={key: json.dumps(progress)})
+            stats["files"] += 1
+            stats["rows"] += len(records)
+            stats["inserted"] += inserted
+            log(
+                f"{path}: {len(records)} rows, {inserted} new, "
+                f"{len(records) - inserted} duplicates"
+            )
+
+    stats["seconds"] = time.perf_counter() - t0
+    return stats
+
+
+def main(argv=None):
+    from pos.core import SALES_DB, SALES_SHEET
+
+    parser = argparse.ArgumentParser(
+        description="Import legacy sales.xlsx workbooks from several stands"
+    )
+    parser.add_argument(
+        "sources", nargs="+", metavar="[STAND=]PATH",
+        help="workbook to import; the stand defaults to its folder name",
+    )
+    parser.add_argument("--db", type=Path, default=SALES_DB, help="consolidated journal")
+    parser.add_argument("--sheet", default=SALES_SHEET)
+    parser.add_argument("-j", "--workers", type=int, default=os.cpu_count())
+    args = parser.parse_args(argv)
+
+    sources = [parse_source(arg) for arg in args.sources]
+    missing = [str(path) for _, path in sources if not path.exists()]
+    if missing:
+        parser.error(f"no such file: {', '.join(missing)}")
+
+    store = SalesStore(args.db)
+    try:
+        stats = backfill(
+            store, sources, args.sheet, args.workers,
+            log=lambda msg: print(msg, file=sys.stderr),
+        )
+    finally:
+        store.close()
+    rate = stats["rows"] / stats["seconds"] if stats["seconds"] else 0.0
+    print(
+        f"Imported {stats['inserted']} of {stats['rows']} rows from "
+        f"{stats['files']} workbooks ({stats['skipped']} already done) "
+        f"in {stats['seconds']:.1f}s -- {rate:,.0f} rows/s",
+        file=sys.stderr,
+    )
+
+
+if __name__ == "__main__":
+    main()
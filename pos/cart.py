@@ -0,0 +1,90 @@
+# pos/cart.py
+# The in-progress order.
+#
+# Lines are indexed by (item, price in cents), so adding an item is a dict
+# lookup rather than a scan of the cart, and the subtotal is kept up to date
+# on every change instead of being summed on each rerun. Dicts keep
+# insertion order, so lines still display in the order they were added.
+from pos.money import to_cents
+
+
+class CartLine:
+    __slots__ = ("item", "price_cents", "qty")
+
+    def __init__(self, item, price_cents, qty):
+        self.item = item
+        self.price_cents = price_cents
+        self.qty = qty
+
+    @property
+    def key(self):
+        return (self.item, self.price_cents)
+
+    @property
+    def price(self) -> float:
+        return self.price_cents / 100.0
+
+    @property
+    def total_cents(self) -> int:
+        return self.qty * self.price_cents
+
+    def as_dict(self) -> dict:
+        return {"item": self.item, "price": self.price, "qty": self.qty}
+
+
+class Cart:
+    __slots__ = ("_lines", "_subtotal_cents")
+
+    def __init__(self, rows=()):
+        self._lines = {}
+        self._subtotal_cents = 0
+        for row in rows:
+            self.add(row["item"], row["price"], row["qty"])
+
+    def __len__(self):
+        return len(self._lines)
+
+    def __iter__(self):
+        return iter(self._lines.values())
+
+    def __contains__(self, key):
+        return key in self._lines
+
+    def get(self, key):
+        return self._lines.get(key)
+
+    @property
+    def subtotal_cents(self) -> int:
+        return self._subtotal_cents
+
+    @property
+    def subtotal(self) -> float:
+        return self._subtotal_cents / 100.0
+
+    def add(self, item, price, qty=1) -> CartLine:
+        """Add qty of item at a dollar price, merging with an existing line."""
+        key = (item, to_cents(price))
+        line = self._lines.get(key)
+        if line is None:
+            line = self._lines[key] = CartLine(item, key[1], 0)
+        line.qty += qty
+        self._subtotal_cents += qty * line.price_cents
+        return line
+
+    def set_qty(self, key, qty):
+        line = self._lines[key]
+        self._subtotal_cents += (qty - line.qty) * line.price_cents
+        line.qty = qty
+
+    def remove(self, key):
+        line = self._lines.pop(key, None)
+        if line is not None:
+            self._subtotal_cents -= line.total_cents
+
+    def clear(self):
+        self._lines.clear()
+        self._subtotal_cents = 0
+
+    def rows(self) -> list:
+        """Lines as {"item", "price", "qty"} dicts (the record/receipt format)."""
+        return [line.as_dict() for line in self._lines.values()]
@@ -0,0 +1,191 @@
+# pos/closeout.py
+# End-of-day close-out and the Z-report.
+#
+# Closing a day records the counted drawer and freezes the day: the report
+# is built once from the rollups (daily_totals, daily_item_totals,
+# hourly_totals -- plus one indexed pass over that day's voids and refunds)
+# and stored as JSON in day_closeouts. Triggers keep that row immutable and
+# refuse any further journal rows dated on a closed day, so the day's totals
+# can never drift from its Z-report and later reports read the stored
+# snapshot instead of the sales.
+#
+# The report renders as plain text (receipt width, for the printer or a
+# download) and as HTML inside #receipt-block, which the app's print CSS
+# already isolates for the browser's print dialog.
+import json
+from html import escape
+
+from pos.daily_totals import TOTAL_FIELDS
+
+WIDTH = 32  # characters per line on the receipt printer
+
+CREATE_CLOSEOUTS_SQL = """
+CREATE TABLE day_closeouts (
+    date TEXT PRIMARY KEY,
+    closed_at TEXT NOT NULL,
+    closed_by TEXT NOT NULL DEFAULT '',
+    float_cents INTEGER NOT NULL DEFAULT 0,
+    counted_cents INTEGER NOT NULL,
+    report TEXT NOT NULL
+);
+CREATE TRIGGER day_closeouts_no_update BEFORE UPDATE ON day_closeouts BEGIN
+    SELECT RAISE(ABORT, 'a closed day cannot be changed');
+END;
+CREATE TRIGGER day_closeouts_no_delete BEFORE DELETE ON day_closeouts BEGIN
+    SELECT RAISE(ABORT, 'a closed day cannot be changed');
+END;
+CREATE TRIGGER sales_closed_day_insert BEFORE INSERT ON sales
+WHEN EXISTS (SELECT 1 FROM day_closeouts WHERE date = NEW.date) BEGIN
+    SELECT RAISE(ABORT, 'the day is closed');
+END;
+CREATE TRIGGER sales_closed_day_delete BEFORE DELETE ON sales
+WHEN EXISTS (SELECT 1 FROM day_closeouts WHERE date = OLD.date) BEGIN
+    SELECT RAISE(ABORT, 'the day is closed');
+END;
+"""
+
+TOP_ITEMS = 10
+
+
+def build_report(conn, day, counted_cents, float_cents=0) -> dict:
+    """Z-report of one day from its rollups; all money in cents."""
+    row = conn.execute("SELECT * FROM daily_totals WHERE date = ?", (day,)).fetchone()
+    totals = {f: (row[f] if row else 0) for f in TOTAL_FIELDS}
+    reversals = {
+        kind: {"count": n, "cents": -cents}
+        for kind, n, cents in conn.execute(
+            "SELECT kind, COUNT(*), SUM(total_cents) FROM sales "
+            "WHERE date = ? AND kind != 'sale' GROUP BY kind",
+            (day,),
+        )
+    }
+    top_items = [
+        {"item": item, "qty": qty, "revenue_cents": cents}
+        for item, qty, cents in conn.execute(
+            "SELECT item, qty, revenue_cents FROM daily_item_totals "
+            "WHERE date = ? AND qty != 0 ORDER BY qty DESC, item LIMIT ?",
+            (day, TOP_ITEMS),
+        )
+    ]
+    hours = [
+        {"hour": hour, "transactions": n, "total_cents": cents}
+        for hour, n, cents in conn.execute(
+            "SELECT hour, transactions, total_cents FROM hourly_totals "
+            "WHERE date = ? AND (transactions != 0 OR total_cents != 0) ORDER BY hour",
+            (day,),
+        )
+    ]
+    expected = float_cents + totals["drawer_cents"]
+    return {
+        "date": day,
+        "totals": totals,
+        "voids": reversals.get("void", {"count": 0, "cents": 0}),
+        "refunds": reversals.get("refund", {"count": 0, "cents": 0}),
+        "top_items": top_items,
+        "hours": hours,
+        "float_cents": float_cents,
+        "expected_drawer_cents": expected,
+        "counted_drawer_cents": counted_cents,
+        "over_short_cents": counted_cents - expected,
+    }
+
+
+def _money(cents) -> str:
+    sign = "-" if cents < 0 else ""
+    return f"{sign}${abs(cents) / 100:,.2f}"
+
+
+def report_lines(report) -> list:
+    """(label, value) rows of the report; None value = section heading,
+    ("", "") = blank line."""
+    t = report["totals"]
+    rows = [
+        ("Z-REPORT", None),
+        ("Date", report["date"]),
+    ]
+    if report.get("closed_at"):
+        rows.append(("Closed", report["closed_at"]))
+    if report.get("closed_by"):
+        rows.append(("By", report["closed_by"]))
+    rows += [
+        ("", ""),
+        ("SALES", None),
+        ("Transactions", str(t["transactions"])),
+        ("Subtotal", _money(t["subtotal_cents"])),
+        ("Discounts", _money(-t["discount_cents"])),
+        ("Tax", _money(t["tax_cents"])),
+        ("Tips", _money(t["tip_cents"])),
+        ("Card fees", _money(t["card_fee_cents"])),
+        ("Total", _money(t["total_cents"])),
+        ("", ""),
+        ("PAYMENTS", None),
+        ("Cash", _money(t["cash_total_cents"])),
+        ("Card", _money(t["card_total_cents"])),
+        ("Other", _money(t["other_total_cents"])),
+        ("", ""),
+        ("VOIDS / REFUNDS", None),
+        (f"Voids ({report['voids']['count']})", _money(report["voids"]["cents"])),
+        (f"Refunds ({report['refunds']['count']})", _money(report["refunds"]["cents"])),
+        ("", ""),
+        ("DRAWER", None),
+        ("Opening float", _money(report["float_cents"])),
+        ("Cash sales in", _money(t["drawer_cents"])),
+        ("Expected", _money(report["expected_drawer_cents"])),
+        ("Counted", _money(report["counted_drawer_cents"])),
+        ("Over/short", _money(report["over_short_cents"])),
+    ]
+    if report["top_items"]:
+        rows += [("", ""), ("TOP ITEMS", None)]
+        rows += [
+            (f"{i['qty']}x {i['item']}", _money(i["revenue_cents"]))
+            for i in report["top_items"]
+        ]
+    return rows
+
+
+def render_text(report, width=WIDTH) -> str:
+    out = []
+    for label, value in report_lines(report):
+        if value is None:
+            out.append(f" {label} ".center(width, "-"))
+        else:
+            room = width - len(value) - 1
+            out.append(f"{label[:room]:<{room}} {value}" if label else "")
+    return "\n".join(out) + "\n"
+
+
+def render_html(report, standalone=False) -> str:
+    """The report as a #receipt-block table; standalone adds a page shell
+    (with the same print rule) for a download that prints on its own."""
+    cells = []
+    for label, value in report_lines(report):
+        if value is None:
+            cells.append(f"<tr><th colspan='2'>{escape(label)}</th></tr>")
+        elif label:
+            cells.append(
+                f"<tr><td>{escape(label)}</td>"
+                f"<td style='text-align:right'>{escape(value)}</td></tr>"
+            )
+    block = (
+        "<div id='receipt-block'><table style='font-family:monospace'>"
+        + "".join(cells)
+        + "</table></div>"
+    )
+    if not standalone:
+        return block
+    return (
+        "<!DOCTYPE html><html><head><meta charset='utf-8'>"
+        f"<title>Z-report {escape(report['date'])}</title>"
+        "<style>@media print { body * { visibility: hidden; } "
+        "#receipt-block, #receipt-block * { visibility: visible; } "
+        "#receipt-block { position: absolute; left: 0; top: 0; } }</style>"
+        f"</head><body>{block}</body></html>"
+    )
+
+
+def report_from_row(row) -> dict:
+    """Stored day_closeouts row -> report dict."""
+    report = json.loads(row["report"])
+    report["closed_at"] = row["closed_at"]
+    report["closed_by"] = row["closed_by"]
+    return report
@@ -0,0 +1,257 @@
+# pos/core.py
+# Order-taking and sale-recording helpers used by app.py.
+#
+# Nothing here imports pandas or openpyxl at module level, so a cold start
+# (and every checkout) only pays for the standard library. Pandas is loaded
+# on first use by the report/export helpers that need a DataFrame.
+import os
+import tempfile
+import threading
+import uuid
+from collections import Counter
+from datetime import date
+from pathlib import Path
+
+from pos import archive, export, images, inventory, menu_store, metrics, receipts, sync
+from pos.cart import Cart
+from pos.drafts import open_drafts
+from pos.line_items import parse_items_string
+from pos.money import to_cents
+from pos.sale_writer import open_writer
+from pos.sales_store import SALES_COLUMNS, new_sale_uid, open_store
+
+# ---------- Config ----------
+DEFAULT_MENU = [
+    {"item": "Hotdog", "price": 3.50},
+    {"item": "Cheese Dog", "price": 4.00},
+    {"item": "Chili Dog", "price": 4.50},
+    {"item": "Sausage", "price": 5.00},
+    {"item": "Soda", "price": 1.50},
+    {"item": "Water", "price": 1.00},
+    {"item": "Chips", "price": 1.25},
+]
+
+MENU_CSV = Path("menu.csv")
+IMAGES_DIR = Path("Images")  # per-item pictures, e.g. Images/cheese_dog.png
+SALES_DB = Path("sales.db")  # append-only journal (system of record)
+SALES_XLSX = Path("sales.xlsx")  # export for spreadsheet readers
+SALES_SHEET = "Sales"
+LOGO_FILE = Path("logo-bobs-dogz.png")
+LOGO_FALLBACK = Path("Images") / "bob's_dogz.png"
+ARCHIVE_DIR = Path("archive")  # columnar copies of closed days
+DRAFTS_LOG = Path("drafts.jsonl")  # in-progress and held orders
+# Multi-stand sync: set both to ship this stand's sales to an aggregator
+SYNC_URL = os.environ.get("POS_SYNC_URL")
+STAND_NAME = os.environ.get("POS_STAND")
+# Timing metrics (opt-in: POS_METRICS=1); optional Prometheus endpoint port
+METRICS_FILE = Path("metrics.prom")
+METRICS_PORT = os.environ.get("POS_METRICS_PORT")
+# Receipts: layout, and the ESC/POS printer (a device path such as
+# /dev/usb/lp0, or tcp://host:9100); without one, receipts print from the browser
+RECEIPT_CONFIG = receipts.ReceiptConfig(name="Bob's DOGZ")
+PRINTER = os.environ.get("POS_PRINTER")
+
+# ---------- Helpers ----------
+@metrics.timed("load_menu")
+def load_menu():
+    # Cached across sessions; only re-read when menu.csv's mtime/size changes
+    menu = menu_store.load_menu(MENU_CSV, DEFAULT_MENU)
+    _sync_recipes(menu)
+    return menu
+
+_synced_recipes = None
+
+def _sync_recipes(menu):
+    # Checkout decrements stock from the recipes in the journal; copy them
+    # there whenever the menu's ingredients change
+    global _synced_recipes
+    rows = inventory.menu_recipes(menu)
+    if rows != _synced_recipes:
+        get_sales_store().set_recipes(rows)
+        _synced_recipes = rows
+
+def save_menu(menu_list) -> bool:
+    # Only rewrites menu.csv (atomically) if the menu actually changed
+    return menu_store.save_menu(MENU_CSV, menu_list)
+
+def menu_images():
+    if not IMAGES_DIR.is_dir():
+        return []
+    return sorted(p.name for p in IMAGES_DIR.iterdir() if p.suffix.lower() in (".png", ".jpg", ".jpeg"))
+
+def get_sales_store():
+    store = open_store(SALES_DB)
+    # One-time carry-over of sales recorded before the journal existed
+    store.import_legacy_xlsx(SALES_XLSX, SALES_SHEET)
+    return store
+
+def logo_thumbnail():
+    logo = LOGO_FILE if LOGO_FILE.exists() else LOGO_FALLBACK
+    return images.thumbnail(logo, "large")
+
+def item_thumbnail(entry, size="small"):
+    # The menu's image column if set, else Images/<item_name>.png
+    name = entry.get("image") or menu_store.find_image(entry["item"], IMAGES_DIR)
+    return images.thumbnail(IMAGES_DIR / name, size) if name else None
+
+def get_drafts():
+    return open_drafts(DRAFTS_LOG)
+
+def new_terminal_id():
+    return f"T-{uuid.uuid4().hex[:6]}"
+
+def get_sale_writer():
+    return open_writer(get_sales_store())
+
+@metrics.timed("append_sale_to_excel")
+def append_sale_to_excel(record: dict):
+    # Name kept for existing callers. The sale is spooled and acknowledged
+    # at once; the shared writer commits it to the journal in the
+    # background. Returns a Future resolving to the sale id once committed.
+    # sales.xlsx is not touched: rewriting it costs time in proportion to
+    # the whole history, so it is only exported on demand and at close-out.
+    record["Sale ID"] = record.get("Sale ID") or new_sale_uid()
+    return get_sale_writer().submit(record)
+
+def export_sales_xlsx():
+    return get_sales_store().export_xlsx(SALES_XLSX, SALES_SHEET)
+
+def export_sales_download(fmt="xlsx", start=None, end=None):
+    # For the download button: nothing is built until it is clicked, then
+    # Streamlit calls this off the script thread and serves the file once
+    # (a callable data= needs streamlit 1.52, see requirements.txt)
+    def build():
+        with tempfile.TemporaryDirectory() as tmp:
+            path = Path(tmp) / f"sales.{fmt}"
+            export.export(get_sales_store(), path, fmt, start, end, SALES_SHEET)
+            return path.read_bytes()
+    return build
+
+def remove_last_sale(terminal_id=None):
+    # Only ever undoes this terminal's own newest sale (by voiding it)
+    return get_sale_writer().submit_undo(terminal_id).result()
+
+# Voids and refunds go through the sale writer too, so they land after any
+# sale still queued (e.g. the one being voided). Reversal rows, see
+# SalesStore.void; refund amounts are in dollars like the records. A void is
+# dated like its sale, so one on an archived day has that day re-archived.
+def void_sales(sale_ids, reason="", terminal_id=None):
+    store = get_sales_store()
+    writer = get_sale_writer()
+    uids = writer.submit_call(store.void, list(sale_ids), reason, terminal_id).result()
+    rollover_archive_in_background(force=True)
+    return uids
+
+def void_shift(terminal_id, start, end, reason="test transactions"):
+    store = get_sales_store()
+    writer = get_sale_writer()
+    uids = writer.submit_call(
+        store.void_between, terminal_id, start, end, reason
+    ).result()
+    rollover_archive_in_background(force=True)
+    return uids
+
+def refund_sale(sale_id, amount=None, lines=(), reason="", terminal_id=None):
+    store = get_sales_store()
+    cents = None if amount is None else to_cents(amount)
+    return get_sale_writer().submit_call(
+        store.refund, sale_id, cents, list(lines), reason, terminal_id
+    ).result()
+
+def close_day(day, counted, opening_float=0.0, closed_by=""):
+    # Through the writer, so sales still queued for the day are in the report;
+    # amounts in dollars, the report in cents. sales.xlsx is refreshed once
+    # here, in the background, rather than after every sale.
+    report = get_sale_writer().submit_close(
+        day, to_cents(counted), to_cents(opening_float), closed_by
+    ).result()
+    get_sales_store().schedule_export(SALES_XLSX, SALES_SHEET, delay=0)
+    return report
+
+def day_closed(day=None):
+    return get_sales_store().is_closed(day or date.today().isoformat())
+
+def recent_sales(terminal_id=None, limit=20):
+    return get_sales_store().recent_sales(terminal_id, limit)
+
+
+@metrics.timed("safe_read_sales")
+def safe_read_sales(day=None):
+    import pandas as pd  # deferred: only reports need a DataFrame
+
+    store = get_sales_store()
+    records = store.records() if day is None else store.records_for_date(day)
+    if not records:
+        return pd.DataFrame()
+    return pd.DataFrame(records, columns=SALES_COLUMNS)
+
+def read_sales_columns(start=None, end=None, columns=None, table="sales"):
+    # Analytics path: memory-mapped archive for closed days, journal for the rest
+    return archive.read_sales(
+        get_sales_store(), ARCHIVE_DIR, start, end, columns, table
+    )
+
+_last_rollover = None
+
+def rollover_archive_in_background(force=False):
+    # End-of-day rollover: archive newly closed days once per day per process,
+    # or again when forced (a past day changed). Only changed days are written.
+    global _last_rollover
+    today = date.today().isoformat()
+    if _last_rollover == today and not force:
+        return
+    _last_rollover = today
+    threading.Thread(
+        target=archive.rollover,
+        args=(get_sales_store(), ARCHIVE_DIR, today),
+        name="archive-rollover",
+        daemon=True,
+    ).start()
+
+def start_sync_in_background():
+    # No-op unless this stand is configured to sync; started once per process
+    if SYNC_URL and STAND_NAME:
+        sync.start_client(get_sales_store(), SYNC_URL, STAND_NAME)
+
+def start_metrics_exporter():
+    # Writes metrics.prom while timing is enabled; /metrics if a port is set
+    metrics.start_exporter(METRICS_FILE, port=METRICS_PORT)
+
+def cart_subtotal(cart):
+    if isinstance(cart, Cart):
+        return cart.subtotal  # kept up to date by the cart itself
+    return sum(row["qty"] * row["price"] for row in cart)
+
+def format_items_string(cart):
+    return "; ".join(
+        [
+            f'{row["qty"]}x {row["item"]} @ {row["price"]:.2f}'
+            for row in cart
+        ]
+    )
+
+def build_receipt_text(record: dict) -> str:
+    # Compiled template, cached per RECEIPT_CONFIG (see pos/receipts.py)
+    return receipts.render_text(record, RECEIPT_CONFIG)
+
+def print_receipt(record: dict):
+    # Queued for the printer; returns a Future, or None with no printer set
+    if not PRINTER:
+        return None
+    data = receipts.render_escpos(record, RECEIPT_CONFIG)
+    return receipts.open_printer(PRINTER).submit(data)
+
+def find_sale(sale_id):
+    # A past sale (or void/refund) by ID or unique ID prefix, for reprints
+    return get_sales_store().find_record(sale_id)
+
+def parse_item_counts(df) -> Counter:
+    # Only for Items strings from outside the journal (old exports etc.);
+    # recorded sales keep structured line items, see SalesStore.item_totals.
+    counts = Counter()
+    if "Items" not in df.columns:
+        return counts
+    for items in df["Items"].dropna():
+        for item_name, _price, qty in parse_items_string(items):
+            counts[item_name] += qty
+    return counts
@@ -0,0 +1,184 @@
+# pos/daily_totals.py
+# Running totals for one business day, kept in step with the sales journal.
+#
+# Checkout adds a sale's contribution and undo subtracts it again, so the
+# Today's Summary metrics never have to look at individual sales. Voids and
+# refunds are journal rows of their own with negative amounts, so adding
+# them nets the money out; KIND_COUNTS says how they count as transactions.
+
+# Aggregate column -> journal column it sums (None: counts sales)
+TOTAL_FIELDS = {
+    "transactions": None,
+    "subtotal_cents": "subtotal_cents",
+    "discount_cents": "discount_cents",
+    "tax_cents": "tax_cents",
+    "tip_cents": "tip_cents",
+    "card_fee_cents": "card_fee_cents",
+    "total_cents": "total_cents",
+    "cash_total_cents": None,
+    "card_total_cents": None,
+    "other_total_cents": None,
+    "drawer_cents": None,
+}
+
+# A void cancels its sale; a refund gives money back on a sale that happened
+KIND_COUNTS = {"sale": 1, "void": -1, "refund": 0}
+
+
+def sale_count(sale) -> int:
+    """Transactions one journal row adds (rows from before voids are sales)."""
+    kind = sale["kind"] if "kind" in sale.keys() else "sale"
+    return KIND_COUNTS.get(kind, 1)
+
+
+def sale_deltas(sale, sign=1) -> dict:
+    """Contribution of one journal row (mapping of column -> value)."""
+    deltas = {}
+    for field, col in TOTAL_FIELDS.items():
+        deltas[field] = sign * sale[col] if col else 0
+    deltas["transactions"] = sign * sale_count(sale)
+    payment = sale["payment_method"]
+    if payment == "Cash":
+        deltas["cash_total_cents"] = sign * sale["total_cents"]
+        deltas["drawer_cents"] = sign * (
+            sale["cash_received_cents"] - sale["change_cents"]
+        )
+    elif payment == "Card":
+        deltas["card_total_cents"] = sign * sale["total_cents"]
+    else:
+        deltas["other_total_cents"] = sign * sale["total_cents"]
+    return deltas
+
+
+class DailyTotals:
+    __slots__ = ("date",) + tuple(TOTAL_FIELDS)
+
+    def __init__(self, day, **values):
+        self.date = day
+        for field in TOTAL_FIELDS:
+            setattr(self, field, int(values.get(field) or 0))
+
+    @classmethod
+    def from_row(cls, row):
+        return cls(row["date"], **{f: row[f] for f in TOTAL_FIELDS})
+
+    def apply(self, sale, sign=1):
+        for field, delta in sale_deltas(sale, sign).items():
+            setattr(self, field, getattr(self, field) + delta)
+        return self
+
+    def dollars(self, field) -> float:
+        return getattr(self, field) / 100.0
+
+
+# Schema as first created; later columns are added by their own migration
+CREATE_DAILY_TOTALS_SQL = """
+CREATE TABLE daily_totals (
+    date TEXT PRIMARY KEY,
+    transactions INTEGER NOT NULL DEFAULT 0,
+    subtotal_cents INTEGER NOT NULL DEFAULT 0,
+    discount_cents INTEGER NOT NULL DEFAULT 0,
+    tax_cents INTEGER NOT NULL DEFAULT 0,
+    tip_cents INTEGER NOT NULL DEFAULT 0,
+    card_fee_cents INTEGER NOT NULL DEFAULT 0,
+    total_cents INTEGER NOT NULL DEFAULT 0,
+    cash_total_cents INTEGER NOT NULL DEFAULT 0,
+    card_total_cents INTEGER NOT NULL DEFAULT 0,
+    other_total_cents INTEGER NOT NULL DEFAULT 0,
+    drawer_cents INTEGER NOT NULL DEFAULT 0
+);
+INSERT INTO daily_totals
+SELECT
+    date,
+    COUNT(*),
+    SUM(subtotal_cents),
+    SUM(discount_cents),
+    SUM(tax_cents),
+    SUM(tip_cents),
+    SUM(card_fee_cents),
+    SUM(total_cents),
+    SUM(CASE WHEN payment_method = 'Cash' THEN total_cents ELSE 0 END),
+    SUM(CASE WHEN payment_method = 'Card' THEN total_cents ELSE 0 END),
+    SUM(CASE WHEN payment_method NOT IN ('Cash', 'Card') THEN total_cents ELSE 0 END),
+    SUM(CASE WHEN payment_method = 'Cash'
+        THEN cash_received_cents - change_cents ELSE 0 END)
+FROM sales
+GROUP BY date;
+"""
+
+_COLS = ", ".join(TOTAL_FIELDS)
+_MARKS = ", ".join("?" for _ in TOTAL_FIELDS)
+_INCREMENTS = ", ".join(f"{f} = {f} + excluded.{f}" for f in TOTAL_FIELDS)
+UPSERT_SQL = (
+    f"INSERT INTO daily_totals (date, {_COLS}) VALUES (?, {_MARKS}) "
+    f"ON CONFLICT (date) DO UPDATE SET {_INCREMENTS}"
+)
+
+
+def apply_sale(conn, sale, sign=1):
+    """Add (sign=1) or remove (sign=-1) one sale in the persisted totals."""
+    deltas = sale_deltas(sale, sign)
+    conn.execute(UPSERT_SQL, (sale["date"], *(deltas[f] for f in TOTAL_FIELDS)))
+
+
+# ---------- Report rollups ----------
+# Hour-of-day and per-item totals for each day, maintained the same way so
+# date-range reports aggregate a few rows per day instead of raw sales.
+CREATE_ROLLUPS_SQL = """
+CREATE TABLE hourly_totals (
+    date TEXT NOT NULL,
+    hour INTEGER NOT NULL,
+    transactions INTEGER NOT NULL DEFAULT 0,
+    total_cents INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, hour)
+);
+INSERT INTO hourly_totals
+SELECT date, CAST(substr(timestamp, 12, 2) AS INTEGER), COUNT(*), SUM(total_cents)
+FROM sales
+WHERE substr(timestamp, 12, 2) GLOB '[0-2][0-9]'
+GROUP BY 1, 2;
+
+CREATE TABLE daily_item_totals (
+    date TEXT NOT NULL,
+    item TEXT NOT NULL,
+    qty INTEGER NOT NULL DEFAULT 0,
+    revenue_cents INTEGER NOT NULL DEFAULT 0,
+    PRIMARY KEY (date, item)
+);
+INSERT INTO daily_item_totals
+SELECT s.date, li.item, SUM(li.qty), SUM(li.qty * li.unit_price_cents)
+FROM sales s JOIN line_items li ON li.sale_id = s.id
+GROUP BY 1, 2;
+"""
+
+HOURLY_UPSERT_SQL = (
+    "INSERT INTO hourly_totals (date, hour, transactions, total_cents) "
+    "VALUES (?, ?, ?, ?) ON CONFLICT (date, hour) DO UPDATE SET "
+    "transactions = transactions + excluded.transactions, "
+    "total_cents = total_cents + excluded.total_cents"
+)
+ITEM_UPSERT_SQL = (
+    "INSERT INTO daily_item_totals (date, item, qty, revenue_cents) "
+    "VALUES (?, ?, ?, ?) ON CONFLICT (date, item) DO UPDATE SET "
+    "qty = qty + excluded.qty, revenue_cents = revenue_cents + excluded.revenue_cents"
+)
+
+
+def sale_hour(timestamp):
+    """Hour of day from "YYYY-MM-DD HH:MM:SS", or None if malformed."""
+    hour = str(timestamp)[11:13]
+    return int(hour) if hour.isdigit() else None
+
+
+def apply_rollups(conn, sale, lines, sign=1):
+    """Add/remove one sale (and its (item, unit_price_cents, qty) lines)."""
+    hour = sale_hour(sale["timestamp"])
+    if hour is not None:
+        conn.execute(
+            HOURLY_UPSERT_SQL,
+            (sale["date"], hour, sign * sale_count(sale), sign * sale["total_cents"]),
+        )
+    conn.executemany(
+        ITEM_UPSERT_SQL,
+        [(sale["date"], item, sign * qty, sign * qty * price) for item, price, qty in lines],
+    )
@@ -0,0 +1,141 @@
+# pos/drafts.py
+# In-progress orders that survive a server restart.
+#
+# Each terminal has any number of open orders ("held tickets") and one
+# active order. Every change appends one JSON line with that order's full
+# draft (cart lines, note, discount, tip, payment, cash received) -- a few
+# hundred bytes, never a rewrite of the file. On start the log is replayed
+# into a dict, last line wins; once most of the log is superseded it is
+# compacted to one line per open order.
+#
+# Lines are flushed to the OS but not fsynced: a draft is cheap to re-key,
+# and a torn last line after a crash is simply skipped on replay.
+import json
+import os
+import threading
+import uuid
+from collections import OrderedDict
+from pathlib import Path
+
+COMPACT_AFTER = 1000  # superseded lines before the log is rewritten
+
+
+def new_order_id() -> str:
+    return uuid.uuid4().hex[:8]
+
+
+class DraftStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.Lock()
+        self._orders = {}  # terminal -> OrderedDict(order_id -> draft)
+        self._active = {}  # terminal -> order_id
+        self._lines = 0
+        torn = self._replay()
+        self._log = self.path.open("a", encoding="utf-8")
+        if torn:
+            self._log.write("\n")  # don't glue the next event onto it
+
+    # ---------- Reads ----------
+    def active(self, terminal):
+        """(order_id, draft) of the terminal's active order, draft None if unsaved."""
+        with self._lock:
+            order_id = self._active.get(terminal)
+            return order_id, self._orders.get(terminal, {}).get(order_id)
+
+    def orders(self, terminal) -> list:
+        """[(order_id, draft), ...] of the terminal's open orders, oldest first."""
+        with self._lock:
+            return list(self._orders.get(terminal, {}).items())
+
+    def get(self, terminal, order_id):
+        with self._lock:
+            return self._orders.get(terminal, {}).get(order_id)
+
+    # ---------- Writes ----------
+    def save(self, terminal, order_id, draft: dict):
+        with self._lock:
+            self._apply({"t": terminal, "o": order_id, "op": "save", "d": draft})
+
+    def drop(self, terminal, order_id):
+        """Forget an order (checked out or discarded)."""
+        with self._lock:
+            if order_id in self._orders.get(terminal, {}):
+                self._apply({"t": terminal, "o": order_id, "op": "drop"})
+
+    def activate(self, terminal, order_id):
+        with self._lock:
+            if self._active.get(terminal) != order_id:
+                self._apply({"t": terminal, "o": order_id, "op": "active"})
+
+    def close(self):
+        with self._lock:
+            self._log.close()
+
+    # ---------- Log ----------
+    def _apply(self, event, replay=False):
+        terminal, order_id, op = event["t"], event["o"], event["op"]
+        orders = self._orders.setdefault(terminal, OrderedDict())
+        if op == "save":
+            orders[order_id] = event["d"]
+        elif op == "drop":
+            orders.pop(order_id, None)
+        elif op == "active":
+            self._active[terminal] = order_id
+        self._lines += 1
+        if replay:
+            return
+        self._log.write(json.dumps(event, separators=(",", ":")) + "\n")
+        self._log.flush()
+        if self._lines - self._live() > COMPACT_AFTER:
+            self._compact()
+
+    def _live(self) -> int:
+        return sum(len(o) for o in self._orders.values()) + len(self._active)
+
+    def _replay(self) -> bool:
+        """Load the log; True if it ends in a torn (unterminated) line."""
+        if not self.path.exists():
+            return False
+        line = ""
+        with self.path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    self._apply(json.loads(line), replay=True)
+                except (ValueError, KeyError):
+                    continue  # torn last line from a crash mid-write
+        return bool(line) and not line.endswith("\n")
+
+    def _events(self):
+        for terminal, orders in self._orders.items():
+            for order_id, draft in orders.items():
+                yield {"t": terminal, "o": order_id, "op": "save", "d": draft}
+        for terminal, order_id in self._active.items():
+            yield {"t": terminal, "o": order_id, "op": "active"}
+
+    def _compact(self):
+        """Rewrite the log as one line per open order (call with lock held)."""
+        tmp = self.path.with_name(self.path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            for event in self._events():
+                f.write(json.dumps(event, separators=(",", ":")) + "\n")
+            f.flush()
+            os.fsync(f.fileno())
+        self._log.close()
+        tmp.replace(self.path)
+        self._log = self.path.open("a", encoding="utf-8")
+        self._lines = self._live()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_drafts(path) -> DraftStore:
+    """Process-wide draft store per log file, shared by all sessions."""
+    key = str(Path(path).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = DraftStore(path)
+        return store
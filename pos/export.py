@@ -0,0 +1,95 @@
+# pos/export.py
+# Streaming sales exports (xlsx and CSV) for the accountants.
+#
+# Rows come from SalesStore.iter_records one page at a time and go straight
+# out: openpyxl's write-only workbook serialises each row as it is appended,
+# and CSV rows are written to the file one by one. Memory use depends on the
+# page size, not on how many sales the journal holds.
+#
+#   python -m pos.export sales.xlsx --start 2026-01-01 --end 2026-03-31
+#   python -m pos.export q1.csv --start 2026-01-01 --end 2026-03-31
+import argparse
+import csv
+import sys
+import time
+from pathlib import Path
+
+from pos.sales_store import SALES_COLUMNS
+
+FORMATS = ("xlsx", "csv")
+
+
+def _rows(store, start=None, end=None, chunk_size=1000):
+    for record in store.iter_records(start, end, chunk_size):
+        yield [record[col] for col in SALES_COLUMNS]
+
+
+def write_csv(store, path, start=None, end=None, chunk_size=1000) -> int:
+    """Write sales to path as CSV; returns rows written."""
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    n = 0
+    with tmp.open("w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(SALES_COLUMNS)
+        for row in _rows(store, start, end, chunk_size):
+            writer.writerow(row)
+            n += 1
+    tmp.replace(path)
+    return n
+
+
+def write_xlsx(
+    store, path, sheet_name="Sales", start=None, end=None, chunk_size=1000
+) -> int:
+    """Write sales to path with a write-only workbook; returns rows written."""
+    from openpyxl import Workbook
+
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    wb = Workbook(write_only=True)
+    ws = wb.create_sheet(sheet_name)
+    ws.append(SALES_COLUMNS)
+    n = 0
+    for row in _rows(store, start, end, chunk_size):
+        ws.append(row)
+        n += 1
+    # openpyxl picks the format from the file name, so save via a file object
+    with tmp.open("wb") as f:
+        wb.save(f)
+    tmp.replace(path)
+    return n
+
+
+def export(store, path, fmt=None, start=None, end=None, sheet_name="Sales") -> int:
+    fmt = fmt or Path(path).suffix.lstrip(".").lower()
+    if fmt == "csv":
+        return write_csv(store, path, start, end)
+    if fmt == "xlsx":
+        return write_xlsx(store, path, sheet_name, start, end)
+    raise ValueError(f"unknown export format {fmt!r} (expected one of {FORMATS})")
+
+
+def main(argv=None):
+    from pos.core import SALES_SHEET, get_sales_store
+
+    parser = argparse.ArgumentParser(description="Export sales to xlsx or CSV")
+    parser.add_argument("path", help="output file (.xlsx or .csv)")
+    parser.add_argument("--format", choices=FORMATS, help="default: from the file name")
+    parser.add_argument("--start", help="first date, YYYY-MM-DD (inclusive)")
+    parser.add_argument("--end", help="last date, YYYY-MM-DD (inclusive)")
+    args = parser.parse_args(argv)
+
+    t0 = time.perf_counter()
+    try:
+        n = export(
+            get_sales_store(), args.path, args.format, args.start, args.end, SALES_SHEET
+        )
+    except ValueError as exc:
+        parser.error(str(exc))
+    elapsed = time.perf_counter() - t0
+    print(f"Wrote {n} sales to {args.path} in {elapsed:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()
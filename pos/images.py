@@ -0,0 +1,134 @@
+# pos/images.py
+# Item and logo thumbnails for the order screen.
+#
+# The source PNGs are 50-400 KB each; the grid only needs a small picture.
+# Each image is resized once per size to WebP and stored on disk as
+# <THUMB_DIR>/<sha1 of the source>-<px>.webp, so an edited picture gets new
+# thumbnails and an unchanged one is never re-encoded, even across restarts.
+# Thumbnail bytes are then served from a process-wide LRU bounded by total
+# bytes. Source hashes are remembered per (mtime, size), so a rerun costs
+# one stat per picture.
+#
+#   python -m pos.images [Images]   # pre-build every thumbnail
+import hashlib
+import sys
+import threading
+from collections import OrderedDict
+from pathlib import Path
+
+SIZES = {"small": 96, "large": 256}  # longest side in px
+THUMB_DIR = Path(".thumbs")
+MEMORY_LIMIT = 8 * 1024 * 1024  # bytes of thumbnails kept in memory
+WEBP_QUALITY = 80
+
+
+class LRUBytes:
+    """Least-recently-used cache of bytes values, bounded by total size."""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.size = 0
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is not None:
+                self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value: bytes):
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.size -= len(old)
+            if len(value) > self.max_bytes:
+                return
+            self._items[key] = value
+            self.size += len(value)
+            while self.size > self.max_bytes:
+                _, evicted = self._items.popitem(last=False)
+                self.size -= len(evicted)
+
+    def __len__(self):
+        return len(self._items)
+
+
+_memory = LRUBytes(MEMORY_LIMIT)
+_digests = {}  # absolute source path -> ((mtime_ns, size), sha1)
+_digests_lock = threading.Lock()
+
+
+def source_digest(path: Path):
+    """sha1 of the file's content, re-hashed only when mtime/size change."""
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    stamp = (st.st_mtime_ns, st.st_size)
+    key = str(path.resolve())
+    with _digests_lock:
+        cached = _digests.get(key)
+    if cached is not None and cached[0] == stamp:
+        return cached[1]
+    digest = hashlib.sha1(path.read_bytes()).hexdigest()
+    with _digests_lock:
+        _digests[key] = (stamp, digest)
+    return digest
+
+
+def _render(path: Path, px: int) -> bytes:
+    import io
+
+    from PIL import Image
+
+    with Image.open(path) as im:
+        im.thumbnail((px, px))
+        if im.mode not in ("RGB", "RGBA"):
+            im = im.convert("RGBA")
+        out = io.BytesIO()
+        im.save(out, "WEBP", quality=WEBP_QUALITY, method=4)
+    return out.getvalue()
+
+
+def thumbnail(path, size="small", thumb_dir=THUMB_DIR):
+    """WebP bytes of path at SIZES[size], or None if it can't be made."""
+    path = Path(path)
+    digest = source_digest(path)
+    if digest is None:
+        return None
+    px = SIZES[size]
+    key = f"{digest}-{px}"
+    data = _memory.get(key)
+    if data is not None:
+        return data
+    target = Path(thumb_dir) / f"{key}.webp"
+    try:
+        data = target.read_bytes()
+    except OSError:
+        try:
+            data = _render(path, px)
+        except (ImportError, OSError, ValueError):
+            return None  # no Pillow, or not an image: show no picture
+        target.parent.mkdir(parents=True, exist_ok=True)
+        tmp = target.with_name(target.name + ".tmp")
+        tmp.write_bytes(data)
+        tmp.replace(target)
+    _memory.put(key, data)
+    return data
+
+
+def build_all(images_dir, thumb_dir=THUMB_DIR) -> int:
+    """Make every size of every picture in images_dir; returns count made."""
+    n = 0
+    for path in sorted(Path(images_dir).iterdir()):
+        if path.suffix.lower() in (".png", ".jpg", ".jpeg"):
+            for size in SIZES:
+                n += thumbnail(path, size, thumb_dir) is not None
+    return n
+
+
+if __name__ == "__main__":
+    images_dir = sys.argv[1] if len(sys.argv) > 1 else "Images"
+    print(f"{build_all(images_dir)} thumbnails in {THUMB_DIR}/", file=sys.stderr)
@@ -0,0 +1,91 @@
+# pos/inventory.py
+# Ingredient stock, kept in step with the sales journal.
+#
+# A menu entry lists what one portion uses in its "ingredients" column
+# ("bun:1; sausage:1; chili:0.25" -- name, optional quantity, default 1),
+# and a modifier uses one unit of the ingredient of the same name (the
+# "Cheese" modifier takes one "Cheese"). Those recipes are copied into the
+# journal, so checkout decrements stock with one UPDATE per cart line inside
+# the sale's own transaction; a void puts the stock back (its quantities are
+# negative), a refund does not (the food is gone).
+#
+# Only ingredients with a row in stock are tracked. Availability per item
+# comes from stock and recipes alone, never from the sales history, and the
+# end-of-day count resets stock to what was counted, keeping the difference
+# in stock_counts.
+
+CREATE_INVENTORY_SQL = """
+CREATE TABLE recipes (
+    item TEXT NOT NULL,
+    ingredient TEXT NOT NULL,
+    qty REAL NOT NULL,
+    PRIMARY KEY (item, ingredient)
+);
+CREATE TABLE stock (
+    ingredient TEXT PRIMARY KEY,
+    on_hand REAL NOT NULL DEFAULT 0,
+    low_at REAL NOT NULL DEFAULT 0,
+    unit TEXT NOT NULL DEFAULT ''
+);
+CREATE TABLE stock_counts (
+    date TEXT NOT NULL,
+    ingredient TEXT NOT NULL,
+    expected REAL NOT NULL,
+    counted REAL NOT NULL,
+    PRIMARY KEY (date, ingredient)
+);
+"""
+
+USE_STOCK_SQL = (
+    "UPDATE stock SET on_hand = on_hand - ? * ("
+    "SELECT r.qty FROM recipes r WHERE r.item = ? AND r.ingredient = stock.ingredient"
+    ") WHERE ingredient IN (SELECT ingredient FROM recipes WHERE item = ?)"
+)
+
+
+def parse_ingredients(text) -> list:
+    """"bun:1; chili:0.25; onions" -> [("bun", 1.0), ("chili", 0.25), ("onions", 1.0)]."""
+    from pos.menu_store import _text
+
+    out = []
+    for part in _text(text).split(";"):
+        name, _, qty = part.partition(":")
+        if not name.strip():
+            continue
+        try:
+            out.append((name.strip(), float(qty) if qty.strip() else 1.0))
+        except ValueError:
+            continue  # unreadable quantity: leave the ingredient untracked
+    return out
+
+
+def menu_recipes(menu) -> list:
+    """(item, ingredient, qty) rows for the menu's items and modifiers."""
+    from pos.menu_store import parse_modifiers
+
+    rows = {}
+    items = {entry["item"] for entry in menu}
+    for entry in menu:
+        for ingredient, qty in parse_ingredients(entry.get("ingredients")):
+            rows[(entry["item"], ingredient)] = qty
+        for name, _ in parse_modifiers(entry.get("modifiers")):
+            if name not in items:
+                rows.setdefault((name, name), 1.0)
+    return sorted((item, ing, qty) for (item, ing), qty in rows.items())
+
+
+def line_names(item) -> list:
+    """Recipe names in a cart line: "Hotdog (Cheese, Onions)" is a Hotdog
+    plus the Cheese and Onions modifiers."""
+    base, sep, mods = item.partition(" (")
+    if not sep or not mods.endswith(")"):
+        return [item]
+    return [base] + [m.strip() for m in mods[:-1].split(",") if m.strip()]
+
+
+def apply_stock(conn, lines):
+    """Take one sale's (item, unit_price_cents, qty) lines out of stock."""
+    conn.executemany(
+        USE_STOCK_SQL,
+        [(qty, name, name) for item, _, qty in lines for name in line_names(item)],
+    )
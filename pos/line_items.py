@@ -0,0 +1,76 @@
+# pos/line_items.py
+# Structured line items (sale_id, item, unit_price_cents, qty).
+#
+# Sales used to carry their items only as "2x Hotdog @ 3.50; 1x Soda @ 1.50".
+# New sales store their cart lines directly; the helpers here turn legacy
+# Items strings into rows once, so nothing re-parses them at report time.
+import re
+
+from pos.money import to_cents
+
+CREATE_LINE_ITEMS_SQL = """
+CREATE TABLE line_items (
+    sale_id INTEGER NOT NULL REFERENCES sales (id),
+    item TEXT NOT NULL,
+    unit_price_cents INTEGER NOT NULL,
+    qty INTEGER NOT NULL
+);
+CREATE INDEX line_items_by_sale ON line_items (sale_id);
+"""
+
+# "<qty>x <name> @ <price>", where the name may itself contain "x", "@" or
+# ";" -- an entry only ends where the next "; <qty>x " entry starts. Voids
+# and refunds carry negative quantities.
+_ENTRY = re.compile(
+    r"\s*(-?\d+)\s*x\s+(.+?)\s*@\s*(-?\d+(?:\.\d+)?)\s*(?=;\s*-?\d+\s*x\s|;?\s*$)",
+    re.DOTALL,
+)
+
+
+def parse_items_string(items) -> list:
+    """Legacy Items string -> [(item, unit_price_cents, qty), ...]."""
+    lines = []
+    text = "" if items is None else str(items)
+    pos = 0
+    while pos < len(text):
+        m = _ENTRY.match(text, pos)
+        if m is None:
+            # Skip a malformed entry and resync on the next separator
+            nxt = text.find(";", pos)
+            if nxt < 0:
+                break
+            pos = nxt + 1
+            continue
+        qty, name, price = m.groups()
+        lines.append((name, to_cents(price), int(qty)))
+        pos = m.end()
+        if text.startswith(";", pos):
+            pos += 1
+    return lines
+
+
+def cart_lines(lines) -> list:
+    """Cart rows ({"item", "price", "qty"}) -> [(item, unit_price_cents, qty)]."""
+    return [(row["item"], to_cents(row["price"]), int(row["qty"])) for row in lines]
+
+
+def insert_lines(conn, sale_id, lines):
+    conn.executemany(
+        "INSERT INTO line_items (sale_id, item, unit_price_cents, qty) "
+        "VALUES (?, ?, ?, ?)",
+        [(sale_id, item, price, qty) for item, price, qty in lines],
+    )
+
+
+def migrate_items_strings(conn):
+    """One-time backfill of line_items from the Items column of old sales."""
+    rows = conn.execute(
+        "SELECT id, items FROM sales WHERE id NOT IN "
+        "(SELECT DISTINCT sale_id FROM line_items)"
+    ).fetchall()
+    n = 0
+    for sale_id, items in rows:
+        lines = parse_items_string(items)
+        insert_lines(conn, sale_id, lines)
+        n += len(lines)
+    return n
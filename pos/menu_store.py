@@ -0,0 +1,189 @@
+# pos/menu_store.py
+# Menu loading without pandas, cached process-wide.
+#
+# Streamlit reruns the script on every click, so the parsed menu is kept in
+# a module-level cache (shared by all sessions) keyed on the file's mtime
+# and size. The file is stat'ed at most once per STAT_INTERVAL seconds and
+# only re-read when that key changes; save_menu refreshes the cache itself.
+#
+# Besides item and price, an entry may have a category, modifiers
+# ("Cheese:0.50; Onions" -- name, optional extra price), an image file and
+# the ingredients one portion uses (see pos/inventory.py).
+# save_menu is a no-op when nothing changed, and otherwise replaces the file
+# atomically via a temp file.
+import csv
+import json
+import os
+import threading
+import time
+from pathlib import Path
+
+STAT_INTERVAL = 2.0  # seconds between checks for edits made outside the app
+MENU_FIELDS = ["item", "price", "category", "modifiers", "image", "ingredients"]
+
+_cache = {}  # absolute path -> _Entry (abspath: no filesystem access)
+_lock = threading.Lock()
+
+
+class _Entry:
+    __slots__ = ("stamp", "checked_at", "menu")
+
+    def __init__(self, stamp, menu):
+        self.stamp = stamp
+        self.checked_at = time.monotonic()
+        self.menu = menu
+
+
+def _stamp(path: Path):
+    try:
+        st = path.stat()
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size)
+
+
+def _text(value) -> str:
+    if value is None or (isinstance(value, float) and value != value):
+        return ""  # empty cell from the data editor
+    return str(value).strip()
+
+
+def _clean(rows):
+    menu = []
+    for row in rows:
+        entry = dict(row)
+        for field in MENU_FIELDS:
+            if field != "price":
+                entry[field] = _text(entry.get(field))
+        try:
+            price = float(entry.get("price") or 0.0)
+        except (TypeError, ValueError):
+            price = 0.0
+        entry["price"] = 0.0 if price != price else price
+        menu.append(entry)
+    return menu
+
+
+def parse_modifiers(text) -> list:
+    """"Cheese:0.50; Onions" -> [("Cheese", 50), ("Onions", 0)] (cents)."""
+    from pos.money import to_cents
+
+    mods = []
+    for part in _text(text).split(";"):
+        name, _, price = part.partition(":")
+        if name.strip():
+            mods.append((name.strip(), to_cents(price) if price.strip() else 0))
+    return mods
+
+
+def find_image(item, images_dir) -> str:
+    """Image file in images_dir named after the item ("Cheese Dog" ->
+    cheese_dog.png), or "" if there is none."""
+    slug = _text(item).lower().replace(" ", "_")
+    for ext in (".png", ".jpg", ".jpeg"):
+        candidate = Path(images_dir) / (slug + ext)
+        if candidate.exists():
+            return candidate.name
+    return ""
+
+
+def diff_menu(old, new) -> dict:
+    """Item names added, removed and changed between two menus."""
+    old_by_item = {e["item"]: e for e in _clean(old)}
+    new_by_item = {e["item"]: e for e in _clean(new)}
+    return {
+        "added": [i for i in new_by_item if i not in old_by_item],
+        "removed": [i for i in old_by_item if i not in new_by_item],
+        "changed": [
+            i for i, e in new_by_item.items()
+            if i in old_by_item and old_by_item[i] != e
+        ],
+    }
+
+
+def read_menu_file(path: Path):
+    """Parse menu.csv (or a .json list of entries); None if unusable."""
+    try:
+        if path.suffix == ".json":
+            rows = json.loads(path.read_text(encoding="utf-8"))
+            if not isinstance(rows, list):
+                return None
+        else:
+            with path.open(newline="", encoding="utf-8") as f:
+                reader = csv.DictReader(f)
+                fields = reader.fieldnames or []
+                if "item" not in fields or "price" not in fields:
+                    return None
+                rows = list(reader)
+        return _clean(rows)
+    except (OSError, ValueError, TypeError, AttributeError):
+        return None
+
+
+def load_menu(path, default):
+    path = Path(path)
+    key = os.path.abspath(path)
+    now = time.monotonic()
+    with _lock:
+        entry = _cache.get(key)
+        if entry is None or now - entry.checked_at >= STAT_INTERVAL:
+            stamp = _stamp(path)
+            if entry is None or entry.stamp != stamp:
+                menu = read_menu_file(path) if stamp is not None else None
+                entry = _cache[key] = _Entry(stamp, menu)
+            entry.checked_at = now
+        menu = entry.menu
+    if menu is None:
+        return [dict(e) for e in default]
+    return [dict(e) for e in menu]
+
+
+def save_menu(path, menu_list) -> bool:
+    """Write the menu if it differs from what is on disk; True if written."""
+    path = Path(path)
+    menu = _clean(menu_list)
+    fields = _csv_fields(menu)
+    if path.exists() and read_menu_file(path) == menu:
+        if path.suffix == ".json" or _header(path) == fields:
+            return False
+    tmp = path.with_name(path.name + ".tmp")
+    if path.suffix == ".json":
+        tmp.write_text(json.dumps(menu, indent=2), encoding="utf-8")
+    else:
+        with tmp.open("w", newline="", encoding="utf-8") as f:
+            writer = csv.DictWriter(f, fieldnames=fields, extrasaction="ignore")
+            writer.writeheader()
+            writer.writerows(menu)
+    tmp.replace(path)
+    with _lock:
+        _cache[os.path.abspath(path)] = _Entry(_stamp(path), menu)
+    return True
+
+
+def _csv_fields(menu) -> list:
+    fields = list(MENU_FIELDS)
+    for entry in menu:
+        for k in entry:
+            if k not in fields:
+                fields.append(k)
+    # Trailing columns nobody fills in are left out, so a plain menu stays
+    # a plain item,price file
+    while len(fields) > 2 and not any(e.get(fields[-1]) for e in menu):
+        fields.pop()
+    return fields
+
+
+def _header(path: Path):
+    try:
+        with path.open(newline="", encoding="utf-8") as f:
+            return next(csv.reader(f), [])
+    except OSError:
+        return None
+
+
+def invalidate(path=None):
+    with _lock:
+        if path is None:
+            _cache.clear()
+        else:
+            _cache.pop(os.path.abspath(path), None)
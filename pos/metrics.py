@@ -0,0 +1,210 @@
+# pos/metrics.py
+# Opt-in timing of the hot paths, with rolling percentiles.
+#
+# Off unless POS_METRICS=1 (or enable() is called, e.g. from the debug
+# toggle in the sidebar); while off, phase() hands back a shared no-op
+# context manager and timed functions run unwrapped apart from one check.
+#
+# Each named phase keeps its last WINDOW durations, from which p50/p95/p99
+# are computed on demand, plus a running count and sum. The durations of
+# the current Streamlit run are also collected per thread (every session
+# reruns in its own thread) for the sidebar timing panel.
+#
+# Export is Prometheus text format: written atomically to METRICS_FILE
+# (e.g. for node_exporter's textfile collector) every EXPORT_INTERVAL
+# seconds, and served on http://127.0.0.1:$POS_METRICS_PORT/metrics if set.
+import contextlib
+import functools
+import os
+import threading
+import time
+from collections import deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from pathlib import Path
+
+WINDOW = 1024  # samples per phase for the percentiles
+QUANTILES = (0.5, 0.95, 0.99)
+METRICS_FILE = Path("metrics.prom")
+EXPORT_INTERVAL = 15.0
+
+_enabled = os.environ.get("POS_METRICS", "") not in ("", "0")
+_lock = threading.Lock()
+_phases = {}  # name -> _Phase
+_local = threading.local()
+_NULL = contextlib.nullcontext()
+
+
+class _Phase:
+    __slots__ = ("samples", "count", "total")
+
+    def __init__(self):
+        self.samples = deque(maxlen=WINDOW)
+        self.count = 0
+        self.total = 0.0
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def enable(on=True):
+    global _enabled
+    _enabled = bool(on)
+
+
+def record(name, seconds):
+    with _lock:
+        phase = _phases.get(name)
+        if phase is None:
+            phase = _phases[name] = _Phase()
+        phase.samples.append(seconds)
+        phase.count += 1
+        phase.total += seconds
+    run = getattr(_local, "run", None)
+    if run is None:
+        run = _local.run = []
+    run.append((name, seconds * 1000))
+
+
+class _Timer:
+    __slots__ = ("name", "started")
+
+    def __init__(self, name):
+        self.name = name
+
+    def __enter__(self):
+        self.started = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc):
+        record(self.name, time.perf_counter() - self.started)
+        return False
+
+
+def phase(name):
+    """with phase("totals"): ... -- timed only while metrics are enabled."""
+    return _Timer(name) if _enabled else _NULL
+
+
+def clock() -> float:
+    return time.perf_counter()
+
+
+def lap(name, started) -> float:
+    """Record name as running since started (a clock() value); returns now.
+
+    For straight-line script code: t = lap("sidebar", t) between sections.
+    """
+    now = time.perf_counter()
+    if _enabled:
+        record(name, now - started)
+    return now
+
+
+def timed(name):
+    """Decorator form of phase()."""
+    def wrap(func):
+        @functools.wraps(func)
+        def inner(*args, **kwargs):
+            if not _enabled:
+                return func(*args, **kwargs)
+            with _Timer(name):
+                return func(*args, **kwargs)
+        return inner
+    return wrap
+
+
+def take_run() -> list:
+    """[(phase, ms), ...] recorded by this thread since the last call."""
+    run = getattr(_local, "run", None) or []
+    _local.run = []
+    return run
+
+
+def _quantile(ordered, q):
+    # Nearest rank on an already sorted list
+    return ordered[min(len(ordered) - 1, max(0, int(round(q * len(ordered))) - 1))]
+
+
+def summary() -> dict:
+    """{phase: {"count", "sum", "p50", "p95", "p99"}} in seconds."""
+    with _lock:
+        snapshot = {
+            name: (sorted(p.samples), p.count, p.total) for name, p in _phases.items()
+        }
+    out = {}
+    for name, (ordered, count, total) in sorted(snapshot.items()):
+        if not ordered:
+            continue
+        stats = {"count": count, "sum": total}
+        for q in QUANTILES:
+            stats[f"p{int(q * 100)}"] = _quantile(ordered, q)
+        out[name] = stats
+    return out
+
+
+def prometheus_text() -> str:
+    lines = [
+        "# HELP pos_phase_seconds Time spent in a POS phase (rolling window).",
+        "# TYPE pos_phase_seconds summary",
+    ]
+    for name, stats in summary().items():
+        label = name.replace("\\", "\\\\").replace('"', '\\"')
+        for q in QUANTILES:
+            value = stats[f"p{int(q * 100)}"]
+            lines.append(f'pos_phase_seconds{{phase="{label}",quantile="{q}"}} {value:.6f}')
+        lines.append(f'pos_phase_seconds_sum{{phase="{label}"}} {stats["sum"]:.6f}')
+        lines.append(f'pos_phase_seconds_count{{phase="{label}"}} {stats["count"]}')
+    return "\n".join(lines) + "\n"
+
+
+def write_textfile(path=METRICS_FILE):
+    path = Path(path)
+    tmp = path.with_name(path.name + ".tmp")
+    tmp.write_text(prometheus_text(), encoding="utf-8")
+    tmp.replace(path)
+
+
+class _Handler(BaseHTTPRequestHandler):
+    def do_GET(self):
+        if self.path != "/metrics":
+            self.send_error(404)
+            return
+        body = prometheus_text().encode()
+        self.send_response(200)
+        self.send_header("Content-Type", "text/plain; version=0.0.4")
+        self.send_header("Content-Length", str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+_exporter_started = False
+
+
+def start_exporter(path=METRICS_FILE, interval=EXPORT_INTERVAL, port=None):
+    """Write the metrics file periodically (and serve /metrics if port is
+    given); once per process, and only while metrics are enabled."""
+    global _exporter_started
+    with _lock:
+        if _exporter_started:
+            return
+        _exporter_started = True
+
+    def loop():
+        while True:
+            time.sleep(interval)
+            if _enabled and _phases:
+                try:
+                    write_textfile(path)
+                except OSError:
+                    pass
+
+    threading.Thread(target=loop, name="metrics-export", daemon=True).start()
+    if port:
+        server = ThreadingHTTPServer(("127.0.0.1", int(port)), _Handler)
+        threading.Thread(
+            target=server.serve_forever, name="metrics-http", daemon=True
+        ).start()
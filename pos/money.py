@@ -0,0 +1,17 @@
+# pos/money.py
+# Money helpers. Amounts are kept as integer cents everywhere below the UI.
+
+
+def to_cents(value) -> int:
+    try:
+        value = float(value)
+    except (TypeError, ValueError):
+        return 0
+    if value != value:  # NaN from empty spreadsheet cells
+        return 0
+    return int(round(value * 100))
+
+
+def format_cents(cents) -> str:
+    sign = "-" if cents < 0 else ""
+    return f"{sign}${abs(cents) // 100}.{abs(cents) % 100:02d}"
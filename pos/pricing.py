@@ -0,0 +1,93 @@
+# pos/pricing.py
+# Sale totals in integer cents.
+#
+# compute_totals is a pure function of its inputs, so the same code prices
+# the live cart and re-prices historical sales. Percent rates are converted
+# to parts-per-million once, and every rounding step is an exact integer
+# half-up division -- no float drift, so totals reconcile to the cent with
+# the card processor.
+from typing import NamedTuple
+
+from pos.money import to_cents
+
+PPM = 1_000_000
+
+
+def rate_ppm(percent) -> int:
+    """A percentage such as 8.875 as parts-per-million (88750)."""
+    return int(round(float(percent or 0.0) * 10_000))
+
+
+def apply_rate(cents: int, ppm: int) -> int:
+    """cents * rate, rounded half away from zero to a whole cent."""
+    product = cents * ppm
+    if product >= 0:
+        return (product + PPM // 2) // PPM
+    return -((-product + PPM // 2) // PPM)
+
+
+class Totals(NamedTuple):
+    subtotal: int
+    discount: int  # clamped to 0..subtotal
+    tax: int
+    tip: int
+    card_fee_if_card: int
+    cash_total: int
+    card_total: int
+    card_fee: int  # fee actually charged for the chosen payment
+    amount_due: int
+    change_due: int
+
+
+def compute_totals(
+    subtotal_cents,
+    discount_cents=0,
+    tip_cents=0,
+    tax_ppm=0,
+    card_fee_ppm=0,
+    payment="Cash",
+    cash_received_cents=0,
+) -> Totals:
+    discount = max(0, min(discount_cents, subtotal_cents))
+    effective = subtotal_cents - discount
+    tax = apply_rate(effective, tax_ppm)
+    cash_total = effective + tax + tip_cents
+    card_fee_if_card = apply_rate(cash_total, card_fee_ppm)
+    card_total = cash_total + card_fee_if_card
+
+    if payment == "Card":
+        card_fee, amount_due = card_fee_if_card, card_total
+    else:
+        card_fee, amount_due = 0, cash_total
+
+    return Totals(
+        subtotal=subtotal_cents,
+        discount=discount,
+        tax=tax,
+        tip=tip_cents,
+        card_fee_if_card=card_fee_if_card,
+        cash_total=cash_total,
+        card_total=card_total,
+        card_fee=card_fee,
+        amount_due=amount_due,
+        change_due=max(0, cash_received_cents - amount_due),
+    )
+
+
+def reprice(sales, tax_percent, card_fee_percent):
+    """Re-price sale records (dollar amounts, as in sales.xlsx) at new rates.
+
+    Yields one Totals per record; the rates are converted once for the batch.
+    """
+    tax_ppm = rate_ppm(tax_percent)
+    card_fee_ppm = rate_ppm(card_fee_percent)
+    for sale in sales:
+        yield compute_totals(
+            to_cents(sale.get("Subtotal")),
+            to_cents(sale.get("Discount")),
+            to_cents(sale.get("Tip")),
+            tax_ppm,
+            card_fee_ppm,
+            sale.get("Payment Method", "Cash"),
+            to_cents(sale.get("Cash Received")),
+        )
@@ -0,0 +1,330 @@
+# pos/receipts.py
+# Receipt rendering and printing.
+#
+#   python -m pos.receipts serve [--port 9100] [--out printed.bin]
+#   python -m pos.receipts reprint SALE_ID [--printer tcp://127.0.0.1:9100]
+#
+# A ReceiptConfig (shop name, header lines, footer, paper width) is compiled
+# once into a template: the fixed parts (title, rules, footer) are laid out
+# and encoded up front, and the rest is a short list of functions filling in
+# one sale. Templates are cached per config, so a checkout only formats its
+# own values. The same template yields plain text (screen, download) and
+# ESC/POS bytes for a thermal printer.
+#
+# Printing goes through a PrintQueue: one thread per printer drains it and
+# retries, so checkout never waits on a slow or offline printer. A printer
+# target is a device path (e.g. /dev/usb/lp0) or tcp://host:port (a network
+# printer's raw port, usually 9100). Without a printer at hand, "serve"
+# listens like one and appends whatever it is sent to a file.
+import argparse
+import functools
+import queue
+import re
+import socket
+import socketserver
+import sys
+import threading
+import time
+from concurrent.futures import Future
+from typing import NamedTuple
+
+from pos.line_items import cart_lines, parse_items_string
+
+DEFAULT_PORT = 9100
+ENCODING = "cp437"  # the code page ESC/POS printers start in
+
+# ESC/POS commands
+INIT = b"\x1b@"
+ALIGN_LEFT = b"\x1ba\x00"
+ALIGN_CENTER = b"\x1ba\x01"
+BOLD_ON = b"\x1bE\x01"
+BOLD_OFF = b"\x1bE\x00"
+DOUBLE_ON = b"\x1d!\x11"
+DOUBLE_OFF = b"\x1d!\x00"
+FEED_AND_CUT = b"\x1dV\x42\x04"  # feed 4 lines, partial cut
+
+STYLES = {
+    "normal": (ALIGN_LEFT, b""),
+    "center": (ALIGN_CENTER, ALIGN_LEFT),
+    "bold": (BOLD_ON, BOLD_OFF),
+    "title": (ALIGN_CENTER + BOLD_ON + DOUBLE_ON, DOUBLE_OFF + BOLD_OFF + ALIGN_LEFT),
+}
+
+
+class ReceiptConfig(NamedTuple):
+    name: str = "Bob's DOGZ"
+    header: tuple = ()  # e.g. address and phone, centered under the name
+    footer: tuple = ("Thank you!",)
+    width: int = 32  # characters per line (58 mm paper: 32, 80 mm: 48)
+
+
+def _money(amount) -> str:
+    sign = "-" if amount < 0 else ""
+    return f"{sign}${abs(amount):.2f}"
+
+
+def _pair(left, right, width) -> str:
+    room = max(1, width - len(right) - 1)
+    return f"{left[:room]:<{room}} {right}"
+
+
+class _Static:
+    """Fixed text, encoded once."""
+
+    __slots__ = ("style", "lines", "data")
+
+    def __init__(self, style, lines):
+        self.style = style
+        self.lines = list(lines)
+        self.data = _encode(style, self.lines)
+
+    def __call__(self, record):
+        return self.lines
+
+
+def _encode(style, lines) -> bytes:
+    if not lines:
+        return b""
+    on, off = STYLES[style]
+    text = "".join(line + "\n" for line in lines)
+    return on + text.encode(ENCODING, errors="replace") + off
+
+
+class Template:
+    """A compiled receipt layout: [(style, part)], part being a _Static or
+    a function record -> lines."""
+
+    def __init__(self, config: ReceiptConfig):
+        w = config.width
+        rule = "-" * w
+
+        def kind(record):
+            k = record.get("Kind") or "sale"
+            return [] if k == "sale" else [f"*** {k.upper()} ***"]
+
+        def info(record):
+            ts = str(record.get("Timestamp") or "")
+            lines = [
+                _pair(ts[:10], ts[11:19], w),
+                _pair("Payment", str(record.get("Payment Method") or ""), w),
+            ]
+            if record.get("Sale ID"):
+                lines.append(_pair("Sale", str(record["Sale ID"])[:12], w))
+            return lines
+
+        def items(record):
+            if record.get("Lines") is not None:
+                lines = cart_lines(record["Lines"])
+            else:
+                lines = parse_items_string(record.get("Items"))
+            return [
+                _pair(f"{qty}x {item}", _money(price * qty / 100), w)
+                for item, price, qty in lines
+            ]
+
+        def amounts(record):
+            out = [_pair("Subtotal", _money(record.get("Subtotal") or 0), w)]
+            for key in ("Discount", "Tax", "Tip", "Card Fee"):
+                value = record.get(key) or 0
+                if value or key == "Tax":
+                    shown = -value if key == "Discount" else value
+                    out.append(_pair(key, _money(shown), w))
+            return out
+
+        def total(record):
+            return [_pair("TOTAL", _money(record.get("Total") or 0), w)]
+
+        def cash(record):
+            if record.get("Payment Method") != "Cash":
+                return []
+            return [
+                _pair("Cash", _money(record.get("Cash Received") or 0), w),
+                _pair("Change", _money(record.get("Change") or 0), w),
+            ]
+
+        def notes(record):
+            text = str(record.get("Notes") or "")
+            return ["", *(text[i : i + w] for i in range(0, len(text), w))] if text else []
+
+        self.width = w
+        self.parts = [
+            ("title", _Static("title", [config.name])),
+            ("center", _Static("center", config.header)),
+            ("center", kind),
+            ("normal", _Static("normal", [rule])),
+            ("normal", info),
+            ("normal", _Static("normal", [rule])),
+            ("normal", items),
+            ("normal", _Static("normal", [rule])),
+            ("normal", amounts),
+            ("bold", total),
+            ("normal", cash),
+            ("normal", notes),
+            ("center", _Static("center", ["", *config.footer])),
+        ]
+
+    def text(self, record) -> str:
+        return "\n".join(line for _, part in self.parts for line in part(record))
+
+    def escpos(self, record) -> bytes:
+        out = [INIT]
+        for style, part in self.parts:
+            if isinstance(part, _Static):
+                out.append(part.data)
+            else:
+                out.append(_encode(style, part(record)))
+        out.append(FEED_AND_CUT)
+        return b"".join(out)
+
+
+@functools.lru_cache(maxsize=16)
+def template(config: ReceiptConfig = ReceiptConfig()) -> Template:
+    return Template(config)
+
+
+def render_text(record, config: ReceiptConfig = ReceiptConfig()) -> str:
+    return template(config).text(record)
+
+
+def render_escpos(record, config: ReceiptConfig = ReceiptConfig()) -> bytes:
+    return template(config).escpos(record)
+
+
+# ---------- Printing ----------
+def send(target, data: bytes, timeout=5.0):
+    """Write raw bytes to a printer: tcp://host:port or a device path."""
+    if target.startswith("tcp://"):
+        host, _, port = target[len("tcp://"):].rpartition(":")
+        with socket.create_connection((host, int(port or DEFAULT_PORT)), timeout) as s:
+            s.sendall(data)
+    else:
+        with open(target, "ab", buffering=0) as device:
+            device.write(data)
+
+
+_STOP = object()
+
+
+class PrintQueue:
+    def __init__(self, target, retries=3, retry_delay=2.0, timeout=5.0):
+        self.target = target
+        self.retries = retries
+        self.retry_delay = retry_delay
+        self.timeout = timeout
+        self.last_error = None
+        self._queue = queue.Queue()
+        self._thread = threading.Thread(
+            target=self._run, name="receipt-printer", daemon=True
+        )
+        self._thread.start()
+
+    def submit(self, data: bytes) -> Future:
+        """Queue a print job and return at once; resolves to True once
+        printed (or to the last error after retries)."""
+        future = Future()
+        self._queue.put((data, future))
+        return future
+
+    @property
+    def pending(self) -> int:
+        return self._queue.qsize()
+
+    def close(self, timeout=None):
+        self._queue.put((_STOP, None))
+        self._thread.join(timeout)
+
+    def _run(self):
+        while True:
+            data, future = self._queue.get()
+            if data is _STOP:
+                return
+            for attempt in range(self.retries + 1):
+                try:
+                    send(self.target, data, self.timeout)
+                except OSError as exc:
+                    self.last_error = exc
+                    if attempt < self.retries:
+                        time.sleep(self.retry_delay * 2**attempt)
+                        continue
+                    future.set_exception(exc)
+                else:
+                    self.last_error = None
+                    future.set_result(True)
+                break
+
+
+_printers = {}
+_printers_lock = threading.Lock()
+
+
+def open_printer(target) -> PrintQueue:
+    """Process-wide print queue per printer target, shared by all sessions."""
+    with _printers_lock:
+        printer = _printers.get(target)
+        if printer is None:
+            printer = _printers[target] = PrintQueue(target)
+        return printer
+
+
+# ---------- Printer stand-in ----------
+_ESCPOS = re.compile(rb"\x1b[@]|\x1b[aE!].|\x1d!.|\x1dV..", re.DOTALL)
+
+
+def make_server(out_path, host="127.0.0.1", port=DEFAULT_PORT):
+    """A raw-port "printer" appending each job to out_path and echoing its
+    text to stderr."""
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self):
+            data = self.rfile.read()
+            with open(out_path, "ab") as f:
+                f.write(data)
+            text = _ESCPOS.sub(b"", data).decode(ENCODING, errors="replace")
+            print(text, file=sys.stderr)
+
+    socketserver.ThreadingTCPServer.allow_reuse_address = True
+    return socketserver.ThreadingTCPServer((host, port), Handler)
+
+
+def main(argv=None):
+    from pos.core import PRINTER, SALES_DB, RECEIPT_CONFIG
+    from pos.sales_store import SalesStore
+
+    parser = argparse.ArgumentParser(description="Receipt printing")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="stand in for a network receipt printer")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    serve.add_argument("--out", default="printed.bin", help="received jobs")
+    reprint = sub.add_parser("reprint", help="print a past sale's receipt")
+    reprint.add_argument("sale_id", help="sale ID, or its first characters")
+    reprint.add_argument("--db", default=str(SALES_DB))
+    reprint.add_argument("--printer", default=PRINTER, required=PRINTER is None)
+    args = parser.parse_args(argv)
+
+    if args.command == "serve":
+        server = make_server(args.out, args.host, args.port)
+        print(f"Printing to {args.out} on {args.host}:{args.port}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+        return
+
+    store = SalesStore(args.db)
+    try:
+        record = store.find_record(args.sale_id)
+    except (KeyError, ValueError) as exc:
+        sys.exit(str(exc))
+    finally:
+        store.close()
+    try:
+        send(args.printer, render_escpos(record, RECEIPT_CONFIG))
+    except OSError as exc:
+        sys.exit(f"printing failed: {exc}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,126 @@
+# pos/reporting.py
+# Date-range sales reports over the pre-aggregated rollups.
+#
+# Every query reads the per-day rollup tables (daily_totals, hourly_totals,
+# daily_item_totals), never raw sales, so a 12-month report aggregates at
+# most a few rows per day. Results are returned as columns (dicts of equal
+# length lists) that drop straight into a DataFrame or chart.
+#
+# Breakdowns the rollups don't keep (per terminal, the sales themselves)
+# read the columnar archive instead, via core.read_sales_columns.
+from pos.daily_totals import KIND_COUNTS, TOTAL_FIELDS
+
+WEEKDAYS = ["Mon", "Tue", "Wed", "Thu", "Fri", "Sat", "Sun"]
+
+
+def _columns(rows, names) -> dict:
+    return {name: [row[i] for row in rows] for i, name in enumerate(names)}
+
+
+def range_totals(store, start: str, end: str) -> dict:
+    sums = ", ".join(f"COALESCE(SUM({f}), 0)" for f in TOTAL_FIELDS)
+    row = store.query(
+        f"SELECT {sums} FROM daily_totals WHERE date BETWEEN ? AND ?", (start, end)
+    )[0]
+    return dict(zip(TOTAL_FIELDS, row))
+
+
+def revenue_by_day(store, start: str, end: str) -> dict:
+    rows = store.query(
+        "SELECT date, transactions, total_cents FROM daily_totals "
+        "WHERE date BETWEEN ? AND ? ORDER BY date",
+        (start, end),
+    )
+    return _columns(rows, ("date", "transactions", "total_cents"))
+
+
+def revenue_by_hour(store, start: str, end: str) -> dict:
+    """All 24 hours, including ones without sales."""
+    found = {
+        hour: (n, cents)
+        for hour, n, cents in store.query(
+            "SELECT hour, SUM(transactions), SUM(total_cents) FROM hourly_totals "
+            "WHERE date BETWEEN ? AND ? GROUP BY hour",
+            (start, end),
+        )
+    }
+    rows = [(h, *found.get(h, (0, 0))) for h in range(24)]
+    return _columns(rows, ("hour", "transactions", "total_cents"))
+
+
+def revenue_by_weekday(store, start: str, end: str) -> dict:
+    found = {
+        # SQLite's %w counts from Sunday = 0
+        (int(dow) - 1) % 7: (n, cents)
+        for dow, n, cents in store.query(
+            "SELECT strftime('%w', date), SUM(transactions), SUM(total_cents) "
+            "FROM daily_totals WHERE date BETWEEN ? AND ? GROUP BY 1",
+            (start, end),
+        )
+    }
+    rows = [(WEEKDAYS[d], *found.get(d, (0, 0))) for d in range(7)]
+    return _columns(rows, ("weekday", "transactions", "total_cents"))
+
+
+def item_sales(store, start: str, end: str, limit=None) -> dict:
+    sql = (
+        "SELECT item, SUM(qty), SUM(revenue_cents) FROM daily_item_totals "
+        "WHERE date BETWEEN ? AND ? GROUP BY item HAVING SUM(qty) != 0 "
+        "ORDER BY 3 DESC, item"
+    )
+    params = [start, end]
+    if limit is not None:
+        sql += " LIMIT ?"
+        params.append(int(limit))
+    return _columns(store.query(sql, params), ("item", "qty", "revenue_cents"))
+
+
+def payment_mix(totals: dict) -> dict:
+    rows = [
+        ("Cash", totals["cash_total_cents"]),
+        ("Card", totals["card_total_cents"]),
+        ("Other", totals["other_total_cents"]),
+    ]
+    return _columns(rows, ("payment_method", "total_cents"))
+
+
+def terminal_sales(sales) -> dict:
+    """Transactions and revenue per terminal from an Arrow table with
+    terminal_id, kind and total_cents columns (e.g. read_sales_columns)."""
+    import pyarrow as pa
+    import pyarrow.compute as pc
+
+    kind = sales["kind"].cast(pa.string())
+    counts = pa.array([0] * sales.num_rows, pa.int64())
+    for name, n in KIND_COUNTS.items():
+        counts = pc.add(counts, pc.if_else(pc.equal(kind, name), n, 0))
+    grouped = (
+        pa.table(
+            {
+                "terminal_id": sales["terminal_id"].cast(pa.string()),
+                "transactions": counts,
+                "total_cents": sales["total_cents"],
+            }
+        )
+        .group_by("terminal_id")
+        .aggregate([("transactions", "sum"), ("total_cents", "sum")])
+        .sort_by([("total_cents_sum", "descending"), ("terminal_id", "ascending")])
+    )
+    return {
+        "terminal_id": grouped["terminal_id"].to_pylist(),
+        "transactions": grouped["transactions_sum"].to_pylist(),
+        "total_cents": grouped["total_cents_sum"].to_pylist(),
+    }
+
+
+def sales_report(store, start: str, end: str) -> dict:
+    """Everything the Reports page shows, for start..end (ISO dates, inclusive)."""
+    totals = range_totals(store, start, end)
+    return {
+        "totals": totals,
+        "by_day": revenue_by_day(store, start, end),
+        "by_hour": revenue_by_hour(store, start, end),
+        "by_weekday": revenue_by_weekday(store, start, end),
+        "items": item_sales(store, start, end),
+        "payment_mix": payment_mix(totals),
+    }
@@ -0,0 +1,295 @@
+# pos/sale_writer.py
+# Single, write-behind writer for the sales journal.
+#
+# Every Streamlit session runs in its own thread, and several terminals
+# (browser sessions) can check out at the same moment. All journal writes
+# go through one queue drained by one thread, so commits are applied
+# strictly one after another.
+#
+# Checkout does not wait for SQLite: submit() appends the sale to a small
+# spool file (one JSON line, flushed to the OS) and returns. The writer
+# thread commits queued sales in batches, one transaction per batch, and
+# empties the spool once nothing is pending. If the process dies first, the
+# spool is replayed on the next start; sale_uid makes the replay idempotent.
+# A sale the journal refuses is moved from the spool to a .rejected file
+# (the spool is rewritten at once), so a replay never rejects it again.
+import atexit
+import json
+import os
+import queue
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from concurrent.futures import Future
+from pathlib import Path
+
+from pos.sales_store import new_sale_uid
+
+PENDING = "pending"
+COMMITTED = "committed"
+FAILED = "failed"
+
+_STOP = object()
+
+
+class SaleWriter:
+    def __init__(
+        self, store, spool_path=None, batch_size=200, retry_delay=1.0, fsync=False
+    ):
+        self.store = store
+        self.batch_size = batch_size
+        self.retry_delay = retry_delay
+        self.fsync = fsync
+        self.spool_path = Path(spool_path or store.path.with_suffix(".spool"))
+        self.rejected_path = self.spool_path.with_suffix(".rejected")
+        self._queue = queue.Queue()
+        self._spool_lock = threading.Lock()
+        self._pending = OrderedDict()  # sale_uid -> spool line, in submit order
+        self._status = OrderedDict()  # recent sale_uid -> PENDING/COMMITTED/FAILED
+        self._idle = threading.Condition(self._spool_lock)
+        self._closed = False
+        self._closing = set()  # days with a close-out queued
+
+        self._replay_spool()
+        self._spool = self.spool_path.open("a", encoding="utf-8")
+        self._thread = threading.Thread(
+            target=self._run, name="sale-writer", daemon=True
+        )
+        self._thread.start()
+
+    # ---------- Producer side (UI threads) ----------
+    def submit(self, record: dict) -> Future:
+        """Queue a sale durably and return at once.
+
+        The record gets a "Sale ID" if it has none. The Future resolves to
+        that sale id once the sale is committed to the journal.
+        """
+        record = dict(record)
+        day = str(record.get("Date") or "")[:10]
+        record["Sale ID"] = record.get("Sale ID") or new_sale_uid()
+        uid = record["Sale ID"]
+        line = json.dumps(record, separators=(",", ":"), default=str) + "\n"
+        future = Future()
+        with self._spool_lock:
+            if self._closed:
+                raise RuntimeError("sale writer is closed")
+            # Refused here, not by the journal later: an acknowledged sale
+            # must never be rejected for landing on a closed day
+            if day in self._closing or self.store.is_closed(day):
+                raise ValueError(f"{day} is closed out")
+            self._spool.write(line)
+            self._spool.flush()
+            if self.fsync:
+                os.fsync(self._spool.fileno())
+            self._pending[uid] = line
+            self._set_status(uid, PENDING)
+            self._queue.put(("sale", record, future))
+        return future
+
+    def submit_call(self, func, *args, **kwargs) -> Future:
+        """Queue func(*args, **kwargs) (a store write such as a void) to run
+        on the writer thread; resolves to its result.
+
+        It runs after every sale queued before it has been committed.
+        """
+        future = Future()
+        self._queue.put(("call", (func, args, kwargs), future))
+        return future
+
+    def submit_close(self, day, *args) -> Future:
+        """Queue store.close_day(day, *args) behind the sales already queued;
+        from now on submit() refuses sales dated day."""
+        with self._spool_lock:
+            self._closing.add(day)
+            future = self.submit_call(self.store.close_day, day, *args)
+
+        def reopen(f):
+            # A close that failed leaves the day open, unless it was closed already
+            if f.exception() is not None and not self.store.is_closed(day):
+                with self._spool_lock:
+                    self._closing.discard(day)
+
+        future.add_done_callback(reopen)
+        return future
+
+    def submit_undo(self, terminal_id) -> Future:
+        """Queue an undo of terminal_id's newest sale; resolves to True/False."""
+        return self.submit_call(self.store.remove_last, terminal_id)
+
+    @property
+    def pending(self) -> int:
+        with self._spool_lock:
+            return len(self._pending)
+
+    def status(self, uid):
+        with self._spool_lock:
+            return self._status.get(uid)
+
+    def flush(self, timeout=None) -> bool:
+        """Block until every queued sale is committed (or timeout)."""
+        deadline = None if timeout is None else time.monotonic() + timeout
+        with self._idle:
+            while self._pending:
+                remaining = None if deadline is None else deadline - time.monotonic()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    def close(self, timeout=None):
+        """Drain the queue to the journal, then stop the writer thread."""
+        with self._spool_lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put((_STOP, None, None))
+        self._thread.join(timeout)
+        self._spool.close()
+
+    # ---------- Spool ----------
+    def _set_status(self, uid, state):
+        self._status[uid] = state
+        self._status.move_to_end(uid)
+        while len(self._status) > 10_000:
+            self._status.popitem(last=False)
+
+    def _rejected_uids(self) -> set:
+        if not self.rejected_path.exists():
+            return set()
+        uids = set()
+        with self.rejected_path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    uids.add(json.loads(line).get("Sale ID"))
+                except ValueError:
+                    continue
+        return uids
+
+    def _replay_spool(self):
+        if not self.spool_path.exists():
+            return
+        # Set aside already, but the spool wasn't rewritten before a crash
+        rejected = self._rejected_uids()
+        with self.spool_path.open(encoding="utf-8") as f:
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # torn last line from a crash mid-write
+                uid = record.get("Sale ID")
+                if not uid or uid in rejected:
+                    continue
+                self._pending[uid] = line if line.endswith("\n") else line + "\n"
+                self._set_status(uid, PENDING)
+                self._queue.put(("sale", record, Future()))
+
+    def _compact_spool(self):
+        """Rewrite the spool to hold only uncommitted sales (call with lock held)."""
+        if not self._pending:
+            self._spool.truncate(0)
+            return
+        tmp = self.spool_path.with_name(self.spool_path.name + ".tmp")
+        with tmp.open("w", encoding="utf-8") as f:
+            f.writelines(self._pending.values())
+            f.flush()
+            os.fsync(f.fileno())
+        self._spool.close()
+        tmp.replace(self.spool_path)
+        self._spool = self.spool_path.open("a", encoding="utf-8")
+
+    # ---------- Writer thread ----------
+    def _run(self):
+        while True:
+            jobs = [self._queue.get()]
+            while len(jobs) < self.batch_size:
+                try:
+                    jobs.append(self._queue.get_nowait())
+                except queue.Empty:
+                    break
+
+            sales = []
+            for kind, payload, future in jobs:
+                if kind == "sale":
+                    sales.append((payload, future))
+                    continue
+                self._commit(sales)
+                sales = []
+                if kind is _STOP:
+                    return
+                self._call(payload, future)
+            self._commit(sales)
+
+    def _commit(self, sales):
+        if not sales:
+            return
+        error = None
+        while True:
+            try:
+                self.store.append_many(record for record, _ in sales)
+                break
+            except sqlite3.OperationalError as exc:
+                # Locked or unavailable database: the sales are still in the
+                # spool, so keep them pending and try again
+                if self._closed:
+                    for _, future in sales:
+                        future.set_exception(exc)  # replayed on next start
+                    return
+                time.sleep(self.retry_delay)
+            except Exception as exc:
+                if len(sales) > 1:
+                    # Find the bad record without holding back the rest
+                    for sale in sales:
+                        self._commit([sale])
+                    return
+                error = exc
+                break
+
+        with self._idle:
+            for record, future in sales:
+                uid = record["Sale ID"]
+                line = self._pending.pop(uid, "")
+                if error is None:
+                    self._set_status(uid, COMMITTED)
+                    future.set_result(uid)
+                    continue
+                # Unwritable record: set aside for manual recovery
+                with self.rejected_path.open("a", encoding="utf-8") as f:
+                    f.write(line)
+                    f.flush()
+                    os.fsync(f.fileno())
+                self._set_status(uid, FAILED)
+                future.set_exception(error)
+            if error is not None or not self._pending:
+                # Drop rejected records from the spool now, not once it drains
+                self._compact_spool()
+            if not self._pending:
+                self._idle.notify_all()
+
+    def _call(self, payload, future):
+        # Voids leave the sale in the journal, so replaying it from the
+        # spool after a crash is a no-op like any other duplicate
+        func, args, kwargs = payload
+        try:
+            future.set_result(func(*args, **kwargs))
+        except Exception as exc:
+            future.set_exception(exc)
+
+
+_writers = {}
+_writers_lock = threading.Lock()
+
+
+def open_writer(store, spool_path=None) -> SaleWriter:
+    """Process-wide writer per store, shared by all sessions.
+
+    The spool belongs to this process: other processes writing the same
+    journal need their own spool_path. Registered with atexit so queued
+    sales are flushed on shutdown.
+    """
+    with _writers_lock:
+        writer = _writers.get(id(store))
+        if writer is None:
+            writer = _writers[id(store)] = SaleWriter(store, spool_path)
+            atexit.register(writer.close)
+        return writer
@@ -0,0 +1,1059 @@
+# pos/sales_store.py
+# Append-only sales journal backed by SQLite in WAL mode.
+#
+# Every checkout is a single INSERT appended to the write-ahead log, so the
+# cost of recording a sale does not grow with the sales history. With
+# synchronous=NORMAL, SQLite only fsyncs when the WAL is checkpointed, which
+# batches the disk flushes across many sales. sales.xlsx is no longer the
+# system of record; it is exported from here on demand.
+#
+# Rows are never rewritten: a void or refund is a journal row of its own
+# (kind "void"/"refund", negative amounts and quantities) pointing at the
+# sale it reverses, so every total, rollup and export nets it out by just
+# adding it in.
+import json
+import sqlite3
+import threading
+import uuid
+from datetime import datetime
+from pathlib import Path
+
+from pos.closeout import CREATE_CLOSEOUTS_SQL, build_report, report_from_row
+from pos.daily_totals import (
+    CREATE_DAILY_TOTALS_SQL,
+    CREATE_ROLLUPS_SQL,
+    DailyTotals,
+    apply_rollups,
+    apply_sale,
+)
+from pos.inventory import CREATE_INVENTORY_SQL, apply_stock
+from pos.line_items import (
+    CREATE_LINE_ITEMS_SQL,
+    cart_lines,
+    insert_lines,
+    migrate_items_strings,
+    parse_items_string,
+)
+from pos.money import to_cents
+
+# Column layout of sales.xlsx (and of the records the app passes around)
+SALES_COLUMNS = [
+    "Timestamp",
+    "Date",
+    "Items",
+    "Subtotal",
+    "Discount",
+    "Tax",
+    "Tip",
+    "Card Fee",
+    "Total",
+    "Payment Method",
+    "Notes",
+    "Cash Received",
+    "Change",
+    "Terminal",
+    "Sale ID",
+    "Kind",
+    "Reverses",
+]
+
+# Record key -> journal column. Money is stored as integer cents.
+TEXT_FIELDS = {
+    "Timestamp": "timestamp",
+    "Date": "date",
+    "Items": "items",
+    "Payment Method": "payment_method",
+    "Notes": "notes",
+    "Terminal": "terminal_id",
+    "Sale ID": "sale_uid",
+    "Kind": "kind",
+    "Reverses": "reverses_uid",
+}
+MONEY_FIELDS = {
+    "Subtotal": "subtotal_cents",
+    "Discount": "discount_cents",
+    "Tax": "tax_cents",
+    "Tip": "tip_cents",
+    "Card Fee": "card_fee_cents",
+    "Total": "total_cents",
+    "Cash Received": "cash_received_cents",
+    "Change": "change_cents",
+}
+
+# Each entry upgrades the schema by one version (tracked in PRAGMA user_version).
+# Entries are SQL scripts, or callables for data migrations that need Python.
+MIGRATIONS = [
+    """
+    CREATE TABLE sales (
+        id INTEGER PRIMARY KEY,
+        timestamp TEXT NOT NULL,
+        date TEXT NOT NULL,
+        items TEXT NOT NULL DEFAULT '',
+        subtotal_cents INTEGER NOT NULL DEFAULT 0,
+        discount_cents INTEGER NOT NULL DEFAULT 0,
+        tax_cents INTEGER NOT NULL DEFAULT 0,
+        tip_cents INTEGER NOT NULL DEFAULT 0,
+        card_fee_cents INTEGER NOT NULL DEFAULT 0,
+        total_cents INTEGER NOT NULL DEFAULT 0,
+        payment_method TEXT NOT NULL DEFAULT '',
+        notes TEXT NOT NULL DEFAULT '',
+        cash_received_cents INTEGER NOT NULL DEFAULT 0,
+        change_cents INTEGER NOT NULL DEFAULT 0
+    );
+    CREATE TABLE meta (key TEXT PRIMARY KEY, value TEXT);
+    """,
+    # Today's Summary reads one day (split by payment) instead of all history
+    """
+    CREATE INDEX sales_by_date_payment ON sales (date, payment_method);
+    """,
+    # Per-day running totals, seeded once from the existing journal
+    CREATE_DAILY_TOTALS_SQL,
+    # Structured line items; existing Items strings are parsed exactly once
+    CREATE_LINE_ITEMS_SQL,
+    migrate_items_strings,
+    # Several terminals share one journal: who rang each sale up, plus a
+    # globally unique sale id (older rows get a random one)
+    """
+    ALTER TABLE sales ADD COLUMN terminal_id TEXT NOT NULL DEFAULT '';
+    ALTER TABLE sales ADD COLUMN sale_uid TEXT;
+    UPDATE sales SET sale_uid = lower(hex(randomblob(16)));
+    CREATE UNIQUE INDEX sales_by_uid ON sales (sale_uid);
+    CREATE INDEX sales_by_terminal ON sales (terminal_id, id);
+    """,
+    # Hour-of-day and per-item rollups for date-range reports
+    CREATE_ROLLUPS_SQL,
+    # Change feed for syncing stands: every added/removed sale, in commit
+    # order. AUTOINCREMENT so a sequence number is never handed out twice,
+    # even when undo frees the newest sales.id for reuse.
+    """
+    CREATE TABLE sales_changes (
+        seq INTEGER PRIMARY KEY AUTOINCREMENT,
+        op TEXT NOT NULL,
+        sale_uid TEXT NOT NULL
+    );
+    INSERT INTO sales_changes (op, sale_uid) SELECT 'add', sale_uid FROM sales ORDER BY id;
+    CREATE TRIGGER sales_changes_add AFTER INSERT ON sales BEGIN
+        INSERT INTO sales_changes (op, sale_uid) VALUES ('add', NEW.sale_uid);
+    END;
+    CREATE TRIGGER sales_changes_remove AFTER DELETE ON sales BEGIN
+        INSERT INTO sales_changes (op, sale_uid) VALUES ('remove', OLD.sale_uid);
+    END;
+    """,
+    # Voids and refunds: reversal rows pointing at the sale they reverse.
+    # A sale can be voided once; sales_by_reverses finds its reversals.
+    """
+    ALTER TABLE sales ADD COLUMN kind TEXT NOT NULL DEFAULT 'sale';
+    ALTER TABLE sales ADD COLUMN reverses_uid TEXT;
+    CREATE INDEX sales_by_reverses ON sales (reverses_uid)
+        WHERE reverses_uid IS NOT NULL;
+    CREATE UNIQUE INDEX sales_void_once ON sales (reverses_uid) WHERE kind = 'void';
+    """,
+    # Ingredient stock, decremented by checkout (see pos/inventory.py)
+    CREATE_INVENTORY_SQL,
+    # End-of-day close-outs; a closed day takes no more journal rows
+    CREATE_CLOSEOUTS_SQL,
+    # A terminal's sales in a time window (voiding a shift) without
+    # scanning its whole history
+    """
+    CREATE INDEX sales_by_terminal_time ON sales (terminal_id, timestamp);
+    """,
+    # The change feed only fills once this journal syncs (sync_source set by
+    # start_change_feed); a stand that never syncs keeps no feed at all
+    """
+    DROP TRIGGER sales_changes_add;
+    DROP TRIGGER sales_changes_remove;
+    CREATE TRIGGER sales_changes_add AFTER INSERT ON sales
+    WHEN EXISTS (SELECT 1 FROM meta WHERE key = 'sync_source') BEGIN
+        INSERT INTO sales_changes (op, sale_uid) VALUES ('add', NEW.sale_uid);
+    END;
+    CREATE TRIGGER sales_changes_remove AFTER DELETE ON sales
+    WHEN EXISTS (SELECT 1 FROM meta WHERE key = 'sync_source') BEGIN
+        INSERT INTO sales_changes (op, sale_uid) VALUES ('remove', OLD.sale_uid);
+    END;
+    DELETE FROM sales_changes
+    WHERE NOT EXISTS (SELECT 1 FROM meta WHERE key = 'sync_source');
+    """,
+]
+
+REVERSAL_KINDS = ("void", "refund")
+
+
+def new_sale_uid() -> str:
+    return uuid.uuid4().hex
+
+
+def _text(value) -> str:
+    if value is None:
+        return ""
+    if isinstance(value, float) and value != value:
+        return ""
+    if isinstance(value, datetime):  # openpyxl hands back real datetimes
+        return value.strftime("%Y-%m-%d %H:%M:%S")
+    return str(value)
+
+
+class SalesStore:
+    def __init__(self, path):
+        self.path = Path(path)
+        self._lock = threading.RLock()
+        self._conn = sqlite3.connect(
+            str(self.path), check_same_thread=False, isolation_level=None
+        )
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._export_timer = None
+        self._migrate()
+        # Closed days, kept in memory so checkout can refuse a sale for one
+        # before acknowledging it, without waiting on the journal lock
+        self._closed = {
+            r[0] for r in self._conn.execute("SELECT date FROM day_closeouts")
+        }
+
+    def _migrate(self):
+        with self._lock:
+            version = self._conn.execute("PRAGMA user_version").fetchone()[0]
+            for i, step in enumerate(MIGRATIONS[version:], start=version + 1):
+                if callable(step):
+                    self._conn.execute("BEGIN IMMEDIATE")
+                    try:
+                        step(self._conn)
+                        self._conn.execute(f"PRAGMA user_version = {i}")
+                    except Exception:
+                        self._conn.execute("ROLLBACK")
+                        raise
+                    self._conn.execute("COMMIT")
+                else:
+                    self._conn.executescript(
+                        f"BEGIN; {step}; PRAGMA user_version = {i}; COMMIT;"
+                    )
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+    # ---------- Meta ----------
+    def get_meta(self, key, default=None):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM meta WHERE key = ?", (key,)
+            ).fetchone()
+        return row[0] if row else default
+
+    def set_meta(self, key, value):
+        with self._lock:
+            self._set_meta(key, value)
+
+    def _set_meta(self, key, value):
+        self._conn.execute(
+            "INSERT OR REPLACE INTO meta (key, value) VALUES (?, ?)",
+            (key, str(value)),
+        )
+
+    # ---------- Writes ----------
+    @staticmethod
+    def _row_values(record: dict):
+        values = {col: _text(record.get(key)) for key, col in TEXT_FIELDS.items()}
+        for key, col in MONEY_FIELDS.items():
+            values[col] = to_cents(record.get(key, 0))
+        values["date"] = values["date"][:10]
+        values["sale_uid"] = values["sale_uid"] or new_sale_uid()
+        values["kind"] = values["kind"] or "sale"
+        values["reverses_uid"] = values["reverses_uid"] or None
+        return values
+
+    def _insert(self, record: dict):
+        """Insert one sale; None if its sale_uid is already in the journal
+        (or it voids a sale that is already voided)."""
+        values = self._row_values(record)
+        cols = ", ".join(values)
+        marks = ", ".join("?" for _ in values)
+        cur = self._conn.execute(
+            f"INSERT INTO sales ({cols}) VALUES ({marks}) "
+            "ON CONFLICT DO NOTHING",
+            tuple(values.values()),
+        )
+        if cur.rowcount == 0:
+            return None  # replayed/re-imported sale: keep the journal idempotent
+        apply_sale(self._conn, values)
+        if record.get("Lines") is not None:
+            lines = cart_lines(record["Lines"])
+        else:
+            lines = parse_items_string(values["items"])
+        insert_lines(self._conn, cur.lastrowid, lines)
+        apply_rollups(self._conn, values, lines)
+        if values["kind"] != "refund":
+            apply_stock(self._conn, lines)
+        return cur.lastrowid
+
+    def append(self, record: dict) -> int:
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                sale_id = self._insert(record)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return sale_id
+
+    def append_many(self, records, meta=None) -> list:
+        """Insert a batch in one transaction; row ids (None for duplicates).
+
+        meta entries are written in the same transaction, so progress
+        markers (e.g. of a backfill) never run ahead of the rows they cover.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                ids = [self._insert(record) for record in records]
+                for key, value in (meta or {}).items():
+                    self._set_meta(key, value)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return ids
+
+    def _remove_row(self, row):
+        lines = self._conn.execute(
+            "SELECT item, unit_price_cents, qty FROM line_items WHERE sale_id = ?",
+            (row["id"],),
+        ).fetchall()
+        apply_rollups(self._conn, row, lines, sign=-1)
+        self._conn.execute("DELETE FROM line_items WHERE sale_id = ?", (row["id"],))
+        self._conn.execute("DELETE FROM sales WHERE id = ?", (row["id"],))
+        apply_sale(self._conn, row, sign=-1)
+
+    def remove_last(self, terminal_id=None) -> bool:
+        """Undo the newest sale -- of one terminal only, if terminal_id is
+        given -- by voiding it; False if there is none left to undo."""
+        sql = (
+            "SELECT * FROM sales s WHERE kind = 'sale' AND NOT EXISTS "
+            "(SELECT 1 FROM sales v WHERE v.reverses_uid = s.sale_uid "
+            "AND v.kind = 'void')"
+        )
+        params = ()
+        if terminal_id is not None:
+            sql += " AND terminal_id = ?"
+            params = (terminal_id,)
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    sql + " ORDER BY id DESC LIMIT 1", params
+                ).fetchone()
+                if row is not None:
+                    self._void_row(row, "undo", terminal_id)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            return row is not None
+
+    # ---------- Voids and refunds ----------
+    def _sale_row(self, uid):
+        row = self._conn.execute(
+            "SELECT * FROM sales WHERE sale_uid = ?", (uid,)
+        ).fetchone()
+        if row is None:
+            raise KeyError(f"no sale {uid}")
+        if row["kind"] != "sale":
+            raise ValueError(f"{uid} is a {row['kind']}, not a sale")
+        return row
+
+    def _reversed(self, uid) -> dict:
+        """{kind: cents given back} of the reversals of one sale."""
+        return {
+            kind: -cents
+            for kind, cents in self._conn.execute(
+                "SELECT kind, SUM(total_cents) FROM sales "
+                "WHERE reverses_uid = ? GROUP BY kind",
+                (uid,),
+            )
+        }
+
+    def _sale_lines(self, sale_id):
+        return self._conn.execute(
+            "SELECT item, unit_price_cents, qty FROM line_items WHERE sale_id = ?",
+            (sale_id,),
+        ).fetchall()
+
+    def _reversal(self, row, kind, cents, lines, terminal_id, note, timestamp):
+        """Insert a reversal of row: each money column becomes -cents[col]."""
+        record = {key: row[col] for key, col in TEXT_FIELDS.items()}
+        for key, col in MONEY_FIELDS.items():
+            record[key] = -cents.get(col, 0) / 100.0
+        record.update(
+            {
+                "Timestamp": timestamp,
+                "Date": timestamp[:10],
+                "Items": "; ".join(
+                    f"{-qty}x {item} @ {price / 100:.2f}" for item, price, qty in lines
+                ),
+                "Lines": [
+                    {"item": item, "price": price / 100, "qty": -qty}
+                    for item, price, qty in lines
+                ],
+                "Notes": note,
+                "Terminal": terminal_id or row["terminal_id"],
+                "Sale ID": new_sale_uid(),
+                "Kind": kind,
+                "Reverses": row["sale_uid"],
+            }
+        )
+        self._insert(record)
+        return record["Sale ID"]
+
+    def _check_open(self, day):
+        if self._conn.execute(
+            "SELECT 1 FROM day_closeouts WHERE date = ?", (day,)
+        ).fetchone():
+            raise ValueError(f"{day} is closed out")
+
+    def _void_row(self, row, reason="", terminal_id=None):
+        """Reverse a whole sale, dated like the sale itself so its day, hour
+        and items net to zero; None if it was voided already."""
+        self._check_open(row["date"])
+        reversed_ = self._reversed(row["sale_uid"])
+        if "void" in reversed_:
+            return None
+        if "refund" in reversed_:
+            raise ValueError(f"{row['sale_uid']} has refunds; refund the rest instead")
+        now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+        return self._reversal(
+            row,
+            "void",
+            {col: row[col] for col in MONEY_FIELDS.values()},
+            self._sale_lines(row["id"]),
+            terminal_id,
+            f"voided {now}" + (f": {reason}" if reason else ""),
+            row["timestamp"],
+        )
+
+    def void(self, uids, reason="", terminal_id=None) -> list:
+        """Void sales by sale_uid, all in one transaction.
+
+        Returns the uids actually voided (already voided ones are skipped).
+        An unknown uid, or one that is not a plain sale, rolls back all.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                voided = [
+                    uid
+                    for uid in uids
+                    if self._void_row(self._sale_row(uid), reason, terminal_id)
+                ]
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return voided
+
+    def void_between(self, terminal_id, start: str, end: str, reason="") -> list:
+        """Void every sale terminal_id rang up with start <= timestamp <= end
+        (e.g. a shift of test transactions) in one transaction; sales that
+        are already voided or partly refunded are left alone."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                rows = self._conn.execute(
+                    "SELECT * FROM sales s WHERE terminal_id = ? AND kind = 'sale' "
+                    "AND timestamp BETWEEN ? AND ? AND NOT EXISTS "
+                    "(SELECT 1 FROM sales v WHERE v.reverses_uid = s.sale_uid) "
+                    "ORDER BY id",
+                    (terminal_id, start, end),
+                ).fetchall()
+                voided = [
+                    r["sale_uid"] for r in rows if self._void_row(r, reason, terminal_id)
+                ]
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return voided
+
+    def refund(
+        self, uid, amount_cents=None, lines=(), reason="", terminal_id=None
+    ) -> str:
+        """Give back part of a sale; returns the refund's sale_uid.
+
+        lines is [(item, qty), ...] taken back at the sale's unit prices.
+        amount_cents defaults to those lines' share of the sale total (tax,
+        discount and fees included); each money column is refunded in that
+        same proportion. The refund is dated now, when the money leaves.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._sale_row(uid)
+                reversed_ = self._reversed(uid)
+                if "void" in reversed_:
+                    raise ValueError(f"{uid} is voided")
+                sold = self._sale_lines(row["id"])
+                refund_lines = self._refund_lines(uid, sold, lines)
+                total = row["total_cents"]
+                if amount_cents is None:
+                    value = sum(price * qty for _, price, qty in sold)
+                    taken = sum(price * qty for _, price, qty in refund_lines)
+                    amount_cents = round(total * taken / value) if value else 0
+                remaining = total - reversed_.get("refund", 0)
+                if not 0 < amount_cents <= remaining:
+                    raise ValueError(
+                        f"refund must be between $0.01 and ${remaining / 100:.2f}"
+                    )
+                cents = {
+                    col: round(row[col] * amount_cents / total)
+                    for col in ("subtotal_cents", "discount_cents", "tax_cents",
+                                "tip_cents", "card_fee_cents")
+                }
+                cents["total_cents"] = amount_cents
+                if row["payment_method"] == "Cash":
+                    cents["cash_received_cents"] = amount_cents  # out of the drawer
+                now = datetime.now().strftime("%Y-%m-%d %H:%M:%S")
+                self._check_open(now[:10])
+                refund_uid = self._reversal(
+                    row, "refund", cents, refund_lines, terminal_id, reason, now
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return refund_uid
+
+    def _refund_lines(self, uid, sold, lines) -> list:
+        """[(item, unit_price_cents, qty)] for lines, checked against what
+        was sold and not refunded yet."""
+        left = {}
+        prices = {}
+        for item, price, qty in sold:
+            left[item] = left.get(item, 0) + qty
+            prices.setdefault(item, price)
+        for item, qty in self._conn.execute(
+            "SELECT li.item, SUM(li.qty) FROM sales s "
+            "JOIN line_items li ON li.sale_id = s.id "
+            "WHERE s.reverses_uid = ? GROUP BY li.item",
+            (uid,),
+        ):
+            left[item] = left.get(item, 0) + qty  # refunded qty is negative
+        out = []
+        for item, qty in lines:
+            qty = int(qty)
+            if qty <= 0 or qty > left.get(item, 0):
+                raise ValueError(f"can't refund {qty}x {item}")
+            left[item] -= qty
+            out.append((item, prices[item], qty))
+        return out
+
+    def recent_sales(self, terminal_id=None, limit=20) -> list:
+        """Newest sales (not reversals) with what was already given back:
+        [{"uid", "timestamp", "items", "total_cents", "refunded_cents",
+        "voided"}]."""
+        sql = (
+            "SELECT s.sale_uid, s.timestamp, s.items, s.total_cents, "
+            "COALESCE(-SUM(CASE WHEN r.kind = 'refund' THEN r.total_cents END), 0), "
+            "COUNT(CASE WHEN r.kind = 'void' THEN 1 END) "
+            "FROM sales s LEFT JOIN sales r ON r.reverses_uid = s.sale_uid "
+            "WHERE s.kind = 'sale'"
+        )
+        params = []
+        if terminal_id is not None:
+            sql += " AND s.terminal_id = ?"
+            params.append(terminal_id)
+        sql += " GROUP BY s.id ORDER BY s.id DESC LIMIT ?"
+        params.append(int(limit))
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [
+            {
+                "uid": r[0], "timestamp": r[1], "items": r[2], "total_cents": r[3],
+                "refunded_cents": r[4], "voided": bool(r[5]),
+            }
+            for r in rows
+        ]
+
+    def _merge_one(self, func, *args):
+        """(True, func(*args)) run inside a savepoint, or (False, None) with
+        nothing written if the journal refuses it."""
+        self._conn.execute("SAVEPOINT merge_one")
+        try:
+            result = func(*args)
+        except (sqlite3.IntegrityError, KeyError, TypeError, ValueError):
+            self._conn.execute("ROLLBACK TO merge_one")
+            self._conn.execute("RELEASE merge_one")
+            return False, None
+        self._conn.execute("RELEASE merge_one")
+        return True, result
+
+    def merge(self, records, removed_uids=(), meta=None, rejected=None):
+        """Apply a sync batch in one transaction: add records (duplicates are
+        skipped), remove sales by sale_uid, then write meta.
+
+        With a rejected list, a change the journal refuses (e.g. one dated on
+        a closed day) is skipped and its sale_uid appended to the list;
+        without one, it fails the whole batch. Returns (added, removed) counts.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                added = 0
+                for record in records:
+                    if rejected is None:
+                        added += self._insert(record) is not None
+                        continue
+                    ok, row_id = self._merge_one(self._insert, record)
+                    if ok:
+                        added += row_id is not None
+                    else:
+                        rejected.append(record.get("Sale ID"))
+                removed = 0
+                for uid in removed_uids:
+                    row = self._conn.execute(
+                        "SELECT * FROM sales WHERE sale_uid = ?", (uid,)
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    if rejected is None:
+                        self._remove_row(row)
+                    elif not self._merge_one(self._remove_row, row)[0]:
+                        rejected.append(uid)
+                        continue
+                    removed += 1
+                for key, value in (meta or {}).items():
+                    self._set_meta(key, value)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return added, removed
+
+    # ---------- Close-out ----------
+    def close_day(self, day, counted_cents, float_cents=0, closed_by="") -> dict:
+        """Record the counted drawer and freeze the day; returns its Z-report.
+
+        Raises ValueError if the day is already closed.
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._check_open(day)
+                report = build_report(self._conn, day, counted_cents, float_cents)
+                self._conn.execute(
+                    "INSERT INTO day_closeouts (date, closed_at, closed_by, "
+                    "float_cents, counted_cents, report) VALUES (?, ?, ?, ?, ?, ?)",
+                    (
+                        day,
+                        datetime.now().strftime("%Y-%m-%d %H:%M:%S"),
+                        closed_by,
+                        float_cents,
+                        counted_cents,
+                        json.dumps(report, separators=(",", ":")),
+                    ),
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+            self._closed.add(day)
+        return self.closeout(day)
+
+    def is_closed(self, day) -> bool:
+        """Whether day was closed out (by this process, or before it started)."""
+        return day in self._closed
+
+    def closeout(self, day):
+        """The stored Z-report of a closed day, or None if it is still open."""
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM day_closeouts WHERE date = ?", (day,)
+            ).fetchone()
+        return report_from_row(row) if row else None
+
+    def preview_closeout(self, day, counted_cents=0, float_cents=0) -> dict:
+        """The Z-report closing now would produce, without closing."""
+        with self._lock:
+            return build_report(self._conn, day, counted_cents, float_cents)
+
+    def closed_days(self, limit=30) -> list:
+        with self._lock:
+            return [
+                r[0]
+                for r in self._conn.execute(
+                    "SELECT date FROM day_closeouts ORDER BY date DESC LIMIT ?",
+                    (limit,),
+                )
+            ]
+
+    # ---------- Inventory ----------
+    def set_recipes(self, rows):
+        """Replace the recipes with (item, ingredient, qty) rows."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                self._conn.execute("DELETE FROM recipes")
+                self._conn.executemany(
+                    "INSERT OR REPLACE INTO recipes (item, ingredient, qty) "
+                    "VALUES (?, ?, ?)",
+                    rows,
+                )
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+
+    def recipes(self) -> list:
+        with self._lock:
+            return [
+                tuple(r)
+                for r in self._conn.execute(
+                    "SELECT item, ingredient, qty FROM recipes ORDER BY item, ingredient"
+                )
+            ]
+
+    def stock(self) -> list:
+        """[{"ingredient", "on_hand", "low_at", "unit"}] of tracked ingredients."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT ingredient, on_hand, low_at, unit FROM stock ORDER BY ingredient"
+            ).fetchall()
+        return [dict(r) for r in rows]
+
+    def set_stock(self, ingredient, on_hand=None, low_at=None, unit=None):
+        """Start tracking an ingredient, or change its level, alert or unit."""
+        with self._lock:
+            self._conn.execute(
+                "INSERT INTO stock (ingredient, on_hand, low_at, unit) "
+                "VALUES (?, COALESCE(?, 0), COALESCE(?, 0), COALESCE(?, '')) "
+                "ON CONFLICT (ingredient) DO UPDATE SET "
+                "on_hand = COALESCE(?, on_hand), low_at = COALESCE(?, low_at), "
+                "unit = COALESCE(?, unit)",
+                (ingredient, on_hand, low_at, unit, on_hand, low_at, unit),
+            )
+
+    def receive_stock(self, ingredient, qty):
+        """Add a delivery to a tracked ingredient."""
+        with self._lock:
+            self._conn.execute(
+                "UPDATE stock SET on_hand = on_hand + ? WHERE ingredient = ?",
+                (qty, ingredient),
+            )
+
+    def drop_stock(self, ingredient):
+        """Stop tracking an ingredient."""
+        with self._lock:
+            self._conn.execute("DELETE FROM stock WHERE ingredient = ?", (ingredient,))
+
+    def item_availability(self) -> dict:
+        """{item: (portions left, low)} for items using tracked ingredients.
+
+        Portions are limited by the scarcest ingredient; low is set when any
+        of them is at or below its alert level.
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT r.item, MIN(s.on_hand / r.qty), MAX(s.on_hand <= s.low_at) "
+                "FROM recipes r JOIN stock s ON s.ingredient = r.ingredient "
+                "WHERE r.qty > 0 GROUP BY r.item"
+            ).fetchall()
+        return {item: (max(0, int(left)), bool(low)) for item, left, low in rows}
+
+    def count_stock(self, counts: dict, day: str) -> list:
+        """Reconcile against an end-of-day count ({ingredient: counted}).
+
+        Stock is set to what was counted; each expected/counted pair is kept
+        in stock_counts. Returns [(ingredient, expected, counted)].
+        """
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                out = []
+                for ingredient, counted in counts.items():
+                    row = self._conn.execute(
+                        "SELECT on_hand FROM stock WHERE ingredient = ?", (ingredient,)
+                    ).fetchone()
+                    if row is None:
+                        continue
+                    counted = float(counted)
+                    self._conn.execute(
+                        "INSERT OR REPLACE INTO stock_counts "
+                        "(date, ingredient, expected, counted) VALUES (?, ?, ?, ?)",
+                        (day, ingredient, row[0], counted),
+                    )
+                    self._conn.execute(
+                        "UPDATE stock SET on_hand = ? WHERE ingredient = ?",
+                        (counted, ingredient),
+                    )
+                    out.append((ingredient, row[0], counted))
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return out
+
+    def stock_counts(self, day: str) -> list:
+        with self._lock:
+            return [
+                tuple(r)
+                for r in self._conn.execute(
+                    "SELECT ingredient, expected, counted FROM stock_counts "
+                    "WHERE date = ? ORDER BY ingredient",
+                    (day,),
+                )
+            ]
+
+    # ---------- Reads ----------
+    @staticmethod
+    def _to_record(row) -> dict:
+        record = {key: row[col] or "" for key, col in TEXT_FIELDS.items()}
+        for key, col in MONEY_FIELDS.items():
+            record[key] = row[col] / 100.0
+        return {key: record[key] for key in SALES_COLUMNS}
+
+    def count(self) -> int:
+        with self._lock:
+            return self._conn.execute("SELECT COUNT(*) FROM sales").fetchone()[0]
+
+    def is_empty(self) -> bool:
+        with self._lock:
+            return self._conn.execute("SELECT 1 FROM sales LIMIT 1").fetchone() is None
+
+    def daily_totals(self, day: str) -> DailyTotals:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT * FROM daily_totals WHERE date = ?", (day,)
+            ).fetchone()
+        return DailyTotals.from_row(row) if row else DailyTotals(day)
+
+    def item_totals(self, start: str, end: str = None, limit=None):
+        """Units and revenue per item for sales dated start..end (inclusive)."""
+        sql = (
+            "SELECT li.item AS item, SUM(li.qty) AS qty, "
+            "SUM(li.qty * li.unit_price_cents) AS revenue_cents "
+            "FROM sales s JOIN line_items li ON li.sale_id = s.id "
+            "WHERE s.date BETWEEN ? AND ? "
+            "GROUP BY li.item ORDER BY qty DESC, item"
+        )
+        params = [start, end or start]
+        if limit is not None:
+            sql += " LIMIT ?"
+            params.append(int(limit))
+        with self._lock:
+            return [tuple(r) for r in self._conn.execute(sql, params)]
+
+    def line_items(self, start: str, end: str = None) -> dict:
+        """Line items for start..end as columns, ready for a DataFrame."""
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT li.sale_id, li.item, li.unit_price_cents, li.qty "
+                "FROM sales s JOIN line_items li ON li.sale_id = s.id "
+                "WHERE s.date BETWEEN ? AND ? ORDER BY li.sale_id",
+                (start, end or start),
+            ).fetchall()
+        names = ("sale_id", "item", "unit_price_cents", "qty")
+        return {name: [r[i] for r in rows] for i, name in enumerate(names)}
+
+    def find_record(self, uid) -> dict:
+        """One journal row (sale, void or refund) by sale_uid or a unique
+        prefix of it, with its structured "Lines" -- e.g. for a reprint."""
+        uid = str(uid).strip()
+        if not uid:
+            raise KeyError("no sale ID given")
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT * FROM sales WHERE sale_uid >= ? ORDER BY sale_uid LIMIT 2",
+                (uid,),
+            ).fetchall()
+            rows = [r for r in rows if r["sale_uid"].startswith(uid)]
+            if not rows:
+                raise KeyError(f"no sale {uid}")
+            if len(rows) > 1 and rows[0]["sale_uid"] != uid:
+                raise ValueError(f"{uid} matches more than one sale")
+            row = rows[0]
+            lines = self._sale_lines(row["id"])
+        record = self._to_record(row)
+        record["Lines"] = [
+            {"item": item, "price": price / 100, "qty": qty} for item, price, qty in lines
+        ]
+        return record
+
+    def query(self, sql, params=()):
+        """Read-only query helper for report code; returns all rows."""
+        with self._lock:
+            return self._conn.execute(sql, params).fetchall()
+
+    def records(self):
+        with self._lock:
+            rows = self._conn.execute("SELECT * FROM sales ORDER BY id").fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def records_for_date(self, day: str, payment_method=None):
+        sql = "SELECT * FROM sales WHERE date = ?"
+        params = [day]
+        if payment_method is not None:
+            sql += " AND payment_method = ?"
+            params.append(payment_method)
+        with self._lock:
+            rows = self._conn.execute(sql + " ORDER BY id", params).fetchall()
+        return [self._to_record(r) for r in rows]
+
+    def iter_records(self, start: str = None, end: str = None, chunk_size=1000):
+        """Yield records dated start..end (inclusive) in id order, chunk by chunk.
+
+        Pages by id, so at most chunk_size rows are in memory and the lock
+        is only held while fetching each page; checkouts keep committing
+        while a long export runs.
+        """
+        sql = "SELECT * FROM sales WHERE id > ?"
+        params = []
+        if start is not None:
+            sql += " AND date >= ?"
+            params.append(start)
+        if end is not None:
+            sql += " AND date <= ?"
+            params.append(end)
+        sql += " ORDER BY id LIMIT ?"
+        last_id = 0
+        while True:
+            with self._lock:
+                rows = self._conn.execute(
+                    sql, [last_id, *params, chunk_size]
+                ).fetchall()
+            if not rows:
+                return
+            last_id = rows[-1]["id"]
+            for row in rows:
+                yield self._to_record(row)
+
+    # ---------- Change feed ----------
+    def start_change_feed(self, source) -> str:
+        """Start keeping the change feed for sync, seeded with every sale
+        already in the journal so the history ships too; returns the
+        journal's sync source (source, unless it was started before)."""
+        with self._lock:
+            self._conn.execute("BEGIN IMMEDIATE")
+            try:
+                row = self._conn.execute(
+                    "SELECT value FROM meta WHERE key = 'sync_source'"
+                ).fetchone()
+                if row is None:
+                    self._conn.execute(
+                        "INSERT INTO sales_changes (op, sale_uid) "
+                        "SELECT 'add', sale_uid FROM sales ORDER BY id"
+                    )
+                    self._set_meta("sync_source", source)
+            except Exception:
+                self._conn.execute("ROLLBACK")
+                raise
+            self._conn.execute("COMMIT")
+        return row[0] if row else source
+
+    def changes_after(self, seq: int, limit=500) -> list:
+        """Up to limit changes with a sequence number above seq, oldest first.
+
+        Each is {"seq", "op", "uid"}; "add" changes whose sale still exists
+        also carry its "record", including structured "Lines".
+        """
+        with self._lock:
+            rows = self._conn.execute(
+                "SELECT c.seq AS seq, c.op AS op, c.sale_uid AS uid, s.* "
+                "FROM sales_changes c LEFT JOIN sales s "
+                "ON c.op = 'add' AND s.sale_uid = c.sale_uid "
+                "WHERE c.seq > ? ORDER BY c.seq LIMIT ?",
+                (seq, limit),
+            ).fetchall()
+            sale_ids = [r["id"] for r in rows if r["id"] is not None]
+            lines = {}
+            for i in range(0, len(sale_ids), 500):
+                chunk = sale_ids[i : i + 500]
+                marks = ", ".join("?" for _ in chunk)
+                for sale_id, item, price, qty in self._conn.execute(
+                    "SELECT sale_id, item, unit_price_cents, qty FROM line_items "
+                    f"WHERE sale_id IN ({marks})",
+                    chunk,
+                ):
+                    lines.setdefault(sale_id, []).append(
+                        {"item": item, "price": price / 100, "qty": qty}
+                    )
+        changes = []
+        for r in rows:
+            change = {"seq": r["seq"], "op": r["op"], "uid": r["uid"]}
+            if r["id"] is not None:
+                change["record"] = self._to_record(r)
+                change["record"]["Lines"] = lines.get(r["id"], [])
+            changes.append(change)
+        return changes
+
+    def prune_changes(self, upto_seq=None):
+        """Drop change-feed entries up to upto_seq (all of them if None)."""
+        with self._lock:
+            if upto_seq is None:
+                self._conn.execute("DELETE FROM sales_changes")
+            else:
+                self._conn.execute(
+                    "DELETE FROM sales_changes WHERE seq <= ?", (upto_seq,)
+                )
+
+    # ---------- Excel interop ----------
+    def import_legacy_xlsx(self, xlsx_path, sheet_name) -> int:
+        """One-time import of an existing sales.xlsx into an empty journal."""
+        xlsx_path = Path(xlsx_path)
+        if self.get_meta("legacy_xlsx_imported") or not xlsx_path.exists():
+            return 0
+        if not self.is_empty():
+            with self._lock:
+                self._set_meta("legacy_xlsx_imported", xlsx_path.name)
+            return 0
+
+        from openpyxl import load_workbook
+
+        wb = load_workbook(xlsx_path, read_only=True, data_only=True)
+        try:
+            ws = wb[sheet_name] if sheet_name in wb.sheetnames else wb.active
+            rows = ws.iter_rows(values_only=True)
+            header = [str(h) if h is not None else "" for h in next(rows, ())]
+            records = (
+                dict(zip(header, row))
+                for row in rows
+                if any(v not in (None, "") for v in row)
+            )
+            n = len(self.append_many(r for r in records if r.get("Timestamp")))
+        finally:
+            wb.close()
+        with self._lock:
+            self._set_meta("legacy_xlsx_imported", xlsx_path.name)
+        return n
+
+    def export_xlsx(self, xlsx_path, sheet_name):
+        """Rebuild sales.xlsx from the journal (streamed, written atomically)."""
+        from pos.export import write_xlsx
+
+        write_xlsx(self, xlsx_path, sheet_name)
+        return Path(xlsx_path)
+
+    def schedule_export(self, xlsx_path, sheet_name, delay=30.0):
+        """Refresh sales.xlsx in the background (e.g. at close-out); a call
+        while an export is already pending or running is a no-op."""
+        with self._lock:
+            if self._export_timer is not None and self._export_timer.is_alive():
+                return
+            timer = threading.Timer(
+                delay, self.export_xlsx, args=(xlsx_path, sheet_name)
+            )
+            timer.daemon = True
+            self._export_timer = timer
+            timer.start()
+
+
+_stores = {}
+_stores_lock = threading.Lock()
+
+
+def open_store(path) -> SalesStore:
+    """Process-wide store per database file, shared by all sessions."""
+    key = str(Path(path).resolve())
+    with _stores_lock:
+        store = _stores.get(key)
+        if store is None:
+            store = _stores[key] = SalesStore(path)
+        return store
@@ -0,0 +1,289 @@
+# pos/sync.py
+# Multi-stand consolidation: each stand ships its journal changes to one
+# aggregator, which keeps a consolidated journal and serves chain totals.
+#
+#   python -m pos.sync serve --db chain.db --port 8765
+#   python -m pos.sync push --db sales.db --url http://hq:8765 --stand Pier
+#
+# Stands read the journal's change feed (sales_changes: every added and
+# removed sale, with a sequence number that is never reused; kept only once
+# the journal has started syncing, and pruned as it is acked) and POST it in
+# gzip-compressed JSON batches. The aggregator applies a batch in one
+# transaction together with the stand's last applied sequence number and
+# answers with that number; the stand then drops the acknowledged changes.
+# A batch that is resent after a lost reply is recognised by its sequence
+# numbers, and sale_uid keeps the merge idempotent on top of that, so a
+# flaky link can only cost retries, never double-count a sale.
+#
+# A change the consolidated journal refuses (e.g. a sale dated on a day HQ
+# has closed) is skipped rather than failing the batch: the reply lists its
+# sale_uid under "rejected" and the rest is acked, so one bad change cannot
+# hold up a stand's feed. The stand keeps the rejected uids (sync_rejected
+# in meta) for someone to look at. A database error that is not about the
+# batch (e.g. a locked database) answers 503 and the stand retries.
+#
+# Chain-wide totals come from the consolidated journal's own daily_totals,
+# i.e. the same metrics as Today's Summary:
+#   GET /totals?date=YYYY-MM-DD
+import argparse
+import gzip
+import json
+import sqlite3
+import sys
+import threading
+import time
+import urllib.request
+import uuid
+from datetime import date
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+from pos.daily_totals import TOTAL_FIELDS
+from pos.sales_store import SalesStore
+
+BATCH_SIZE = 500
+DEFAULT_PORT = 8765
+
+
+def _encode(payload) -> bytes:
+    return gzip.compress(json.dumps(payload, separators=(",", ":")).encode())
+
+
+def _decode(body: bytes, encoding=None):
+    if encoding == "gzip":
+        body = gzip.decompress(body)
+    return json.loads(body)
+
+
+# ---------- Stand side ----------
+class SyncClient:
+    def __init__(self, store, url, stand, batch_size=BATCH_SIZE, timeout=15.0):
+        self.store = store
+        self.url = url.rstrip("/")
+        self.stand = stand
+        self.batch_size = batch_size
+        self.timeout = timeout
+        # Identifies this journal, so a stand that starts over with a fresh
+        # sales.db (sequence numbers from 1 again) is not mistaken for a replay.
+        # Setting it also starts the change feed, which a journal that never
+        # syncs does not keep.
+        self.source = store.get_meta("sync_source") or store.start_change_feed(
+            uuid.uuid4().hex
+        )
+
+    @property
+    def acked(self) -> int:
+        return int(self.store.get_meta("sync_acked", 0))
+
+    @property
+    def rejected(self) -> list:
+        """sale_uids the aggregator refused, oldest first."""
+        return json.loads(self.store.get_meta("sync_rejected", "[]"))
+
+    def _post(self, payload) -> dict:
+        request = urllib.request.Request(
+            f"{self.url}/sync",
+            data=_encode(payload),
+            headers={"Content-Type": "application/json", "Content-Encoding": "gzip"},
+            method="POST",
+        )
+        with urllib.request.urlopen(request, timeout=self.timeout) as resp:
+            return _decode(resp.read(), resp.headers.get("Content-Encoding"))
+
+    def push_once(self) -> int:
+        """Ship everything not yet acknowledged; returns changes shipped.
+
+        Network errors propagate; nothing is dropped until it is acked.
+        """
+        shipped = 0
+        while True:
+            changes = self.store.changes_after(self.acked, self.batch_size)
+            if not changes:
+                return shipped
+            reply = self._post(
+                {"stand": self.stand, "source": self.source, "changes": changes}
+            )
+            ack = int(reply["ack"])
+            if reply.get("rejected"):
+                self.store.set_meta(
+                    "sync_rejected", json.dumps(self.rejected + reply["rejected"])
+                )
+            self.store.set_meta("sync_acked", ack)
+            self.store.prune_changes(ack)
+            shipped += len(changes)
+            if ack < changes[-1]["seq"]:
+                raise RuntimeError(f"aggregator acked {ack}, sent up to {changes[-1]['seq']}")
+
+    def run(self, interval=10.0, max_backoff=300.0, stop=None):
+        """Push every interval seconds, backing off while the link is down."""
+        stop = stop or threading.Event()
+        delay = interval
+        while not stop.is_set():
+            try:
+                self.push_once()
+                delay = interval
+            except (OSError, ValueError, RuntimeError):
+                delay = min(delay * 2, max_backoff)
+            stop.wait(delay)
+
+
+_clients = {}
+_clients_lock = threading.Lock()
+
+
+def start_client(store, url, stand, interval=10.0) -> SyncClient:
+    """Process-wide background pusher per store (started once)."""
+    with _clients_lock:
+        client = _clients.get(id(store))
+        if client is None:
+            client = _clients[id(store)] = SyncClient(store, url, stand)
+            threading.Thread(
+                target=client.run, args=(interval,), name="sync-push", daemon=True
+            ).start()
+        return client
+
+
+# ---------- Aggregator side ----------
+class Aggregator:
+    def __init__(self, store):
+        self.store = store
+        self._lock = threading.Lock()
+
+    def last_seq(self, stand, source) -> int:
+        return int(self.store.get_meta(f"sync:{stand}:{source}", 0))
+
+    def apply(self, payload):
+        """Merge one batch from a stand; returns (sequence number to ack,
+        sale_uids of the changes the journal refused)."""
+        stand, source = payload["stand"], payload["source"]
+        with self._lock:
+            last = self.last_seq(stand, source)
+            fresh = [c for c in payload["changes"] if c["seq"] > last]
+            if not fresh:
+                return last, []
+            added = [c["record"] for c in fresh if c["op"] == "add" and "record" in c]
+            removed = [c["uid"] for c in fresh if c["op"] == "remove"]
+            ack = max(c["seq"] for c in fresh)
+            rejected = []
+            self.store.merge(
+                added, removed, meta={f"sync:{stand}:{source}": ack}, rejected=rejected
+            )
+            # The consolidated journal is not synced onwards
+            self.store.prune_changes()
+            return ack, rejected
+
+    def totals(self, day) -> dict:
+        t = self.store.daily_totals(day)
+        totals = {"date": day, **{field: getattr(t, field) for field in TOTAL_FIELDS}}
+        totals["top_items"] = [
+            {"item": item, "qty": qty, "revenue_cents": cents}
+            for item, qty, cents in self.store.item_totals(day, limit=10)
+        ]
+        return totals
+
+    def stands(self) -> dict:
+        rows = self.store.query("SELECT key, value FROM meta WHERE key LIKE 'sync:%'")
+        return {row["key"][len("sync:"):]: int(row["value"]) for row in rows}
+
+
+def make_handler(aggregator):
+    class Handler(BaseHTTPRequestHandler):
+        def _reply(self, status, payload):
+            body = _encode(payload)
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Encoding", "gzip")
+            self.send_header("Content-Length", str(len(body)))
+            self.end_headers()
+            self.wfile.write(body)
+
+        def do_POST(self):
+            if urlparse(self.path).path != "/sync":
+                return self._reply(404, {"error": "not found"})
+            try:
+                length = int(self.headers.get("Content-Length", 0))
+                payload = _decode(
+                    self.rfile.read(length), self.headers.get("Content-Encoding")
+                )
+                ack, rejected = aggregator.apply(payload)
+            except (KeyError, TypeError, ValueError, OSError) as exc:
+                return self._reply(400, {"error": str(exc)})
+            except sqlite3.DatabaseError as exc:
+                return self._reply(503, {"error": str(exc)})
+            if rejected:
+                print(
+                    f"{payload['stand']}: rejected {len(rejected)} changes: "
+                    + ", ".join(map(str, rejected)),
+                    file=sys.stderr,
+                )
+            self._reply(200, {"ack": ack, "rejected": rejected})
+
+        def do_GET(self):
+            url = urlparse(self.path)
+            if url.path == "/totals":
+                day = parse_qs(url.query).get("date", [date.today().isoformat()])[0]
+                return self._reply(200, aggregator.totals(day))
+            if url.path == "/stands":
+                return self._reply(200, aggregator.stands())
+            self._reply(404, {"error": "not found"})
+
+        def log_message(self, format, *args):
+            pass  # one line per stand push every few seconds is just noise
+
+    return Handler
+
+
+def make_server(store, host="127.0.0.1", port=DEFAULT_PORT) -> ThreadingHTTPServer:
+    return ThreadingHTTPServer((host, port), make_handler(Aggregator(store)))
+
+
+def fetch_totals(url, day=None, timeout=15.0) -> dict:
+    query = f"?date={day}" if day else ""
+    with urllib.request.urlopen(f"{url.rstrip('/')}/totals{query}", timeout=timeout) as resp:
+        return _decode(resp.read(), resp.headers.get("Content-Encoding"))
+
+
+def main(argv=None):
+    from pos.core import SALES_DB
+
+    parser = argparse.ArgumentParser(description="Sync sales between stands")
+    sub = parser.add_subparsers(dest="command", required=True)
+    serve = sub.add_parser("serve", help="run the aggregator")
+    serve.add_argument("--db", default="chain.db", help="consolidated journal")
+    serve.add_argument("--host", default="127.0.0.1")
+    serve.add_argument("--port", type=int, default=DEFAULT_PORT)
+    push = sub.add_parser("push", help="ship this stand's sales")
+    push.add_argument("--db", default=str(SALES_DB))
+    push.add_argument("--url", required=True, help="aggregator, e.g. http://hq:8765")
+    push.add_argument("--stand", required=True)
+    push.add_argument("--loop", type=float, metavar="SECONDS",
+                      help="keep pushing at this interval instead of once")
+    args = parser.parse_args(argv)
+
+    store = SalesStore(args.db)
+    if args.command == "serve":
+        server = make_server(store, args.host, args.port)
+        print(f"Aggregating into {args.db} on {args.host}:{args.port}", file=sys.stderr)
+        try:
+            server.serve_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            server.server_close()
+            store.close()
+        return
+
+    client = SyncClient(store, args.url, args.stand)
+    if args.loop:
+        client.run(args.loop)
+        return
+    t0 = time.perf_counter()
+    try:
+        n = client.push_once()
+    except (OSError, ValueError, RuntimeError) as exc:
+        sys.exit(f"sync failed: {exc}")
+    print(f"Shipped {n} changes in {time.perf_counter() - t0:.1f}s", file=sys.stderr)
+
+
+if __name__ == "__main__":
+    main()